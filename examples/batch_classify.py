@@ -2,12 +2,23 @@
 """
 Batch Classification Example
 Scan multiple frequencies and classify each one
+
+    python batch_classify.py [SOURCE] [--server ADDRESS]
+
+All frequencies are captured first, then classified in one batch, either
+with a locally loaded model or by a running model server
+(python src/model_server.py --model ...), which several scanners can share.
 """
 import sys
 import os
+import argparse
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from classify_live import classify_signal
+from classify_live import load_model, classify_frequencies
+from iq_source import open_source
+from model_server import ModelClient
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'rtl_classifier_validated.pkl')
 
 # Common frequencies to scan
 frequencies = {
@@ -20,19 +31,31 @@ frequencies = {
     'APRS': 144.39e6,
 }
 
+parser = argparse.ArgumentParser(description='Classify a list of frequencies in one batch')
+parser.add_argument('source', nargs='?', default='rtlsdr', help='rtlsdr[:INDEX], replay:PATH or synthetic')
+parser.add_argument('--server', help='Model server address (HOST:PORT or unix:PATH) instead of loading the model')
+args = parser.parse_args()
+
 print("="*60)
 print("RTL-ML BATCH CLASSIFICATION")
 print("="*60)
 
+client = ModelClient(args.server) if args.server else None
+model_data = None if client is not None else load_model(MODEL_PATH)
+sdr = open_source(args.source, sample_rate=1.024e6, gain=40)
+
+print(f"\nCapturing {len(frequencies)} frequencies...")
+try:
+    classified = classify_frequencies(sdr, model_data, list(frequencies.values()), client=client)
+finally:
+    sdr.close()
+
 results = []
-for name, freq in frequencies.items():
-    print(f"\n{name} ({freq/1e6:.2f} MHz)...")
-    try:
-        prediction, confidence, _ = classify_signal(freq, '../models/rtl_classifier_validated.pkl')
-        results.append((name, prediction, confidence))
-        print(f"  → {prediction} ({confidence*100:.0f}% confidence)")
-    except Exception as e:
-        print(f"  ✗ Error: {e}")
+for name, (freq, prediction, probabilities) in zip(frequencies, classified):
+    confidence = max(probabilities) if probabilities is not None else 0.0
+    results.append((name, prediction, confidence))
+    print(f"\n{name} ({freq/1e6:.2f} MHz)")
+    print(f"  → {prediction} ({confidence*100:.0f}% confidence)")
 
 print("\n" + "="*60)
 print("SUMMARY")
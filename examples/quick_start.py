@@ -9,11 +9,20 @@ import os
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from classify_live import classify_signal
+from classify_live import load_model, classify_signal
+from iq_source import open_source
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'rtl_classifier_validated.pkl')
+
+# Load the model once, open the dongle (or pass e.g. 'synthetic' to try it without one)
+model_data = load_model(MODEL_PATH)
+sdr = open_source(sys.argv[1] if len(sys.argv) > 1 else 'rtlsdr', sample_rate=1.024e6, gain=40)
 
 # Example: Classify FM broadcast at 98.7 MHz
 print("Classifying FM radio at 98.7 MHz...")
-prediction, confidence, _ = classify_signal(9870000, '../models/rtl_classifier_validated.pkl')
+prediction, probabilities = classify_signal(sdr, model_data, 98.7e6)
+sdr.close()
 
 print(f"\nDetected: {prediction}")
-print(f"Confidence: {confidence*100:.0f}%")
+if probabilities is not None:
+    print(f"Confidence: {max(probabilities)*100:.0f}%")
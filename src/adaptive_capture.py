@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Adaptive Capture
+Settle detection after retuning and confidence-based early stopping, instead of fixed sleeps/durations
+"""
+import numpy as np
+import time
+from collections import namedtuple
+
+from signal_features import FEATURE_NAMES
+from front_end import model_extractor, model_feature_kind
+from stream_classify import predict_batch
+from profiling import profiler
+
+AdaptiveResult = namedtuple('AdaptiveResult', ['label', 'probabilities', 'confidence', 'duration',
+                                               'settle_time', 'discarded', 'early_stop'])
+
+
+class SettleDetector:
+    """
+    Decide when the tuner/AGC transient after a retune is over by watching the signal itself.
+
+    Reads short blocks and tracks their median power (robust to ADS-B/ISM
+    bursts, which only move the mean). The tuner has settled once the last
+    `window` blocks agree within tolerance_db. min_discard samples are
+    always dropped: they can still be buffered from the previous frequency.
+    Gives up after max_settle seconds and proceeds anyway.
+    """
+
+    def __init__(self, block_size=8192, window=3, tolerance_db=1.0, min_discard=16384, max_settle=0.3):
+        self.block_size = block_size
+        self.window = window
+        self.tolerance_db = tolerance_db
+        self.min_discard = min_discard
+        self.max_settle = max_settle
+
+    @staticmethod
+    def block_power_db(block):
+        block = np.asarray(block)
+        return 10 * np.log10(np.median(block.real ** 2 + block.imag ** 2) + 1e-20)
+
+    def is_stable(self, powers_db):
+        recent = powers_db[-self.window:]
+        return len(recent) >= self.window and max(recent) - min(recent) <= self.tolerance_db
+
+    def settle(self, sdr):
+        """
+        Discard samples until the power is stable.
+
+        Returns:
+            (samples discarded, seconds spent, settled block) -- the block is
+            already settled signal and can seed the capture (empty if the
+            source ran out, as a replay without looping does)
+        """
+        start = time.perf_counter()
+        with profiler.stage('settle'):
+            discarded = 0
+            if self.min_discard:
+                discarded += len(sdr.read_samples(self.min_discard))
+            powers = []
+            block = sdr.read_samples(self.block_size)
+            while len(block):
+                powers.append(self.block_power_db(block))
+                if self.is_stable(powers) or time.perf_counter() - start >= self.max_settle:
+                    break
+                discarded += len(block)
+                block = sdr.read_samples(self.block_size)
+        profiler.count('settle_discarded_samples', discarded)
+        return discarded, time.perf_counter() - start, block
+
+
+def _rescale_to_length(features, n_samples, reference_samples):
+    """
+    Estimate the features a reference_samples-long capture would have from a shorter prefix.
+
+    fft_mean, fft_std and fft_max grow linearly with the transform length
+    (exactly for fft_mean, for noise-like spectra otherwise); every other
+    feature is already length-independent.
+    """
+    scale = reference_samples / n_samples
+    for name in ('fft_mean', 'fft_std', 'fft_max'):
+        features[:, FEATURE_NAMES.index(name)] *= scale
+    return features
+
+
+def adaptive_classify(sdr, model_data, frequency, settle_detector=None, min_duration=0.2,
+                      max_duration=0.5, step=0.1, confidence=0.9, patience=2):
+    """
+    Tune, wait for the tuner to settle, then classify over a growing window until confident.
+
+    The window grows by `step` seconds into one preallocated buffer; each
+    check extracts features from the prefix read so far (scalar features
+    rescaled to max_duration, the length the model was trained on; pooled
+    spectrograms do not depend on length). Capture stops once
+    the same label has cleared `confidence` on `patience` consecutive checks
+    (after min_duration), or at max_duration. Sparse bursty classes (ISM,
+    APRS) can look like each other in short windows, which is what
+    min_duration and patience guard against. Models without predict_proba
+    always run to max_duration. A source that runs out (a replay without
+    looping) ends the capture early with what was read; EOFError if that is
+    nothing at all.
+
+    Returns:
+        AdaptiveResult
+    """
+    settle_detector = settle_detector if settle_detector is not None else SettleDetector()
+    with profiler.stage('tune'):
+        sdr.center_freq = frequency
+    discarded, settle_time, block = settle_detector.settle(sdr)
+
+    sample_rate = sdr.sample_rate
+    extractor = model_extractor(model_data, sample_rate)
+    max_samples = int(sample_rate * max_duration)
+    min_samples = min(int(sample_rate * min_duration), max_samples)
+    step_samples = max(1, int(sample_rate * step))
+    buffer = np.empty(max_samples, dtype=np.complex64)
+    # The settled block is signal too, so it starts the window
+    filled = min(len(block), max_samples)
+    buffer[:filled] = block[:filled]
+
+    labels, probabilities = None, None
+    streak, last_label = 0, None
+    early_stop = False
+    exhausted = False
+    next_check = min_samples
+    while True:
+        while filled < next_check:
+            with profiler.stage('read_samples'):
+                chunk = sdr.read_samples(next_check - filled)
+            if not len(chunk):
+                exhausted = True
+                break
+            buffer[filled:filled + len(chunk)] = chunk
+            filled += len(chunk)
+        if not filled:
+            raise EOFError(f"Source returned no samples at {frequency/1e6:.3f} MHz")
+        with profiler.stage('extract'):
+            features = extractor.extract_batch(buffer[np.newaxis, :filled])
+            if model_feature_kind(model_data) == 'scalar':
+                features = _rescale_to_length(features, filled, max_samples)
+        labels, probabilities = predict_batch(model_data, features)
+        if filled >= max_samples or exhausted:
+            break
+        if probabilities is not None:
+            confident = np.max(probabilities[0]) >= confidence
+            streak = streak + 1 if confident and labels[0] == last_label else int(confident)
+            last_label = labels[0]
+            if streak >= patience:
+                early_stop = True
+                break
+        next_check = min(filled + step_samples, max_samples)
+
+    profiler.count('samples_read', filled)
+    probs = probabilities[0] if probabilities is not None else None
+    return AdaptiveResult(labels[0], probs, float(np.max(probs)) if probs is not None else None,
+                          filled / sample_rate, settle_time, discarded, early_stop)
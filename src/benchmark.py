@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Benchmark Suite
+Times feature extraction, dataset loading, training and inference on synthetic IQ; emits JSON
+"""
+import numpy as np
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from signal_features import SignalFeatureExtractor
+from synthetic_iq import CLASS_GENERATORS, generate, generate_dataset
+
+
+def time_call(fn, repeat=3):
+    """Run fn repeat times; return min/median/mean wall-clock seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': float(np.median(times)), 'mean': float(np.mean(times)),
+            'repeat': repeat}
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the scripts' progress prints (and tqdm) while timing."""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def _synthetic_batch(n_captures, n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = list(CLASS_GENERATORS)
+    return np.stack([generate(labels[i % len(labels)], n_samples, rng) for i in range(n_captures)])
+
+
+def bench_extraction(lengths, batch_size, repeat):
+    """Per-capture (extract_features loop) vs batched (extract_batch) throughput."""
+    extractor = SignalFeatureExtractor()
+    results = []
+    for n_samples in lengths:
+        batch = _synthetic_batch(batch_size, n_samples)
+        single = time_call(lambda: [extractor.extract_features(x) for x in batch], repeat)
+        batched = time_call(lambda: extractor.extract_batch(batch), repeat)
+        results.append({
+            'n_samples': n_samples,
+            'batch_size': batch_size,
+            'per_capture_s': single['median'] / batch_size,
+            'batched_per_capture_s': batched['median'] / batch_size,
+            'captures_per_s': batch_size / single['median'],
+            'batched_captures_per_s': batch_size / batched['median'],
+        })
+    return results
+
+
+def bench_dataset_load(workdir, per_class, duration, workers, repeat):
+    """load_dataset on a synthetic .npy tree and its binary-shard conversion."""
+    from train_validated import load_dataset
+    from iq_dataset import convert_npy_tree
+
+    npy_dir = os.path.join(workdir, 'npy')
+    shard_dir = os.path.join(workdir, 'shards')
+    n_files = generate_dataset(npy_dir, per_class=per_class, duration=duration)
+    with _quiet():
+        convert_npy_tree(npy_dir, shard_dir)
+
+    results = {'n_captures': n_files, 'duration_s': duration}
+    for name, data_dir in (('npy', npy_dir), ('shards', shard_dir)):
+        for n_workers in sorted({1, workers}):
+            with _quiet():
+                timing = time_call(lambda: load_dataset(data_dir, use_cache=False, workers=n_workers), repeat)
+            results[f'{name}_workers{n_workers}_s'] = timing['median']
+        with _quiet():
+            load_dataset(data_dir)  # warm the feature cache
+            timing = time_call(lambda: load_dataset(data_dir), repeat)
+        results[f'{name}_cached_s'] = timing['median']
+    return results
+
+
+def _synthetic_features(n_per_class, n_samples, seed=1):
+    extractor = SignalFeatureExtractor()
+    rng = np.random.default_rng(seed)
+    X, y = [], []
+    for label in CLASS_GENERATORS:
+        batch = np.stack([generate(label, n_samples, rng) for _ in range(n_per_class)])
+        X.append(extractor.extract_batch(batch))
+        y.extend([label] * n_per_class)
+    return np.concatenate(X), np.array(y)
+
+
+def bench_training_and_inference(n_per_class, n_samples, inference_batch, repeat):
+    """Fit time per model, then single-row and batched inference (sklearn and lite)."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.svm import SVC
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.preprocessing import StandardScaler
+    from lite_model import export_model, load_lite_model
+
+    X, y = _synthetic_features(n_per_class, n_samples)
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    models = {
+        'Random Forest': lambda: RandomForestClassifier(n_estimators=100, random_state=42),
+        'SVM': lambda: SVC(kernel='rbf', random_state=42),
+        'KNN': lambda: KNeighborsClassifier(n_neighbors=5),
+    }
+    rows = X[np.arange(inference_batch) % len(X)]
+
+    results = {}
+    for name, factory in models.items():
+        fitted = {}
+        fit = time_call(lambda: fitted.__setitem__('model', factory().fit(X_scaled, y)), repeat)
+        model = fitted['model']
+        entry = {'fit_s': fit['median']}
+
+        def sklearn_predict(batch):
+            features = scaler.transform(batch)
+            return model.predict_proba(features) if hasattr(model, 'predict_proba') else model.predict(features)
+        entry['sklearn_single_s'] = time_call(lambda: sklearn_predict(rows[:1]), repeat)['median']
+        entry['sklearn_batch_s'] = time_call(lambda: sklearn_predict(rows), repeat)['median']
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.npz')
+            export_model(path, model, scaler)
+            entry['lite_load_s'] = time_call(lambda: load_lite_model(path), repeat)['median']
+            lite = load_lite_model(path)
+
+        def lite_predict(batch):
+            features = lite['scaler'].transform(batch)
+            m = lite['model']
+            return m.predict_proba(features) if hasattr(m, 'predict_proba') else m.predict(features)
+        entry['lite_single_s'] = time_call(lambda: lite_predict(rows[:1]), repeat)['median']
+        entry['lite_batch_s'] = time_call(lambda: lite_predict(rows), repeat)['median']
+        entry['inference_batch'] = inference_batch
+        results[name] = entry
+    return results
+
+
+# Heavy modules a command must not load just to start (its --help path): they
+# belong inside the code paths that need them
+STARTUP_FORBIDDEN = {
+    'capture': ('sklearn', 'matplotlib', 'scipy.signal', 'tqdm'),
+    'classify': ('sklearn', 'matplotlib', 'tqdm'),
+    'scan': ('sklearn', 'matplotlib', 'tqdm'),
+    'multi': ('sklearn', 'matplotlib', 'tqdm'),
+    'serve': ('sklearn', 'matplotlib', 'tqdm'),
+    'render': ('sklearn', 'matplotlib', 'tqdm'),
+    'convert': ('sklearn', 'matplotlib', 'scipy', 'tqdm'),
+    'cache': ('sklearn', 'matplotlib', 'scipy', 'tqdm'),
+}
+_HEAVY_MODULES = ('sklearn', 'matplotlib', 'scipy', 'scipy.signal', 'tqdm', 'rtlsdr')
+
+
+def bench_startup(commands, repeat, model=None):
+    """
+    Cold-start cost of each rtl-ml command, in fresh interpreters.
+
+    `rtl-ml <command> --help` is timed end to end (interpreter start,
+    imports, argument parsing), and a separate probe runs the same --help
+    in-process and records which heavy modules it loaded (so imports at
+    the top of main(), before parse_args, count too). With model, loading it through
+    classify_live.load_model is timed as well (a lite .npz should not pull
+    in scikit-learn).
+    """
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    entry = os.path.join(src_dir, 'rtl_ml.py')
+    probe = ("import contextlib, io, json, sys; sys.path.insert(0, {src!r}); import rtl_ml\n"
+             "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n"
+             "    rtl_ml.main([{command!r}, '--help'])\n"
+             "{extra}print(json.dumps([m for m in {heavy!r} if m in sys.modules]))")
+    results = {}
+    for command in commands:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, entry, command, '--help'], check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        code = probe.format(src=src_dir, command=command, extra='', heavy=_HEAVY_MODULES)
+        loaded = json.loads(subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                                           text=True).stdout)
+        results[command] = {
+            'help_s': min(times),
+            'heavy_imports': loaded,
+            'forbidden_imports': [m for m in STARTUP_FORBIDDEN.get(command, ()) if m in loaded],
+        }
+    if model:
+        extra = (f"import classify_live; import time; t = time.perf_counter(); "
+                 f"classify_live.load_model({os.path.abspath(model)!r}); "
+                 f"print(time.perf_counter() - t, file=sys.stderr); ")
+        code = probe.format(src=src_dir, command='classify', extra=extra, heavy=_HEAVY_MODULES)
+        start = time.perf_counter()
+        done = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+        results['classify_model_load'] = {
+            'model': model,
+            'total_s': time.perf_counter() - start,
+            'load_model_s': float(done.stderr.strip().splitlines()[-1]),
+            'heavy_imports': json.loads(done.stdout),
+        }
+    return results
+
+
+def startup_failures(startup, budget=None):
+    """Commands over the --startup-budget or loading forbidden modules, as messages."""
+    failures = []
+    for command, entry in startup.items():
+        if 'help_s' not in entry:
+            continue
+        if budget is not None and entry['help_s'] > budget:
+            failures.append(f"{command}: startup {entry['help_s']:.2f} s > budget {budget:.2f} s")
+        if entry['forbidden_imports']:
+            failures.append(f"{command}: imports {', '.join(entry['forbidden_imports'])} at startup")
+    return failures
+
+
+def environment():
+    import scipy
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RTL-ML benchmark suite (synthetic IQ, no hardware)')
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[65536, 262144, 512000],
+                        help='Capture lengths (samples) for extraction benchmarks')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--per-class', type=int, default=10, help='Synthetic captures per class')
+    parser.add_argument('--duration', type=float, default=0.25, help='Synthetic capture length (s)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=['extraction', 'load', 'models', 'startup'],
+                        help='Run a subset of the suites')
+    parser.add_argument('--commands', nargs='+', help='rtl-ml commands for the startup suite (default: all)')
+    parser.add_argument('--startup-model', help='Also time classify_live.load_model on this model')
+    parser.add_argument('--startup-budget', type=float,
+                        help='Exit with status 1 if any command starts slower than this (s); '
+                             'forbidden heavy imports always fail the startup suite')
+    args = parser.parse_args()
+
+    suites = set(args.only or ['extraction', 'load', 'models', 'startup'])
+    report = {'environment': environment(), 'config': vars(args)}
+    failures = []
+
+    if 'extraction' in suites:
+        print("⏱️  Feature extraction...", file=sys.stderr)
+        report['extraction'] = bench_extraction(args.lengths, args.batch_size, args.repeat)
+    if 'load' in suites:
+        print("⏱️  Dataset loading...", file=sys.stderr)
+        workdir = tempfile.mkdtemp(prefix='rtl_ml_bench_')
+        try:
+            report['dataset_load'] = bench_dataset_load(workdir, args.per_class, args.duration,
+                                                        args.workers, args.repeat)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if 'models' in suites:
+        print("⏱️  Training and inference...", file=sys.stderr)
+        n_samples = int(1.024e6 * args.duration)
+        report['models'] = bench_training_and_inference(args.per_class, n_samples,
+                                                        args.batch_size, args.repeat)
+
+    if 'startup' in suites:
+        from rtl_ml import COMMANDS
+
+        print("⏱️  Command startup...", file=sys.stderr)
+        report['startup'] = bench_startup(args.commands or list(COMMANDS), args.repeat, model=args.startup_model)
+        failures = startup_failures(report['startup'], args.startup_budget)
+        report['startup_failures'] = failures
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(payload + '\n')
+        print(f"✅ Benchmark results saved: {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,63 +3,195 @@
 RTL-ML Validated Dataset Capture
 With visualization and decoder validation
 """
-from rtlsdr import RtlSdr
 import numpy as np
 from datetime import datetime
+import io
 import os
-from tqdm import tqdm
 import time
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
-from scipy import signal
-import subprocess
+from scipy import fft as sp_fft
 import json
+import argparse
+import queue
+import threading
+
+from iq_source import open_source
+from iq_dataset import CAPTURE_CODECS, iq_to_uint8, uint8_to_iq, pack_capture
+from dataset_manifest import DatasetManifest, capture_record, sync as sync_manifest
+from adaptive_capture import SettleDetector
+from spectrogram_render import render_spectrogram, render_thumbnails
+
+class SpectralContext:
+    """
+    Shared spectral analysis of a batch of captures.
+    
+    Instantaneous power, the full-length spectrum and the STFT are each
+    computed at most once, vectorized over every capture in the batch, and
+    read by all validators and the spectrogram plot. Captures are complex
+    IQ, so the spectrum is a two-sided complex FFT (kept in single
+    precision); the NOAA tone check needs its full-length bin resolution.
+    """
+    
+    def __init__(self, samples, sample_rate, nperseg=1024):
+        samples = np.asarray(samples)
+        self.samples = samples[np.newaxis] if samples.ndim == 1 else samples
+        self.sample_rate = sample_rate
+        self.nperseg = nperseg
+        self._cache = {}
+    
+    def __len__(self):
+        return self.samples.shape[0]
+    
+    @property
+    def n_samples(self):
+        return self.samples.shape[-1]
+    
+    def _cached(self, name, compute):
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+    
+    @property
+    def power(self):
+        """|x|^2 per sample, (n_captures, n_samples)"""
+        return self._cached('power', lambda: np.abs(self.samples) ** 2)
+    
+    @property
+    def spectrum(self):
+        """Full-length FFT of each capture, (n_captures, n_samples)"""
+        return self._cached('spectrum', lambda: sp_fft.fft(self.samples, axis=-1, workers=-1))
+    
+    @property
+    def spectrum_power(self):
+        """|FFT|^2 of each capture, (n_captures, n_samples)"""
+        return self._cached('spectrum_power', lambda: np.abs(self.spectrum) ** 2)
+    
+    @property
+    def fft_freqs(self):
+        """Frequency offset (Hz) of each spectrum bin, in FFT order"""
+        return self._cached('fft_freqs', lambda: sp_fft.fftfreq(self.n_samples, 1 / self.sample_rate))
+    
+    @property
+    def stft(self):
+        """(f, t, Sxx) spectrogram of every capture; Sxx is (n_captures, n_freqs, n_times)"""
+        from scipy import signal
+        
+        return self._cached('stft', lambda: signal.spectrogram(self.samples, fs=self.sample_rate,
+                                                               nperseg=self.nperseg, return_onesided=False,
+                                                               axis=-1))
+
+
+def capture_path(label, timestamp):
+    """Path of a saved capture relative to the dataset root"""
+    return f"{label}/{label}_{timestamp}.npy"
 
 class ValidatedSignalCapture:
-    def __init__(self):
-        self.sdr = RtlSdr()
-        self.sdr.sample_rate = 1.024e6
-        self.sdr.gain = 40
+    def __init__(self, source=None, settle_detector=None, storage='cu8', codec=None):
+        # Any iq_source.IQSource works here; default is the first RTL-SDR
+        self.sdr = source if source is not None else open_source('rtlsdr', sample_rate=1.024e6, gain=40)
+        # Without a detector, captures use the original fixed settle sleeps
+        self.settle_detector = settle_detector
+        # 'cu8' keeps the dongle's interleaved uint8 bytes (2 bytes/sample, optionally
+        # compressed with codec); 'complex' saves complex samples as before
+        if storage not in ('cu8', 'complex'):
+            raise ValueError(f"Unknown storage {storage!r}, expected 'cu8' or 'complex'")
+        if codec not in CAPTURE_CODECS:
+            raise ValueError(f"Unsupported codec {codec!r}, expected one of {CAPTURE_CODECS}")
+        self.storage = storage
+        self.codec = codec
         self.validation_results = {}
+        # One manifest per output directory, shared by the pipeline's writer threads
+        self._manifests = {}
+        self._manifest_lock = threading.Lock()
         print(f"Sample rate: {self.sdr.sample_rate/1e6:.3f} MSPS")
         print(f"Gain: {self.sdr.gain} dB")
     
     def capture_signal(self, frequency, duration=0.5):
         self.sdr.center_freq = frequency
-        time.sleep(0.05)
         num_samples = int(self.sdr.sample_rate * duration)
-        samples = self.sdr.read_samples(num_samples)
+        if self.settle_detector is not None:
+            self.settle_detector.settle(self.sdr)
+            return self._read(num_samples)
+        time.sleep(0.05)
+        samples = self._read(num_samples)
         time.sleep(0.2)
         return samples
     
-    def save_sample(self, samples, label, freq, output_dir='datasets_validated'):
+    def _read(self, num_samples):
+        # Raw reads skip pyrtlsdr's complex128 conversion; decoding is only for validation
+        if self.storage == 'cu8':
+            return uint8_to_iq(self.sdr.read_bytes(2 * num_samples))
+        return self.sdr.read_samples(num_samples)
+    
+    def manifest(self, output_dir='datasets_validated'):
+        """The dataset manifest of output_dir; a new one first indexes captures saved before it existed"""
+        with self._manifest_lock:
+            if output_dir not in self._manifests:
+                manifest = DatasetManifest(output_dir)
+                if not manifest.exists() and os.path.isdir(output_dir):
+                    sync_manifest(output_dir)
+                self._manifests[output_dir] = manifest
+            return self._manifests[output_dir]
+    
+    def save_sample(self, samples, label, freq, output_dir='datasets_validated', timestamp=None, raw=None):
+        """
+        Save one capture; with cu8 storage, raw (the dongle's bytes) is kept, else samples are re-packed
+        
+        The file is written under a temporary name and renamed into place,
+        then recorded (with its checksum) in the dataset manifest, so the
+        manifest never lists a partial file.
+        """
+        manifest = self.manifest(output_dir)
         os.makedirs(os.path.join(output_dir, label), exist_ok=True)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-        filename = f"{label}_{timestamp}.npy"
-        filepath = os.path.join(output_dir, label, filename)
+        if timestamp is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        relpath = capture_path(label, timestamp)
+        filepath = os.path.join(output_dir, *relpath.split('/'))
         
-        data = {
-            'samples': samples,
+        if self.storage == 'cu8':
+            raw = raw if raw is not None else iq_to_uint8(samples)
+            num_samples = len(raw) // 2
+            data = {'raw': pack_capture(raw, self.codec), 'format': 'cu8', 'codec': self.codec}
+        else:
+            num_samples = len(samples)
+            data = {'samples': samples}
+        
+        data.update({
             'center_freq': freq,
             'sample_rate': self.sdr.sample_rate,
             'timestamp': timestamp,
             'label': label,
-            'duration': len(samples) / self.sdr.sample_rate
-        }
+            'duration': num_samples / self.sdr.sample_rate
+        })
         
-        np.save(filepath, data)
+        buffer = io.BytesIO()
+        np.save(buffer, data)
+        blob = buffer.getvalue()
+        with open(filepath + '.tmp', 'wb') as f:
+            f.write(blob)
+        os.replace(filepath + '.tmp', filepath)
+        manifest.append(capture_record(relpath, data, blob))
+        return filepath
     
-    def generate_spectrogram(self, samples, label, freq, output_dir='visualizations'):
-        """Generate and save spectrogram visualization"""
+    def generate_spectrogram(self, samples, label, freq, output_dir='visualizations', context=None, fast=False):
+        """Generate and save spectrogram visualization (fast: headless NumPy renderer, no matplotlib)"""
         os.makedirs(output_dir, exist_ok=True)
+        if context is None:
+            context = SpectralContext(samples, self.sdr.sample_rate)
+        filepath = os.path.join(output_dir, f'{label}_spectrum.png')
+        if fast:
+            return render_spectrogram(samples, label, freq, filepath, context=context)
+        
+        # Imported here so headless/fast runs never load matplotlib
+        import matplotlib
+        matplotlib.use('Agg')  # Non-interactive backend
+        import matplotlib.pyplot as plt
         
         plt.figure(figsize=(12, 6))
         
         # Spectrogram
         plt.subplot(2, 1, 1)
-        f, t, Sxx = signal.spectrogram(samples, fs=self.sdr.sample_rate, nperseg=1024)
-        plt.pcolormesh(t, f/1e6, 10*np.log10(Sxx), shading='gouraud', cmap='viridis')
+        f, t, Sxx = context.stft
+        plt.pcolormesh(t, f/1e6, 10*np.log10(Sxx[0]), shading='gouraud', cmap='viridis')
         plt.ylabel('Frequency (MHz)')
         plt.xlabel('Time (s)')
         plt.title(f'{label} - Spectrogram - {freq/1e6:.2f} MHz')
@@ -67,106 +199,421 @@ class ValidatedSignalCapture:
         
         # FFT
         plt.subplot(2, 1, 2)
-        fft_vals = np.fft.fftshift(np.fft.fft(samples))
-        fft_freqs = np.fft.fftshift(np.fft.fftfreq(len(samples), 1/self.sdr.sample_rate))
-        plt.plot(fft_freqs/1e6, 10*np.log10(np.abs(fft_vals)**2))
+        fft_freqs = np.fft.fftshift(context.fft_freqs)
+        plt.plot(fft_freqs/1e6, 10*np.log10(np.fft.fftshift(context.spectrum_power[0])))
         plt.ylabel('Power (dB)')
         plt.xlabel('Frequency Offset (MHz)')
         plt.title(f'{label} - Power Spectral Density')
         plt.grid(True, alpha=0.3)
         
         plt.tight_layout()
-        filepath = os.path.join(output_dir, f'{label}_spectrum.png')
         plt.savefig(filepath, dpi=150)
         plt.close()
         
         return filepath
     
-    def validate_adsb(self, samples):
+    # Each validator takes a SpectralContext over a batch of captures and
+    # returns one result dict per capture
+    
+    def validate_adsb(self, context):
         """Validate ADS-B by checking for bursts"""
-        power = np.abs(samples) ** 2
-        mean_power = np.mean(power)
-        max_power = np.max(power)
+        power = context.power
+        mean_power = np.mean(power, axis=-1)
+        max_power = np.max(power, axis=-1)
         
         burst_ratio = max_power / (mean_power + 1e-10)
         
-        return {
-            'has_bursts': burst_ratio > 10,
-            'burst_ratio': float(burst_ratio),
-            'mean_power': float(mean_power),
+        return [{
+            'has_bursts': bool(burst_ratio[i] > 10),
+            'burst_ratio': float(burst_ratio[i]),
+            'mean_power': float(mean_power[i]),
             'note': 'ADS-B shows power bursts (>10x mean) from aircraft transponders'
-        }
+        } for i in range(len(context))]
     
-    def validate_noaa_apt(self, samples):
+    def validate_noaa_apt(self, context):
         """Validate NOAA APT by checking for sync tones"""
-        fft_vals = np.fft.fft(samples)
-        freqs = np.fft.fftfreq(len(samples), 1/self.sdr.sample_rate)
+        spectrum_power = context.spectrum_power
+        freqs = context.fft_freqs
         
         idx_2080 = np.argmin(np.abs(freqs - 2080))
         idx_2400 = np.argmin(np.abs(freqs - 2400))
         
-        power_2080 = np.abs(fft_vals[idx_2080]) ** 2
-        power_2400 = np.abs(fft_vals[idx_2400]) ** 2
-        total_power = np.sum(np.abs(fft_vals) ** 2)
+        power_2080 = spectrum_power[:, idx_2080]
+        power_2400 = spectrum_power[:, idx_2400]
+        total_power = np.sum(spectrum_power, axis=-1)
         
-        return {
-            'sync_tone_present': (power_2080 + power_2400) > total_power * 0.01,
-            'power_2080': float(power_2080),
-            'power_2400': float(power_2400),
+        return [{
+            'sync_tone_present': bool((power_2080[i] + power_2400[i]) > total_power[i] * 0.01),
+            'power_2080': float(power_2080[i]),
+            'power_2400': float(power_2400[i]),
             'note': 'NOAA APT uses 2080/2400 Hz sync tones'
-        }
+        } for i in range(len(context))]
     
-    def validate_ism(self, samples):
+    def validate_ism(self, context):
         """Validate ISM sensors by checking for bursts"""
-        power = np.abs(samples) ** 2
-        mean_power = np.mean(power)
-        max_power = np.max(power)
+        power = context.power
+        mean_power = np.mean(power, axis=-1)
+        max_power = np.max(power, axis=-1)
         
         burst_ratio = max_power / (mean_power + 1e-10)
         
-        return {
-            'has_activity': burst_ratio > 5,
-            'burst_ratio': float(burst_ratio),
+        return [{
+            'has_activity': bool(burst_ratio[i] > 5),
+            'burst_ratio': float(burst_ratio[i]),
             'note': 'ISM sensors show sporadic bursts from nearby devices'
-        }
+        } for i in range(len(context))]
     
-    def validate_fm(self, samples):
+    def validate_fm(self, context):
         """Validate FM by checking for wideband signal"""
-        fft_vals = np.abs(np.fft.fft(samples))
+        spectrum_power = context.spectrum_power
         
-        max_val = np.max(fft_vals)
-        threshold = max_val * 0.1
-        above_threshold = fft_vals > threshold
-        bandwidth = np.sum(above_threshold) * (self.sdr.sample_rate / len(samples))
+        # |X| > 0.1 * max|X|, compared on power so no square root is needed
+        threshold = np.max(spectrum_power, axis=-1, keepdims=True) * 0.01
+        above_threshold = spectrum_power > threshold
+        bandwidth = np.sum(above_threshold, axis=-1) * (context.sample_rate / context.n_samples)
         
-        return {
-            'is_wideband': bandwidth > 50e3,
-            'bandwidth_hz': float(bandwidth),
+        return [{
+            'is_wideband': bool(bandwidth[i] > 50e3),
+            'bandwidth_hz': float(bandwidth[i]),
             'note': 'FM broadcast is ~200 kHz wideband signal'
+        } for i in range(len(context))]
+    
+    def validate_snr(self, context):
+        """Peak-to-mean power ratio, for signals without a dedicated check"""
+        power = context.power
+        snr = 10 * np.log10(np.max(power, axis=-1) / (np.mean(power, axis=-1) + 1e-10))
+        return [{
+            'snr_db': float(snr[i]),
+            'note': f'Signal-to-noise ratio measurement'
+        } for i in range(len(context))]
+    
+    def validate_batch(self, captures, label):
+        """
+        Validate a batch of same-label captures at once.
+        
+        Args:
+            captures: (n_captures, n_samples) array, list of equal-length
+                captures, or a SpectralContext already built over them
+            label: Signal label, selects the validator
+        
+        Returns:
+            One validation dict per capture
+        """
+        if isinstance(captures, SpectralContext):
+            context = captures
+        else:
+            context = SpectralContext(captures, self.sdr.sample_rate)
+        validators = {
+            'ADS_B': self.validate_adsb,
+            'NOAA_APT': self.validate_noaa_apt,
+            'ISM_sensors': self.validate_ism,
+            'FM_broadcast': self.validate_fm,
         }
+        return validators.get(label, self.validate_snr)(context)
     
-    def validate_signal(self, samples, label):
+    def validate_signal(self, samples, label, context=None):
         """Route to appropriate validation function"""
-        if label == 'ADS_B':
-            return self.validate_adsb(samples)
-        elif label == 'NOAA_APT':
-            return self.validate_noaa_apt(samples)
-        elif label == 'ISM_sensors':
-            return self.validate_ism(samples)
-        elif label == 'FM_broadcast':
-            return self.validate_fm(samples)
-        else:
-            power = np.abs(samples) ** 2
-            snr = 10 * np.log10(np.max(power) / (np.mean(power) + 1e-10))
-            return {
-                'snr_db': float(snr),
-                'note': f'Signal-to-noise ratio measurement'
-            }
+        if context is None:
+            context = SpectralContext(samples, self.sdr.sample_rate)
+        return self.validate_batch(context, label)[0]
     
     def close(self):
         self.sdr.close()
 
+
+class BatchValidator:
+    """
+    Validates every capture, batch_size same-label captures at a time.
+    
+    add() queues a capture and validates its label's batch once full;
+    flush() validates what is left. Results are kept per label in capture
+    order, tagged with the capture timestamp (which names the saved file).
+    With thumbnail_dir, every capture also gets a small spectrogram image
+    (<thumbnail_dir>/<label>/<label>_<timestamp>.png) rendered from the
+    same spectral context. With output_dir, each result is also recorded
+    against the saved capture in that dataset's manifest.
+    """
+    
+    def __init__(self, capture, batch_size=8, thumbnail_dir=None, output_dir=None):
+        self.capture = capture
+        self.batch_size = batch_size
+        self.thumbnail_dir = thumbnail_dir
+        self.output_dir = output_dir
+        self.results = {}
+        self._pending = {}
+    
+    def add(self, samples, label, timestamp=None, freq=None):
+        pending = self._pending.setdefault(label, [])
+        pending.append((samples, timestamp, freq))
+        if len(pending) >= self.batch_size:
+            self.flush(label)
+    
+    def flush(self, label=None):
+        for label in ([label] if label is not None else list(self._pending)):
+            pending = self._pending.pop(label, [])
+            validations = [None] * len(pending)
+            # Captures of one label normally share a length; a short one is validated on its own
+            for length in sorted({len(item[0]) for item in pending}):
+                indices = [i for i, item in enumerate(pending) if len(item[0]) == length]
+                group = [pending[i] for i in indices]
+                context = SpectralContext(np.stack([samples for samples, _, _ in group]),
+                                          self.capture.sdr.sample_rate)
+                for i, validation in zip(indices, self.capture.validate_batch(context, label)):
+                    validations[i] = validation
+                if self.thumbnail_dir is not None:
+                    render_thumbnails(context, [label] * len(group), [freq for _, _, freq in group],
+                                      [os.path.join(self.thumbnail_dir, label, f"{label}_{timestamp}.png")
+                                       for _, timestamp, _ in group])
+            # Results stay in capture order whatever the length grouping
+            for (_, timestamp, _), validation in zip(pending, validations):
+                validation.pop('note', None)
+                self.results.setdefault(label, []).append(dict(validation, timestamp=timestamp))
+                if self.output_dir is not None and timestamp is not None:
+                    self.capture.manifest(self.output_dir).update(capture_path(label, timestamp),
+                                                                  validation=validation)
+    
+    def summary(self, label):
+        """Capture count, how many passed their label's check (None if it has none) and per-capture results"""
+        results = self.results.get(label, [])
+        checks = [next((v for v in r.values() if isinstance(v, bool)), None) for r in results]
+        passed = sum(bool(c) for c in checks) if results and None not in checks else None
+        return {'validated': len(results), 'passed': passed, 'captures': results}
+
+
+class StageStats:
+    """Item count, busy time and byte volume for one pipeline stage."""
+    
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.bytes = 0
+        self._lock = threading.Lock()
+    
+    def record(self, started, nbytes=0):
+        with self._lock:
+            self.items += 1
+            self.busy += time.perf_counter() - started
+            self.bytes += nbytes
+    
+    def summary(self, wall_time):
+        return {
+            'items': self.items,
+            'busy_s': round(self.busy, 3),
+            'items_per_s': round(self.items / wall_time, 2) if wall_time else 0.0,
+            'mb_per_s': round(self.bytes / 1e6 / wall_time, 2) if wall_time else 0.0,
+        }
+
+
+class PipelinedCapture:
+    """
+    Capture pipeline: reader -> writer pool + validator + plotter.
+    
+    The reader tunes once per frequency, settles once and streams
+    back-to-back captures; writers persist them in the background and the
+    validator checks every capture in batches, plus the visualization
+    capture of each class. Writer and validator queues are bounded; the
+    per-class spectrograms go to their own unbounded queue, so a slow
+    (matplotlib) render never holds up the reader.
+    """
+    
+    def __init__(self, capture, output_dir='datasets_validated', writers=2, queue_size=16, settle=0.05,
+                 fast_plots=True, thumbnail_dir=None):
+        self.capture = capture
+        self.output_dir = output_dir
+        self.fast_plots = fast_plots
+        self.writers = writers
+        self.settle = settle
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.validate_queue = queue.Queue(maxsize=queue_size)
+        self.plot_queue = queue.Queue()
+        self.batch_validator = BatchValidator(capture, thumbnail_dir=thumbnail_dir, output_dir=output_dir)
+        self.stats = {name: StageStats(name) for name in ('read', 'write', 'validate', 'plot')}
+        self.validation_summary = {}
+        self.errors = []
+    
+    def _stream_captures(self, freq, count, num_samples):
+        """
+        Yield count back-to-back (samples, raw) captures of num_samples from one continuous stream.
+        
+        With cu8 storage the stream is the dongle's raw bytes and samples are
+        decoded to complex64 from them; otherwise raw is None.
+        """
+        raw_storage = self.capture.storage == 'cu8'
+        block_len = 2 * num_samples if raw_storage else num_samples
+        sdr = self.capture.sdr
+        sdr.center_freq = freq
+        if self.capture.settle_detector is not None:
+            self.capture.settle_detector.settle(sdr)
+        else:
+            time.sleep(self.settle)
+        blocks = queue.Queue()
+        
+        received = [0]
+        
+        def on_block(block):
+            # Short blocks only happen at the end of a replay
+            if len(block) < block_len or received[0] >= count:
+                return
+            blocks.put(np.array(block))
+            received[0] += 1
+            if received[0] >= count:
+                sdr.stop()
+        
+        def read():
+            try:
+                if raw_storage:
+                    sdr.stream_bytes(on_block, block_len)
+                else:
+                    sdr.stream(on_block, block_len)
+            finally:
+                blocks.put(None)
+        
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        for _ in range(count):
+            block = blocks.get()
+            if block is None:
+                break
+            yield (uint8_to_iq(block), block) if raw_storage else (block, None)
+        reader.join()
+    
+    def _writer(self):
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                return
+            samples, raw, label, freq, timestamp = item
+            started = time.perf_counter()
+            try:
+                self.capture.save_sample(samples, label, freq, self.output_dir, timestamp=timestamp, raw=raw)
+            except Exception as e:
+                self.errors.append(f"write {label}: {e}")
+            self.stats['write'].record(started, raw.nbytes if raw is not None else samples.nbytes)
+    
+    def _validator(self):
+        while True:
+            item = self.validate_queue.get()
+            if item is None:
+                break
+            kind, samples, label, freq, timestamp = item
+            started = time.perf_counter()
+            try:
+                if kind == 'capture':
+                    self.batch_validator.add(samples, label, timestamp, freq)
+                else:
+                    # One context feeds both the plot and the visualization capture's validation
+                    context = SpectralContext(samples, self.capture.sdr.sample_rate)
+                    self.plot_queue.put((samples, label, freq, context))
+                    self.validation_summary[label] = self.capture.validate_signal(samples, label, context=context)
+            except Exception as e:
+                self.errors.append(f"validate {label}: {e}")
+            self.stats['validate'].record(started, samples.nbytes)
+        try:
+            self.batch_validator.flush()
+        except Exception as e:
+            self.errors.append(f"validate: {e}")
+        for label, validation in self.validation_summary.items():
+            validation['captures'] = self.batch_validator.summary(label)
+        self.plot_queue.put(None)
+    
+    def _plotter(self):
+        # Single thread: matplotlib's pyplot state is not thread-safe
+        while True:
+            item = self.plot_queue.get()
+            if item is None:
+                return
+            samples, label, freq, context = item
+            started = time.perf_counter()
+            try:
+                self.capture.generate_spectrogram(samples, label, freq, context=context, fast=self.fast_plots)
+            except Exception as e:
+                self.errors.append(f"plot {label}: {e}")
+            self.stats['plot'].record(started, samples.nbytes)
+    
+    def run(self, signals, samples_per_class=30, duration=0.5, vis_duration=1.0):
+        """Capture every signal; returns the validation summary."""
+        from tqdm import tqdm
+        
+        threads = [threading.Thread(target=self._writer, daemon=True) for _ in range(self.writers)]
+        threads.append(threading.Thread(target=self._validator, daemon=True))
+        threads.append(threading.Thread(target=self._plotter, daemon=True))
+        for thread in threads:
+            thread.start()
+        
+        sample_rate = self.capture.sdr.sample_rate
+        num_samples = int(sample_rate * duration)
+        vis_captures = max(1, int(round(vis_duration / duration)))
+        start = time.perf_counter()
+        for signal_def in signals:
+            label, freq = signal_def['label'], signal_def['freq']
+            vis_parts = []
+            stream = self._stream_captures(freq, samples_per_class, num_samples)
+            started = time.perf_counter()
+            for samples, raw in tqdm(stream, total=samples_per_class, desc=f"   {label:13s}"):
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+                # The visualization capture is stitched from the first captures, not re-recorded
+                if len(vis_parts) < vis_captures:
+                    vis_parts.append(samples)
+                    if len(vis_parts) == vis_captures:
+                        self.validate_queue.put(('visual', np.concatenate(vis_parts), label, freq, None))
+                self.write_queue.put((samples, raw, label, freq, timestamp))
+                self.validate_queue.put(('capture', samples, label, freq, timestamp))
+                self.stats['read'].record(started, raw.nbytes if raw is not None else samples.nbytes)
+                started = time.perf_counter()
+            if vis_parts and len(vis_parts) < vis_captures:
+                self.validate_queue.put(('visual', np.concatenate(vis_parts), label, freq, None))
+        
+        for _ in range(self.writers):
+            self.write_queue.put(None)
+        self.validate_queue.put(None)
+        for thread in threads:
+            thread.join()
+        self.wall_time = time.perf_counter() - start
+        self.capture_time = len(signals) * samples_per_class * duration
+        return self.validation_summary
+    
+    def report(self):
+        """Per-stage throughput plus wall time against the sum of capture durations."""
+        return {
+            'wall_time_s': round(self.wall_time, 2),
+            'capture_time_s': round(self.capture_time, 2),
+            'stages': {name: stats.summary(self.wall_time) for name, stats in self.stats.items()},
+            'errors': self.errors,
+        }
+
+
+def print_capture_checks(captures):
+    if captures['passed'] is not None:
+        print(f"      🔎 {captures['passed']}/{captures['validated']} captures pass the check")
+    else:
+        print(f"      🔎 {captures['validated']} captures measured")
+
+
 def main():
+    parser = argparse.ArgumentParser(description='RTL-ML validated dataset capture')
+    parser.add_argument('--source', default='rtlsdr',
+                        help='rtlsdr[:INDEX], replay:PATH, replay-realtime:PATH or synthetic')
+    parser.add_argument('--samples-per-class', type=int, default=30)
+    parser.add_argument('--duration', type=float, default=0.5, help='Capture length (s)')
+    parser.add_argument('--writers', type=int, default=2, help='Background writer threads')
+    parser.add_argument('--sequential', action='store_true',
+                        help='Original capture/settle/save loop instead of the pipeline')
+    parser.add_argument('--adaptive-settle', action='store_true',
+                        help='Detect tuner settling from signal power instead of fixed sleeps')
+    plots = parser.add_mutually_exclusive_group()
+    plots.add_argument('--fast-plots', dest='fast_plots', action='store_true',
+                       help='Render spectrograms with the headless NumPy renderer (default)')
+    plots.add_argument('--matplotlib-plots', dest='fast_plots', action='store_false',
+                       help='Render spectrograms with matplotlib (seconds per plot)')
+    parser.set_defaults(fast_plots=True)
+    parser.add_argument('--storage', choices=['cu8', 'complex'], default='cu8',
+                        help='cu8: raw 8-bit IQ as read from the dongle (8x smaller than complex128)')
+    parser.add_argument('--compress', action='store_true', help='zlib-compress cu8 captures')
+    parser.add_argument('--thumbnails', metavar='DIR',
+                        help='Also render a spectrogram thumbnail of every capture into DIR/<label>/')
+    args = parser.parse_args()
+    
     print("="*70)
     print("RTL-ML VALIDATED DATASET CAPTURE")
     print("With Visualization & Decoder Validation")
@@ -183,7 +630,7 @@ def main():
         {'label': 'noise', 'freq': 145.0e6, 'desc': '📊 Noise Baseline'},
     ]
     
-    samples_per_class = 30
+    samples_per_class = args.samples_per_class
     
     print(f"\n📊 Capture Plan:")
     print(f"   - {samples_per_class} samples per class (for ML training)")
@@ -191,10 +638,29 @@ def main():
     print(f"   - Signal validation (check for expected characteristics)")
     print(f"\nTotal: {len(signals) * samples_per_class} samples + 8 spectrograms\n")
     
-    capture = ValidatedSignalCapture()
+    capture = ValidatedSignalCapture(open_source(args.source, sample_rate=1.024e6, gain=40),
+                                     settle_detector=SettleDetector() if args.adaptive_settle else None,
+                                     storage=args.storage, codec='zlib' if args.compress else None)
     validation_summary = {}
+    batch_validator = BatchValidator(capture, thumbnail_dir=args.thumbnails, output_dir='datasets_validated')
+    
+    if not args.sequential:
+        print(f"   📦 Pipelined capture ({args.writers} writers)...")
+        pipeline = PipelinedCapture(capture, writers=args.writers, fast_plots=args.fast_plots,
+                                    thumbnail_dir=args.thumbnails)
+        validation_summary = pipeline.run(signals, samples_per_class, duration=args.duration)
+        report = pipeline.report()
+        print(f"\n   ⏱️  {report['wall_time_s']:.1f} s wall time for {report['capture_time_s']:.1f} s of captures")
+        for name, stage in report['stages'].items():
+            print(f"      {name:9s} {stage['items']:5d} items  {stage['items_per_s']:7.2f}/s  "
+                  f"{stage['mb_per_s']:7.1f} MB/s  busy {stage['busy_s']:.1f} s")
+        for error in report['errors']:
+            print(f"      ⚠️  {error}")
+        for label, validation in validation_summary.items():
+            print(f"   {label}:")
+            print_capture_checks(validation['captures'])
     
-    for signal_def in signals:
+    for signal_def in (signals if args.sequential else []):
         label = signal_def['label']
         freq = signal_def['freq']
         desc = signal_def['desc']
@@ -203,16 +669,22 @@ def main():
         print(f"   Frequency: {freq/1e6:.2f} MHz")
         
         print(f"   📦 Capturing {samples_per_class} samples...")
+        from tqdm import tqdm
         for i in tqdm(range(samples_per_class), desc="   Progress"):
-            samples = capture.capture_signal(freq)
-            capture.save_sample(samples, label, freq)
+            samples = capture.capture_signal(freq, duration=args.duration)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            capture.save_sample(samples, label, freq, timestamp=timestamp)
+            batch_validator.add(samples, label, timestamp, freq)
+        batch_validator.flush(label)
         
         print(f"   📊 Generating spectrogram...")
         vis_samples = capture.capture_signal(freq, duration=1.0)
-        spec_path = capture.generate_spectrogram(vis_samples, label, freq)
+        context = SpectralContext(vis_samples, capture.sdr.sample_rate)
+        spec_path = capture.generate_spectrogram(vis_samples, label, freq, context=context, fast=args.fast_plots)
         
         print(f"   ✅ Validating signal...")
-        validation = capture.validate_signal(vis_samples, label)
+        validation = capture.validate_signal(vis_samples, label, context=context)
+        validation['captures'] = batch_validator.summary(label)
         validation_summary[label] = validation
         
         if label == 'ADS_B' and validation.get('has_bursts'):
@@ -226,6 +698,7 @@ def main():
         else:
             snr = validation.get('snr_db', 0)
             print(f"      📊 SNR: {snr:.1f} dB")
+        print_capture_checks(validation['captures'])
         
         print(f"   ✅ Complete: {samples_per_class} samples + spectrogram saved")
     
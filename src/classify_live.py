@@ -3,88 +3,194 @@
 RTL-ML Live Classification Script
 Real-time signal identification using trained model
 """
-from rtlsdr import RtlSdr
 import numpy as np
+import os
 import pickle
 import time
+import argparse
 
+from signal_features import StreamingFeatureExtractor
+from front_end import FeatureSchemaError, model_front_end, model_spectrum, model_extractor, check_model_schema
+from stream_classify import StreamingClassifier, predict_batch, model_class_names
+from iq_source import open_source
+from lite_model import load_lite_model
+from profiling import profiler
+from adaptive_capture import SettleDetector, adaptive_classify
+from model_store import ModelReloader
 
-class SignalFeatureExtractor:
-    """Extract ML features from IQ signal data"""
-    
-    def extract_features(self, iq_samples):
-        """Extract comprehensive feature set from IQ samples"""
-        samples = np.array(iq_samples)
-        i_signal = np.real(samples)
-        q_signal = np.imag(samples)
-        features = []
-        power = np.abs(samples) ** 2
-        features.extend([np.mean(power), np.std(power), np.max(power), np.min(power), np.median(power)])
-        fft = np.fft.fft(samples)
-        fft_mag = np.abs(fft)
-        fft_power = fft_mag ** 2
-        features.extend([np.mean(fft_power), np.std(fft_power), np.max(fft_power), np.sum(fft_power)])
-        freqs = np.fft.fftfreq(len(samples))
-        spectral_centroid = np.sum(freqs * fft_power) / np.sum(fft_power)
-        features.append(spectral_centroid)
-        features.extend([np.mean(i_signal), np.std(i_signal), np.mean(q_signal), np.std(q_signal)])
-        phase = np.angle(samples)
-        features.extend([np.mean(phase), np.std(phase)])
-        inst_freq = np.diff(np.unwrap(phase))
-        features.extend([np.mean(inst_freq), np.std(inst_freq)])
-        return np.array(features)
+CHUNK_NEEDS_WELCH = ("--chunk computes Welch-averaged FFT features, which only models trained on them "
+                     "accept; retrain with train_validated.py --spectrum welch")
 
-def load_model():
-    """Load trained classifier"""
-    with open('rtl_classifier.pkl', 'rb') as f:
-        model_data = pickle.load(f)
+def model_files(path, prefer_lite=True):
+    """Files load_model(path, prefer_lite) may read: path, plus the sibling lite export of a .pkl"""
+    if prefer_lite and path.endswith('.pkl'):
+        return path, path[:-len('.pkl')] + '.npz'
+    return (path,)
+
+def load_model(path='rtl_classifier.pkl', prefer_lite=True):
+    """Load trained classifier (.npz lite export avoids importing scikit-learn)
+    
+    With prefer_lite, a lite export with the same stem next to a .pkl
+    (as train_validated.py --export writes it) is loaded instead when it is
+    at least as new, so cold starts never unpickle scikit-learn.
+    
+    The model's feature schema is checked against this extractor
+    (front_end.check_model_schema); a mismatch raises FeatureSchemaError
+    here rather than producing wrong features later.
+    """
+    candidates = model_files(path, prefer_lite)
+    if len(candidates) > 1:
+        lite_path = candidates[1]
+        if os.path.exists(lite_path) and os.path.getmtime(lite_path) >= os.path.getmtime(path):
+            path = lite_path
+    if path.endswith('.npz'):
+        model_data = load_lite_model(path)
+    else:
+        with open(path, 'rb') as f:
+            model_data = pickle.load(f)
+    check_model_schema(model_data)
     return model_data
 
-def classify_signal(sdr, model_data, frequency, duration=0.5):
-    """Capture and classify a signal"""
+def classify_signal(sdr, model_data, frequency, duration=0.5, chunk_duration=None):
+    """Capture and classify a signal
+    
+    With chunk_duration set, the capture is read and reduced chunk by chunk
+    (StreamingFeatureExtractor), so memory stays constant for 10-60 s captures.
+    Chunk-wise FFT features are Welch averages, so this needs a model trained
+    on them (train_validated.py --spectrum welch, full rate); any other model
+    raises FeatureSchemaError. Otherwise captures go through the model's DDC
+    front end first.
+    """
     # Set frequency
-    sdr.center_freq = frequency
-    time.sleep(0.1)  # Let tuner settle
+    with profiler.stage('tune'):
+        sdr.center_freq = frequency
+    with profiler.stage('settle'):
+        time.sleep(0.1)  # Let tuner settle
     
-    # Capture samples
     num_samples = int(sdr.sample_rate * duration)
-    samples = sdr.read_samples(num_samples)
+    if chunk_duration:
+        if model_spectrum(model_data) != 'welch':
+            raise FeatureSchemaError(CHUNK_NEEDS_WELCH)
+        check_model_schema(model_data, sdr.sample_rate)
+        extractor = StreamingFeatureExtractor(sdr.sample_rate)
+        chunk_samples = int(sdr.sample_rate * chunk_duration)
+        remaining = num_samples
+        while remaining > 0:
+            with profiler.stage('read_samples'):
+                chunk = sdr.read_samples(min(chunk_samples, remaining))
+            with profiler.stage('extract'):
+                extractor.update(chunk)
+            remaining -= chunk_samples
+        features = extractor.features()[np.newaxis, :]
+    else:
+        # Capture samples, then extract features (single-row batch through the shared engine)
+        with profiler.stage('read_samples'):
+            samples = sdr.read_samples(num_samples)
+        with profiler.stage('extract'):
+            extractor = model_extractor(model_data, sdr.sample_rate)
+            features = extractor.extract_batch(samples[np.newaxis, :])
+    profiler.count('samples_read', num_samples)
     
-    # Extract features
-    features = model_data['feature_extractor'].extract_features(samples)
-    features_scaled = model_data['scaler'].transform([features])
+    # Classify (probabilities are None for models without predict_proba)
+    labels, probabilities = predict_batch(model_data, features)
     
-    # Classify
-    prediction = model_data['model'].predict(features_scaled)[0]
-    probabilities = None
+    return labels[0], probabilities[0] if probabilities is not None else None
+
+def classify_frequencies(sdr, model_data, frequencies, duration=0.5, client=None):
+    """Capture every frequency, then extract and classify them as one batch
+    
+    One extract_batch and one predict call cover the whole list. With a
+    model_server.ModelClient, the server classifies the batch and
+    model_data may be None (the server reports its model's front end).
     
-    # Get probabilities if available
-    if hasattr(model_data['model'], 'predict_proba'):
-        probabilities = model_data['model'].predict_proba(features_scaled)[0]
+    Returns:
+        [(frequency, label, probabilities or None), ...]
+    """
+    num_samples = int(sdr.sample_rate * duration)
+    captures = np.empty((len(frequencies), num_samples), dtype=np.complex64)
+    for i, frequency in enumerate(frequencies):
+        with profiler.stage('tune'):
+            sdr.center_freq = frequency
+        with profiler.stage('settle'):
+            time.sleep(0.1)  # Let tuner settle
+        with profiler.stage('read_samples'):
+            captures[i] = sdr.read_samples(num_samples)
+    profiler.count('samples_read', num_samples * len(frequencies))
+    if client is not None:
+        # Extract here as the served model expects (its front end and feature kind)
+        health = client.health()
+        extractor = model_extractor({key: health.get(key) for key in ('front_end', 'feature_kind', 'stft')
+                                     if health.get(key) is not None}, sdr.sample_rate)
+    else:
+        extractor = model_extractor(model_data, sdr.sample_rate)
+    with profiler.stage('extract'):
+        features = extractor.extract_batch(captures)
+    if client is not None:
+        labels, probabilities = client.classify(features)
+    else:
+        labels, probabilities = predict_batch(model_data, features)
+    return [(frequency, labels[i], probabilities[i] if probabilities is not None else None)
+            for i, frequency in enumerate(frequencies)]
+
+def stream_signal(source, model_data, window=0.5, overlap=0.5, reloader=None):
+    """Continuously classify one source, printing a timestamped label stream
     
-    class_name = model_data['class_names'][prediction]
+    With a ModelReloader, a model file replaced on disk is swapped in between batches.
+    """
+    pipeline = StreamingClassifier(source, model_data, window_duration=window, overlap=overlap)
+    pipeline.start()
+    try:
+        for result in pipeline.results():
+            if reloader is not None and reloader.poll() is not None:
+                pipeline.model_data = reloader.model_data
+                print(f"   🔄 Reloaded model (version {reloader.model_data.get('version', '?')})")
+            stamp = time.strftime('%H:%M:%S', time.localtime(result.timestamp))
+            stamp += f".{int(result.timestamp * 1000) % 1000:03d}"
+            confidence = f" ({result.confidence*100:.1f}%)" if result.confidence is not None else ""
+            print(f"   {stamp}  {result.label}{confidence}")
+    except KeyboardInterrupt:
+        pipeline.stop()
+        for _ in pipeline.results():
+            pass
     
-    return class_name, probabilities
+    stats = pipeline.stats
+    print(f"\n   Blocks: {stats['blocks']}  Windows: {stats['windows']}  Results: {stats['results']}")
+    print(f"   Dropped blocks: {stats['dropped_blocks']}  Dropped results: {stats['dropped_results']}")
+    return stats
 
-def main():
+def run(args):
+    """Load the model and run the test sweep or --stream"""
     print("="*60)
     print("RTL-ML LIVE SIGNAL CLASSIFIER")
     print("="*60)
     
     # Load model
     print("\n📦 Loading trained model...")
-    model_data = load_model()
+    model_data = load_model(args.model)
+    reloader = (ModelReloader(args.model, load_model, model_data, watch=model_files(args.model))
+                if args.reload else None)
+    
     print(f"   Model: {type(model_data['model']).__name__}")
-    print(f"   Classes: {', '.join(model_data['class_names'])}")
+    print(f"   Classes: {', '.join(model_class_names(model_data))}")
+    print(f"   Front end: {model_front_end(model_data)}")
+    if args.chunk and model_spectrum(model_data) != 'welch':
+        raise SystemExit(f"❌ {CHUNK_NEEDS_WELCH}")
     
     # Initialize SDR
-    print("\n📡 Initializing RTL-SDR...")
-    sdr = RtlSdr()
-    sdr.sample_rate = 1.024e6
-    sdr.gain = 40
+    print(f"\n📡 Initializing source: {args.source}")
+    sdr = open_source(args.source, sample_rate=1.024e6, gain=40)
     print(f"   Sample rate: {sdr.sample_rate/1e6:.3f} MSPS")
     print(f"   Gain: {sdr.gain} dB")
     
+    if args.stream:
+        print(f"\n📻 Streaming {args.freq/1e6:.3f} MHz (Ctrl+C to stop)")
+        try:
+            sdr.center_freq = args.freq
+            stream_signal(sdr, model_data, window=args.window, overlap=args.overlap, reloader=reloader)
+        finally:
+            sdr.close()
+        return
+    
     # Test frequencies
     test_freqs = [
         (98.7e6, "Rock FM"),
@@ -93,26 +199,39 @@ def main():
         (145.0e6, "Empty (noise)")
     ]
     
+    settle_detector = SettleDetector() if args.adaptive else None
+    
     print("\n" + "="*60)
     print("🔍 TESTING CLASSIFICATION")
     print("="*60)
     
     for freq, label in test_freqs:
+        if reloader is not None and reloader.poll() is not None:
+            model_data = reloader.model_data
+            print(f"\n🔄 Reloaded model (version {model_data.get('version', '?')})")
         print(f"\n📻 {label} ({freq/1e6:.1f} MHz)")
         print(f"   Capturing...")
         
-        class_name, probs = classify_signal(sdr, model_data, freq)
+        if args.adaptive:
+            result = adaptive_classify(sdr, model_data, freq, settle_detector, min_duration=args.min_duration,
+                                       max_duration=args.duration, confidence=args.confidence)
+            class_name, probs = result.label, result.probabilities
+            stop = "early stop" if result.early_stop else "full length"
+            print(f"   ⏱️  Settled in {result.settle_time*1e3:.0f} ms, captured {result.duration*1e3:.0f} ms ({stop})")
+        else:
+            class_name, probs = classify_signal(sdr, model_data, freq, duration=args.duration,
+                                                chunk_duration=args.chunk)
         
         print(f"   ✅ Predicted: {class_name}")
         
         if probs is not None:
             print(f"   Confidence:")
-            for i, prob in enumerate(probs):
-                class_label = model_data['class_names'][i]
+            for class_label, prob in zip(model_class_names(model_data), probs):
                 bar = "█" * int(prob * 20)
                 print(f"      {class_label:15s}: {bar:20s} {prob*100:.1f}%")
         
-        time.sleep(0.2)
+        if not args.adaptive:
+            time.sleep(0.2)
     
     # Close SDR
     sdr.close()
@@ -121,5 +240,57 @@ def main():
     print("✅ CLASSIFICATION COMPLETE!")
     print("="*60)
 
+def main():
+    parser = argparse.ArgumentParser(description='RTL-ML live signal classifier')
+    parser.add_argument('--model', default='rtl_classifier.pkl',
+                        help='Trained model pickle, .npz lite export for fast startup, or train_stft.py .npz')
+    parser.add_argument('--source', default='rtlsdr',
+                        help='rtlsdr[:INDEX], replay:PATH, replay-realtime:PATH or synthetic')
+    parser.add_argument('--stream', action='store_true',
+                        help='Continuously classify --freq instead of the test sweep')
+    parser.add_argument('--freq', type=float, default=98.7e6, help='Frequency for --stream (Hz)')
+    parser.add_argument('--duration', type=float, default=0.5, help='Capture length per frequency (s)')
+    parser.add_argument('--chunk', type=float, metavar='SECONDS',
+                        help='Read long captures in chunks of this length (constant memory; needs a --spectrum welch model)')
+    parser.add_argument('--window', type=float, default=0.5, help='Stream window length (s)')
+    parser.add_argument('--overlap', type=float, default=0.5, help='Stream window overlap fraction')
+    parser.add_argument('--reload', action='store_true',
+                        help='Hot-reload --model when it is replaced on disk (e.g. by train_incremental.py)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Detect tuner settling and stop capturing once confident (--duration is the maximum)')
+    parser.add_argument('--confidence', type=float, default=0.9, help='Early-stop confidence for --adaptive')
+    parser.add_argument('--min-duration', type=float, default=0.2, help='Shortest --adaptive capture (s)')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Write cProfile stats here and print per-stage latency percentiles')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='Periodically dump stage latencies, counters and queue depths (.prom or .json)')
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help='Seconds between --metrics dumps')
+    args = parser.parse_args()
+    
+    if args.profile or args.metrics:
+        profiler.enable()
+    if args.metrics:
+        profiler.start_periodic_dump(args.metrics, args.metrics_interval)
+    if args.profile:
+        import cProfile
+        
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+    try:
+        run(args)
+    finally:
+        if args.profile:
+            cprofile.disable()
+            cprofile.dump_stats(args.profile)
+            print("\n⏱️  Stage latencies:")
+            print(profiler.report())
+            print("\n   Top functions by cumulative time:")
+            import pstats
+            pstats.Stats(cprofile).sort_stats('cumulative').print_stats(15)
+            print(f"   cProfile stats saved: {args.profile} (python -m pstats {args.profile})")
+        if args.metrics:
+            profiler.stop_periodic_dump()
+            profiler.dump(args.metrics)
+
 if __name__ == '__main__':
     main()
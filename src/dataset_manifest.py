@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Dataset Manifest
+Append-only index of a per-capture .npy tree, so captures can be counted, selected and verified without
+walking directories or opening IQ files
+
+Layout:
+    <root>/.manifest.jsonl   one JSON object per line:
+        {"path": "<label>/<file>.npy", "label", "center_freq", "sample_rate", "length", "duration",
+         "timestamp", "format", "codec", "size", "checksum"}      a capture (save_sample appends it)
+        {"path": ..., "validation": {...}}                         later fields for that capture
+        {"path": ..., "deleted": true}                             capture removed
+
+Lines are merged in order (later fields win). A line torn by a crash is
+skipped, and a manifest older than any class directory is not trusted
+(list_npy_captures falls back to walking the tree); `sync` brings it up
+to date.
+"""
+import numpy as np
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+MANIFEST_NAME = '.manifest.jsonl'
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S_%f'
+
+
+def checksum(blob):
+    """Checksum of a capture file's bytes (CRC-32: cheap enough to verify a whole SD card)."""
+    return f"crc32:{zlib.crc32(blob):08x}"
+
+
+def file_checksum(path, block_size=1 << 20):
+    crc = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            crc = zlib.crc32(block, crc)
+    return f"crc32:{crc:08x}"
+
+
+def capture_record(relpath, data, blob):
+    """Manifest record for a capture dict (as saved by capture_validated.py) and its file bytes."""
+    sample_rate = float(data.get('sample_rate', 1.024e6))
+    if 'duration' in data:
+        length = int(round(data['duration'] * sample_rate))
+    else:
+        length = len(data['samples']) if 'samples' in data else len(data['raw']) // 2
+    return {
+        'path': relpath.replace(os.sep, '/'),
+        'label': data.get('label', relpath.split('/')[0]),
+        'center_freq': float(data['center_freq']),
+        'sample_rate': sample_rate,
+        'length': length,
+        'duration': length / sample_rate,
+        'timestamp': data.get('timestamp'),
+        'format': data.get('format', 'complex'),
+        'codec': data.get('codec'),
+        'size': len(blob),
+        'checksum': checksum(blob),
+    }
+
+
+def parse_timestamp(value):
+    """Capture timestamp ('%Y%m%d_%H%M%S_%f') or ISO date/time -> datetime (None if unparseable)."""
+    if value is None or isinstance(value, datetime):
+        return value
+    for parse in (lambda v: datetime.strptime(v, TIMESTAMP_FORMAT), datetime.fromisoformat):
+        try:
+            return parse(str(value))
+        except ValueError:
+            continue
+    return None
+
+
+def validation_passed(validation):
+    """The label's boolean check in a validation dict (None if there is none), as BatchValidator counts it."""
+    return next((v for v in (validation or {}).values() if isinstance(v, bool)), None)
+
+
+def _sort_key(record):
+    # Label directory, then file name: the order of a sorted directory walk
+    return tuple(record['path'].split('/', 1))
+
+
+class DatasetManifest:
+    """
+    The manifest of one .npy capture tree.
+
+    Appends are serialized by a lock (the capture pipeline saves from
+    several writer threads) and each is one write of a whole line to a file
+    opened for append.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._records = None
+        self._checked_tail = False
+        self.skipped_lines = 0
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _load(self):
+        records = {}
+        self.skipped_lines = 0
+        if self.exists():
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A write torn by a crash; everything after it is intact
+                        self.skipped_lines += 1
+                        continue
+                    if entry.get('deleted'):
+                        records.pop(entry['path'], None)
+                    else:
+                        records.setdefault(entry['path'], {}).update(entry)
+        return records
+
+    @property
+    def records(self):
+        """path -> merged record, for every capture in the manifest."""
+        if self._records is None:
+            self._records = self._load()
+        return self._records
+
+    def reload(self):
+        self._records = None
+        return self
+
+    def append(self, entry):
+        """Append one line; entry['path'] is relative to the root."""
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            if not self._checked_tail:
+                # Never glue a new line onto a torn one
+                if os.path.exists(self.path) and os.path.getsize(self.path):
+                    with open(self.path, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b'\n':
+                            line = '\n' + line
+                self._checked_tail = True
+            with open(self.path, 'a') as f:
+                f.write(line)
+            if self._records is not None:
+                if entry.get('deleted'):
+                    self._records.pop(entry['path'], None)
+                else:
+                    self._records.setdefault(entry['path'], {}).update(entry)
+
+    def update(self, relpath, **fields):
+        self.append(dict(fields, path=relpath.replace(os.sep, '/')))
+
+    def remove(self, relpath):
+        self.append({'path': relpath.replace(os.sep, '/'), 'deleted': True})
+
+    def abspath(self, record):
+        return os.path.join(self.root, *record['path'].split('/'))
+
+    def is_current(self):
+        """
+        True if the manifest is at least as new as every class directory.
+
+        Creating or deleting a file bumps its directory's mtime, so captures
+        copied in or removed by hand make the manifest stale. Costs one
+        listdir of the root and one stat per class, not per capture.
+        """
+        if not self.exists():
+            return False
+        mtime = os.path.getmtime(self.path)
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            if not name.startswith('.') and os.path.isdir(directory) and os.path.getmtime(directory) > mtime:
+                return False
+        return True
+
+    def query(self, labels=None, min_freq=None, max_freq=None, since=None, until=None, passed=None):
+        """
+        Records matching every given filter, in sorted directory order.
+
+        Args:
+            labels: Iterable of class labels
+            min_freq, max_freq: Centre frequency range (Hz, inclusive)
+            since, until: datetime or date string; captures in [since, until)
+            passed: True/False to keep captures whose validation check
+                    passed/failed (captures without a check are dropped)
+        """
+        labels = set(labels) if labels is not None else None
+        since, until = parse_timestamp(since), parse_timestamp(until)
+        matches = []
+        for record in self.records.values():
+            if 'label' not in record:
+                # Only a validation line survived for this capture
+                continue
+            if labels is not None and record['label'] not in labels:
+                continue
+            if min_freq is not None and record['center_freq'] < min_freq:
+                continue
+            if max_freq is not None and record['center_freq'] > max_freq:
+                continue
+            if since is not None or until is not None:
+                captured = parse_timestamp(record.get('timestamp'))
+                if captured is None or (since is not None and captured < since) \
+                        or (until is not None and captured >= until):
+                    continue
+            if passed is not None and validation_passed(record.get('validation')) is not passed:
+                continue
+            matches.append(record)
+        matches.sort(key=_sort_key)
+        return matches
+
+    def summary(self, records=None):
+        """Capture count and total duration per label."""
+        counts = {}
+        for record in (self.query() if records is None else records):
+            entry = counts.setdefault(record['label'], {'captures': 0, 'duration_s': 0.0})
+            entry['captures'] += 1
+            entry['duration_s'] += record['duration']
+        return counts
+
+    def compact(self):
+        """Rewrite with one line per capture (atomically)."""
+        tmp_path = self.path + '.tmp'
+        with self._lock:
+            records = self._load()
+            with open(tmp_path, 'w') as f:
+                for record in sorted(records.values(), key=_sort_key):
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            os.replace(tmp_path, self.path)
+            self._records = records
+            self._checked_tail = True
+        return len(records)
+
+
+def _walk(root):
+    """Relative paths of every capture .npy under root, in sorted order."""
+    paths = []
+    for label in sorted(l for l in os.listdir(root) if not l.startswith('.')):
+        label_dir = os.path.join(root, label)
+        if os.path.isdir(label_dir):
+            paths.extend(f"{label}/{f}" for f in sorted(os.listdir(label_dir)) if f.endswith('.npy'))
+    return paths
+
+
+def _index_file(root, relpath):
+    with open(os.path.join(root, *relpath.split('/')), 'rb') as f:
+        blob = f.read()
+    return capture_record(relpath, np.load(io.BytesIO(blob), allow_pickle=True).item(), blob)
+
+
+def sync(root, workers=8):
+    """
+    Bring the manifest in line with the tree: index unlisted captures, drop missing ones.
+
+    Only files that are not in the manifest are opened. Returns (added, removed).
+    """
+    manifest = DatasetManifest(root)
+    paths = _walk(root)
+    on_disk = set(paths)
+    missing = [path for path in manifest.records if path not in on_disk]
+    new = [path for path in paths if path not in manifest.records]
+    with ThreadPoolExecutor(workers) as pool:
+        for record in pool.map(lambda path: _index_file(root, path), new):
+            manifest.append(record)
+    for path in missing:
+        manifest.remove(path)
+    return len(new), len(missing)
+
+
+def build(root, workers=8):
+    """Index every capture from scratch (keeping validation results of unchanged files)."""
+    old = DatasetManifest(root).records
+    with ThreadPoolExecutor(workers) as pool:
+        records = list(pool.map(lambda path: _index_file(root, path), _walk(root)))
+    for record in records:
+        previous = old.get(record['path'], {})
+        if previous.get('checksum') == record['checksum'] and 'validation' in previous:
+            record['validation'] = previous['validation']
+    tmp_path = os.path.join(root, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+    os.replace(tmp_path, os.path.join(root, MANIFEST_NAME))
+    return len(records)
+
+
+def verify(root, workers=8, records=None):
+    """
+    Re-checksum captures in parallel against the manifest.
+
+    Returns:
+        {'ok': count, 'missing': [paths], 'corrupt': [paths]}
+    """
+    manifest = DatasetManifest(root)
+    records = manifest.query() if records is None else records
+
+    def check(record):
+        path = manifest.abspath(record)
+        try:
+            if os.path.getsize(path) != record['size']:
+                return 'corrupt'
+            return 'ok' if file_checksum(path) == record['checksum'] else 'corrupt'
+        except FileNotFoundError:
+            return 'missing'
+
+    result = {'ok': 0, 'missing': [], 'corrupt': []}
+    with ThreadPoolExecutor(workers) as pool:
+        for record, status in zip(records, pool.map(check, records)):
+            if status == 'ok':
+                result['ok'] += 1
+            else:
+                result[status].append(record['path'])
+    return result
+
+
+def add_query_arguments(parser):
+    """Capture selection flags shared by `rtl-ml index query` and train_validated.py."""
+    parser.add_argument('--labels', nargs='+', help='Only these classes')
+    parser.add_argument('--freq-range', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                        help='Only captures tuned within MIN..MAX Hz')
+    parser.add_argument('--since', help='Only captures taken at or after this date/time (ISO format)')
+    parser.add_argument('--until', help='Only captures taken before this date/time (ISO format)')
+    parser.add_argument('--passed-only', action='store_true', help='Only captures that passed validation')
+
+
+def query_filters(args):
+    """Manifest.query keyword arguments from add_query_arguments flags (None if no filter is set)."""
+    filters = {}
+    if args.labels:
+        filters['labels'] = args.labels
+    if args.freq_range:
+        filters['min_freq'], filters['max_freq'] = args.freq_range
+    for name in ('since', 'until'):
+        value = getattr(args, name)
+        if value:
+            if parse_timestamp(value) is None:
+                raise ValueError(f"--{name}: cannot parse {value!r} as a date/time")
+            filters[name] = value
+    if args.passed_only:
+        filters['passed'] = True
+    return filters or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index, query and verify a .npy capture tree')
+    parser.add_argument('command', choices=['build', 'sync', 'query', 'verify', 'compact'],
+                        help='build: index every file; sync: index new/drop deleted files; query: select '
+                             'captures; verify: re-check checksums; compact: one line per capture')
+    parser.add_argument('data_dir', nargs='?', default='datasets_validated')
+    parser.add_argument('--workers', type=int, default=8, help='Threads reading files (build/sync/verify)')
+    parser.add_argument('--paths', action='store_true', help='query: print matching file paths')
+    add_query_arguments(parser)
+    args = parser.parse_args()
+    try:
+        filters = query_filters(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    manifest = DatasetManifest(args.data_dir)
+    if args.command == 'build':
+        print(f"✅ Indexed {build(args.data_dir, workers=args.workers)} captures -> {manifest.path}")
+        return 0
+    if args.command == 'sync':
+        added, removed = sync(args.data_dir, workers=args.workers)
+        print(f"✅ {added} captures added, {removed} removed")
+        return 0
+    if not manifest.exists():
+        print(f"❌ No manifest in {args.data_dir}; create one with: rtl-ml index build {args.data_dir}")
+        return 1
+    if args.command == 'compact':
+        print(f"✅ {manifest.compact()} captures")
+        return 0
+
+    records = manifest.query(**(filters or {}))
+    if args.command == 'query':
+        if args.paths:
+            for record in records:
+                print(manifest.abspath(record))
+            return 0
+        for label, entry in manifest.summary(records).items():
+            print(f"  {label:15s} {entry['captures']:6d} captures  {entry['duration_s']:8.1f} s")
+        print(f"  {'total':15s} {len(records):6d} captures")
+        if not manifest.is_current():
+            print("⚠️  The tree changed since the manifest was written; run `rtl-ml index sync`")
+        return 0
+
+    result = verify(args.data_dir, workers=args.workers, records=records)
+    for status in ('missing', 'corrupt'):
+        for path in result[status]:
+            print(f"   ❌ {status}: {path}")
+    print(f"{'✅' if not result['missing'] and not result['corrupt'] else '❌'} {result['ok']} ok, "
+          f"{len(result['missing'])} missing, {len(result['corrupt'])} corrupt")
+    return 1 if result['missing'] or result['corrupt'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Feature Cache
+Persists extracted feature vectors keyed by capture identity and extractor fingerprint
+"""
+import argparse
+import numpy as np
+import os
+import glob
+import time
+
+# Fingerprints kept per cache kind; switching between a few front-end configs reuses their caches
+KEEP_CACHES = 4
+
+
+def npy_capture_key(filepath, root):
+    """Key for a per-capture .npy file: path under root, mtime and size (rewrites invalidate it)."""
+    st = os.stat(filepath)
+    return f"{os.path.relpath(filepath, root)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def shard_capture_key(dataset, i):
+    """Key for a capture in an append-only IQ shard: shard file, offset and length."""
+    record = dataset.records[i]
+    shard_path = os.path.relpath(dataset.shard_path(i), dataset.root)
+    return f"{shard_path}:{record['offset']}:{record['length']}"
+
+
+def cache_entries(cache_dir):
+    """
+    Caches in cache_dir, most recently used first.
+
+    Returns:
+        List of dicts: kind ('features' or 'stft'), fingerprint, paths, size (bytes),
+        last_used (mtime; saving or reusing a cache refreshes it)
+    """
+    groups = {}
+    for path in glob.glob(os.path.join(cache_dir, '*_*')):
+        name = os.path.basename(path)
+        kind, _, rest = name.partition('_')
+        if kind not in ('features', 'stft') or '.tmp' in name:
+            continue
+        groups.setdefault((kind, rest.split('.')[0]), []).append(path)
+    entries = [{'kind': kind, 'fingerprint': fingerprint, 'paths': sorted(paths),
+                'size': sum(os.path.getsize(p) for p in paths),
+                'last_used': max(os.path.getmtime(p) for p in paths)}
+               for (kind, fingerprint), paths in groups.items()]
+    return sorted(entries, key=lambda e: e['last_used'], reverse=True)
+
+def prune_caches(cache_dir, keep=KEEP_CACHES, current=()):
+    """
+    Delete all but the keep most recently used caches of each kind.
+
+    Args:
+        current: Fingerprints never deleted (the caches the caller is using)
+
+    Returns:
+        List of removed cache entries
+    """
+    entries = cache_entries(cache_dir)
+    kept = {}
+    for entry in entries:
+        if entry['fingerprint'] in current:
+            kept[entry['kind']] = kept.get(entry['kind'], 0) + 1
+    removed = []
+    for entry in entries:
+        if entry['fingerprint'] in current:
+            continue
+        kept[entry['kind']] = kept.get(entry['kind'], 0) + 1
+        if kept[entry['kind']] > keep:
+            for path in entry['paths']:
+                os.remove(path)
+            removed.append(entry)
+    return removed
+
+def touch(paths):
+    """Mark cache files as used now, for the LRU limit"""
+    for path in paths:
+        os.utime(path)
+
+class FeatureCache:
+    """
+    On-disk feature store for one extractor fingerprint.
+
+    Entries live in <cache_dir>/features_<fingerprint>.npz. Caches of other
+    fingerprints (other front-end configs) are kept for when training
+    switches back to them; save() deletes all but the keep most recently used.
+    """
+
+    def __init__(self, cache_dir, fingerprint, keep=KEEP_CACHES):
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.keep = keep
+        self.path = os.path.join(cache_dir, f'features_{fingerprint}.npz')
+        self._entries = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(self.path):
+            try:
+                with np.load(self.path) as data:
+                    self._entries = dict(zip(data['keys'].tolist(), data['features']))
+            except (OSError, ValueError, KeyError):
+                # Truncated or foreign file: start over rather than fail the run
+                self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, keys, out):
+        """
+        Fill rows of out for cached keys.
+
+        Returns:
+            List of indices into keys that still need computing
+        """
+        missing = []
+        for i, key in enumerate(keys):
+            features = self._entries.get(key)
+            if features is None or features.shape != out.shape[1:]:
+                missing.append(i)
+            else:
+                out[i] = features
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        return missing
+
+    def store(self, keys, features):
+        for key, row in zip(keys, features):
+            self._entries[key] = np.array(row, dtype=np.float32)
+        self._dirty = True
+
+    def prune(self, live_keys):
+        """Drop entries whose captures no longer exist."""
+        live_keys = set(live_keys)
+        stale = [key for key in self._entries if key not in live_keys]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self):
+        """Write entries atomically, then apply the LRU limit to the caches of other fingerprints."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self._dirty:
+            keys = list(self._entries)
+            features = (np.stack([self._entries[k] for k in keys]) if keys
+                        else np.empty((0, 0), dtype=np.float32))
+            tmp_path = self.path + '.tmp.npz'
+            np.savez(tmp_path, keys=np.array(keys, dtype=str), features=features)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        elif os.path.exists(self.path):
+            touch([self.path])
+        prune_caches(self.cache_dir, self.keep, current=(self.fingerprint,))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List and prune the feature caches of a dataset')
+    parser.add_argument('data_dir', nargs='?', default='datasets_validated', help='Dataset (caches live in <data_dir>/.feature_cache)')
+    parser.add_argument('--keep', type=int, help='Delete all but this many most recently used caches of each kind')
+    args = parser.parse_args()
+    if args.keep is not None and args.keep < 0:
+        parser.error("--keep must be >= 0")
+
+    cache_dir = os.path.join(args.data_dir, '.feature_cache')
+    if args.keep is not None:
+        removed = prune_caches(cache_dir, args.keep)
+        freed = sum(entry['size'] for entry in removed)
+        print(f"✅ Removed {len(removed)} caches ({freed/1e6:.1f} MB)")
+    entries = cache_entries(cache_dir)
+    if not entries:
+        print(f"No feature caches in {cache_dir}")
+        return 0
+    for entry in entries:
+        used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))
+        print(f"  {entry['kind']:8s} {entry['fingerprint']}  {entry['size']/1e6:8.1f} MB  last used {used}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
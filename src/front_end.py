@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Feature Pipeline
+DDC front end + feature extractor, and the feature schema stored with every model
+
+The front end (digital down-conversion) shifts the signal of interest to DC
+and decimates, so features are computed on a narrowband baseband instead of
+the full-rate capture. The schema records everything the features depend on;
+models carry it (model_data['feature_schema']) and are checked against the
+running code when they are loaded and when an extractor is built for them.
+"""
+import numpy as np
+from scipy import fft as sp_fft
+import hashlib
+import json
+
+from signal_features import FEATURE_NAMES, FEATURE_VERSION, SignalFeatureExtractor, StreamingFeatureExtractor
+from stft_features import STFT_VERSION, StftFeatureExtractor
+
+# Fields of a feature schema that must match exactly (hashed into schema['hash'])
+SCHEMA_FIELDS = ('feature_version', 'names', 'input_dtype', 'output_dtype', 'sample_rate', 'front_end')
+# Hashed too when present: spectrogram models' feature kind and STFT shape (stft_features.py),
+# and 'spectrum' for scalar features whose FFT statistics are Welch-averaged
+OPTIONAL_SCHEMA_FIELDS = ('feature_kind', 'stft', 'spectrum')
+# How the scalar FFT features are computed: one full-length transform, or chunk-wise Welch averaging
+SPECTRA = ('fft', 'welch')
+
+
+class FeatureSchemaError(ValueError):
+    """A model's features differ from the ones this code would extract for it."""
+
+
+def baseband_bins(n_samples, n_out, centre_bin):
+    """
+    Spectrum bins (FFT order) of an n_out-sample baseband centred on centre_bin of an n_samples FFT.
+
+    centre_bin may be an array (one baseband per entry, stacked along a new
+    last axis); the centre bin lands on DC, as ifftshift would put it.
+    """
+    relative = np.concatenate([np.arange((n_out + 1) // 2), np.arange(-(n_out // 2), 0)])
+    return (np.asarray(centre_bin)[..., np.newaxis] + relative) % n_samples
+
+
+def spectrum_to_baseband(spectrum, bins, decimation, workers=None):
+    """
+    Inverse FFT of the kept bins: the slice-and-ifft step shared by DDCFrontEnd and scanner.channelize.
+
+    ifft divides by the shorter length, so the result is scaled by
+    1/decimation to keep amplitudes (and power features) equal to the input's.
+    """
+    baseband = sp_fft.ifft(spectrum[..., bins], axis=-1, workers=workers)
+    baseband *= 1.0 / decimation
+    return baseband
+
+
+class DDCFrontEnd:
+    """
+    Frequency shift + decimation by an integer factor, done in the FFT domain.
+
+    One forward FFT per capture; the len // decimation bins centred on
+    offset_hz are kept and one inverse FFT at that length gives the
+    baseband at sample_rate / decimation (spectrum_to_baseband, shared
+    with scanner.channelize: an ideal low-pass with no transition band).
+    Amplitudes are preserved. decimation=1 with
+    offset_hz=0 is the identity and skips both transforms.
+
+    The configuration travels with a trained model (model_data['front_end'])
+    because the features only mean something behind the same front end.
+    """
+
+    def __init__(self, decimation=1, offset_hz=0.0, workers=None):
+        if int(decimation) != decimation or decimation < 1:
+            raise ValueError(f"decimation must be a positive integer, got {decimation!r}")
+        self.decimation = int(decimation)
+        self.offset_hz = float(offset_hz)
+        # Threads used by scipy.fft (None = 1, -1 = all cores)
+        self.workers = workers
+        self._index = {}
+
+    @property
+    def identity(self):
+        return self.decimation == 1 and self.offset_hz == 0
+
+    def output_rate(self, sample_rate):
+        return sample_rate / self.decimation
+
+    def _bins(self, n_samples, sample_rate):
+        """Spectrum bins (FFT order) kept for an n_samples capture: centred on offset_hz, len // decimation wide."""
+        key = (n_samples, sample_rate)
+        if key not in self._index:
+            centre = int(round(self.offset_hz / sample_rate * n_samples))
+            self._index[key] = baseband_bins(n_samples, n_samples // self.decimation, centre)
+        return self._index[key]
+
+    def apply(self, batch, sample_rate=1.024e6):
+        """
+        Down-convert a stack of equal-length captures.
+
+        Args:
+            batch: Complex IQ samples, shape (n_captures, n_samples)
+            sample_rate: Input sample rate (Hz), needed to place offset_hz
+
+        Returns:
+            complex64 array of shape (n_captures, n_samples // decimation)
+        """
+        batch = np.asarray(batch)
+        if self.identity:
+            return batch
+        if batch.ndim != 2:
+            raise ValueError(f"Expected a 2-D (captures x samples) batch, got shape {batch.shape}")
+        n_samples = batch.shape[1]
+        spectrum = sp_fft.fft(batch.astype(np.complex64, copy=False), axis=1, workers=self.workers)
+        return spectrum_to_baseband(spectrum, self._bins(n_samples, sample_rate), self.decimation, self.workers)
+
+    def config(self):
+        """JSON-safe description, stored with models and in their lite exports (None for the identity)."""
+        if self.identity:
+            return None
+        return {'decimation': self.decimation, 'offset_hz': self.offset_hz}
+
+    @classmethod
+    def from_config(cls, config, workers=None):
+        """Rebuild from config(); None (models trained before the front end existed) is the identity."""
+        if not config:
+            return cls(workers=workers)
+        return cls(config.get('decimation', 1), config.get('offset_hz', 0.0), workers=workers)
+
+    def __repr__(self):
+        if self.identity:
+            return "DDCFrontEnd(full rate)"
+        return f"DDCFrontEnd(decimation={self.decimation}, offset={self.offset_hz/1e3:+.1f} kHz)"
+
+
+class FrontEndExtractor:
+    """SignalFeatureExtractor behind a DDCFrontEnd, with the same extract_batch/fingerprint interface."""
+
+    def __init__(self, front_end, sample_rate=1.024e6, dtype=np.complex64, workers=None):
+        self.front_end = front_end
+        self.sample_rate = sample_rate
+        self.extractor = SignalFeatureExtractor(front_end.output_rate(sample_rate), dtype=dtype, workers=workers)
+        self.dtype = self.extractor.dtype
+
+    def extract_features(self, samples):
+        return self.extract_batch(np.asarray(samples)[np.newaxis, :])[0]
+
+    def extract_batch(self, batch, out=None):
+        return self.extractor.extract_batch(self.front_end.apply(batch, self.sample_rate), out=out)
+
+    @property
+    def fingerprint(self):
+        """Extractor fingerprint extended by the front-end configuration."""
+        h = hashlib.sha1(self.extractor.fingerprint.encode())
+        h.update(json.dumps(self.front_end.config(), sort_keys=True).encode())
+        h.update(str(self.sample_rate).encode())
+        return h.hexdigest()[:16]
+
+    @property
+    def feature_names(self):
+        return list(FEATURE_NAMES)
+
+
+def feature_extractor(front_end=None, sample_rate=1.024e6, spectrum='fft', **options):
+    """
+    Extractor for captures at sample_rate behind front_end.
+
+    The identity front end (or None) gives a plain SignalFeatureExtractor,
+    so full-rate models keep their feature cache fingerprints. spectrum
+    'welch' gives a StreamingFeatureExtractor, which works chunk by chunk on
+    full-rate captures and so takes no front end.
+    """
+    if spectrum not in SPECTRA:
+        raise ValueError(f"Unknown spectrum {spectrum!r}, expected one of {SPECTRA}")
+    if spectrum == 'welch':
+        if front_end is not None and not front_end.identity:
+            raise ValueError("Welch features are computed on full-rate chunks; they take no DDC front end")
+        return StreamingFeatureExtractor(sample_rate, **options)
+    if front_end is None or front_end.identity:
+        return SignalFeatureExtractor(sample_rate, **options)
+    return FrontEndExtractor(front_end, sample_rate, **options)
+
+
+def model_feature_kind(model_data):
+    """'stft' for spectrogram models (StftClassifier.model_data), 'scalar' for SignalFeatureExtractor features."""
+    return (model_data or {}).get('feature_kind', 'scalar')
+
+
+def model_spectrum(model_data):
+    """'welch' for models trained on StreamingFeatureExtractor features, 'fft' otherwise (and for older models)."""
+    return ((model_data or {}).get('feature_schema') or {}).get('spectrum', 'fft')
+
+
+def model_front_end(model_data):
+    """The DDCFrontEnd a model was trained behind (identity for older models)."""
+    return DDCFrontEnd.from_config(model_data.get('front_end') if model_data is not None else None)
+
+
+def feature_schema(front_end=None, sample_rate=1.024e6, dtype=np.complex64, stft=None, spectrum='fft'):
+    """
+    Schema of the features extracted from sample_rate captures behind front_end.
+
+    The SCHEMA_FIELDS are hashed into 'hash'; 'extractor' (the source
+    fingerprint of SignalFeatureExtractor) is informational, since editing
+    the code without changing a feature should not invalidate models --
+    bump FEATURE_VERSION when a definition changes. With stft (an
+    StftClassifier config), the schema describes pooled spectrogram
+    features instead and versions them by STFT_VERSION. spectrum 'welch'
+    is recorded (and hashed), so Welch-averaged and full-FFT features never
+    pass for each other.
+    """
+    front_end = front_end if front_end is not None else DDCFrontEnd()
+    if stft is not None:
+        extractor = StftFeatureExtractor(**stft, dtype=dtype)
+    else:
+        extractor = feature_extractor(front_end, sample_rate, spectrum, dtype=dtype)
+    schema = {
+        'feature_version': STFT_VERSION if stft is not None else FEATURE_VERSION,
+        'names': list(extractor.feature_names),
+        'input_dtype': np.dtype(dtype).name,
+        'output_dtype': 'float32',
+        'sample_rate': float(sample_rate),
+        'front_end': front_end.config(),
+    }
+    if stft is not None:
+        schema['feature_kind'] = 'stft'
+        schema['stft'] = dict(stft)
+    elif spectrum != 'fft':
+        schema['spectrum'] = spectrum
+    schema['hash'] = _schema_hash(schema)
+    schema['extractor'] = extractor.fingerprint
+    return schema
+
+
+def _schema_fields(schema):
+    return SCHEMA_FIELDS + tuple(name for name in OPTIONAL_SCHEMA_FIELDS if name in schema)
+
+
+def _schema_hash(schema):
+    fields = {name: schema.get(name) for name in _schema_fields(schema)}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _schema_differences(expected, actual, fields=SCHEMA_FIELDS):
+    differences = []
+    for name in fields:
+        if expected.get(name) != actual.get(name):
+            differences.append(f"{name}: model {expected.get(name)!r}, here {actual.get(name)!r}")
+    return differences
+
+
+def _model_feature_names(model_data):
+    """Names of the features this code extracts for model_data's feature kind."""
+    if model_feature_kind(model_data) == 'stft':
+        return StftFeatureExtractor(**model_data['stft']).feature_names
+    return list(FEATURE_NAMES)
+
+
+def _n_model_features(model_data):
+    scaler = model_data.get('scaler')
+    mean = getattr(scaler, 'mean_', None)
+    return len(mean) if mean is not None else None
+
+
+def check_model_schema(model_data, sample_rate=None):
+    """
+    Raise FeatureSchemaError unless this code extracts the features model_data was trained on.
+
+    The stored schema must hash to its own 'hash' (an edited or corrupted
+    artifact fails) and match the current feature version, names, dtypes
+    and the model's front end; with sample_rate, also the capture rate.
+    Models saved before schemas existed are checked by feature count only.
+    A schema that passed once (per hash, front end, feature count and
+    sample rate) is not compared field by field again, so rebuilding
+    extractors for a loaded model costs one hash.
+    """
+    schema = model_data.get('feature_schema')
+    n_features = _n_model_features(model_data)
+    if schema is None:
+        names = _model_feature_names(model_data)
+        if n_features is not None and n_features != len(names):
+            raise FeatureSchemaError(f"Model expects {n_features} features, the extractor produces "
+                                     f"{len(names)} ({', '.join(names)}); retrain it")
+        return
+    schema_hash = _schema_hash(schema)
+    if schema_hash != schema.get('hash'):
+        raise FeatureSchemaError("Model feature schema does not match its hash (edited or corrupted model file)")
+    key = (schema_hash, json.dumps([model_data.get('front_end'), model_feature_kind(model_data), model_data.get('stft')],
+                                   sort_keys=True), n_features, sample_rate)
+    if key in _checked_schemas:
+        return
+    if model_front_end(model_data).config() != schema.get('front_end'):
+        raise FeatureSchemaError(f"Model front end {model_data.get('front_end')!r} differs from its feature "
+                                 f"schema's {schema.get('front_end')!r}")
+    current = feature_schema(model_front_end(model_data), schema['sample_rate'],
+                             np.dtype(schema.get('input_dtype', 'complex64')),
+                             stft=model_data.get('stft') if model_feature_kind(model_data) == 'stft' else None,
+                             spectrum=schema.get('spectrum', 'fft'))
+    differences = _schema_differences(schema, current, SCHEMA_FIELDS + OPTIONAL_SCHEMA_FIELDS)
+    if sample_rate is not None and float(sample_rate) != schema['sample_rate']:
+        differences.append(f"sample_rate: model trained on {schema['sample_rate']/1e6:.3f} MSPS captures, "
+                           f"source runs at {sample_rate/1e6:.3f} MSPS")
+    if n_features is not None and n_features != len(schema['names']):
+        differences.append(f"model input: {n_features} features, schema lists {len(schema['names'])}")
+    if differences:
+        raise FeatureSchemaError("Model features do not match this extractor:\n  " + "\n  ".join(differences))
+    _checked_schemas.add(key)
+
+
+# Schemas that passed check_model_schema, and the extractors built for them
+_checked_schemas = set()
+_extractors = {}
+
+
+def model_extractor(model_data, sample_rate=1.024e6, **options):
+    """
+    Feature extractor matching model_data's training front end, after check_model_schema.
+
+    Spectrogram models (model_feature_kind 'stft') get a StftFeatureExtractor,
+    Welch-feature models (model_spectrum 'welch') a StreamingFeatureExtractor.
+    Extractors are shared per (feature kind, front end, sample rate,
+    options), so the front end's bin indices are worked out once however
+    often a classifier asks.
+    """
+    if model_data is not None:
+        check_model_schema(model_data, sample_rate)
+    return _shared_extractor(model_data, model_front_end(model_data), sample_rate, options)
+
+
+def _shared_extractor(model_data, front_end, sample_rate, options):
+    stft = model_data['stft'] if model_feature_kind(model_data) == 'stft' else None
+    spectrum = model_spectrum(model_data)
+    key = (json.dumps([stft, spectrum, front_end.config()], sort_keys=True), float(sample_rate),
+           tuple(sorted(options.items())))
+    if key not in _extractors:
+        if stft is not None:
+            _extractors[key] = StftFeatureExtractor(**stft, **options)
+        else:
+            _extractors[key] = feature_extractor(front_end, sample_rate, spectrum, **options)
+    return _extractors[key]
+
+
+def channel_extractor(model_data, channel_rate, **options):
+    """
+    Feature extractor for channels that are already down-converted (scanner.channelize).
+
+    The channelizer takes the place of the model's front end, so channels
+    go straight to the model's extractor without one; they must run at the rate the model's
+    features were computed at -- its schema sample rate after its front end
+    -- or FeatureSchemaError is raised. Models saved before schemas existed
+    carry no rate and are checked by feature count only.
+    """
+    if model_data is not None:
+        check_model_schema(model_data)
+        schema = model_data.get('feature_schema')
+        if schema is not None:
+            front_end = model_front_end(model_data)
+            feature_rate = front_end.output_rate(schema['sample_rate'])
+            if not np.isclose(channel_rate, feature_rate, rtol=1e-9, atol=0):
+                # Spectrogram models train at full rate; only scalar models can be retrained behind a DDC
+                retrain = (f", or train behind --decimation {int(round(schema['sample_rate'] / channel_rate))}"
+                           if model_feature_kind(model_data) == 'scalar' else "")
+                raise FeatureSchemaError(
+                    f"Model features were computed at {feature_rate/1e3:.1f} kHz ({schema['sample_rate']/1e6:.3f} "
+                    f"MSPS captures behind {front_end}), channels run at {channel_rate/1e3:.1f} kHz; "
+                    f"choose --sample-rate / --channels to match{retrain}")
+    return _shared_extractor(model_data, DDCFrontEnd(), channel_rate, options)
+
+
+def occupied_bandwidth(captures, sample_rate=1.024e6, offset_hz=0.0, segment=4096, threshold_db=6.0):
+    """
+    Two-sided bandwidth (Hz) around offset_hz that a set of captures occupies.
+
+    The captures' segment-averaged power spectrum (Welch without overlap)
+    is compared with its median, taken as the noise floor; the bandwidth
+    reaches out to the furthest bin standing threshold_db above it. Returns
+    0.0 when nothing does (empty channels, or bursts too sparse to lift the
+    averaged spectrum).
+    """
+    psd = np.zeros(segment)
+    count = 0
+    for samples in captures:
+        samples = np.asarray(samples, dtype=np.complex64)
+        n_segments = len(samples) // segment
+        if not n_segments:
+            continue
+        spectrum = sp_fft.fft(samples[:n_segments * segment].reshape(n_segments, segment), axis=1)
+        psd += np.sum(spectrum.real ** 2 + spectrum.imag ** 2, axis=0)
+        count += n_segments
+    if not count:
+        raise ValueError(f"Captures are shorter than one {segment}-sample segment")
+    freqs = sp_fft.fftfreq(segment, 1 / sample_rate)
+    # Distance from offset_hz, wrapped onto the captured band
+    distance = np.abs((freqs - offset_hz + sample_rate / 2) % sample_rate - sample_rate / 2)
+    occupied = psd / count > np.median(psd / count) * 10 ** (threshold_db / 10)
+    return 2 * float(distance[occupied].max() + sample_rate / segment / 2) if occupied.any() else 0.0
+
+
+def decimation_for_bandwidth(bandwidth, sample_rate=1.024e6, n_samples=None, guard=1.25,
+                             max_decimation=64, min_samples=8192):
+    """
+    Largest integer decimation whose output rate still spans guard * bandwidth.
+
+    Capped at max_decimation, and so that an n_samples capture keeps at
+    least min_samples after decimation.
+    """
+    limit = max_decimation
+    if n_samples is not None:
+        limit = min(limit, max(1, n_samples // min_samples))
+    if bandwidth <= 0:
+        return limit
+    return int(max(1, min(limit, sample_rate // (guard * bandwidth))))
+
+
+def choose_front_end(class_captures, sample_rate=1.024e6, offset_hz=0.0, guard=1.25, max_decimation=64,
+                     min_samples=8192, threshold_db=6.0):
+    """
+    Pick one front end for a set of classes from example captures of each.
+
+    Every class gets its own suggested decimation from its occupied
+    bandwidth; the model uses the smallest, since at inference time the
+    class is unknown and the widest class has to fit through the filter.
+
+    Args:
+        class_captures: {label: [captures, ...]} (a few per class are enough)
+
+    Returns:
+        (DDCFrontEnd, {label: (occupied bandwidth Hz, suggested decimation)})
+    """
+    per_class = {}
+    for label, captures in class_captures.items():
+        bandwidth = occupied_bandwidth(captures, sample_rate, offset_hz, threshold_db=threshold_db)
+        n_samples = min(len(c) for c in captures)
+        per_class[label] = (bandwidth, decimation_for_bandwidth(bandwidth, sample_rate, n_samples, guard=guard,
+                                                                max_decimation=max_decimation,
+                                                                min_samples=min_samples))
+    decimation = min(factor for _, factor in per_class.values()) if per_class else 1
+    return DDCFrontEnd(decimation, offset_hz), per_class
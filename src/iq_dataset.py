@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Binary IQ Dataset
+Contiguous per-class shards of raw IQ with JSON sidecar indexes, loaded via np.memmap
+
+Layout:
+    <root>/<label>_<NNN>.iq    packed samples (complex64, or interleaved uint8 as read from the dongle)
+    <root>/<label>_<NNN>.json  sidecar: dtype, label and one record per capture
+                               (offset, length, center_freq, sample_rate, timestamp, duration)
+"""
+import numpy as np
+import os
+import json
+import glob
+import zlib
+import argparse
+
+FORMAT_VERSION = 1
+STORAGE_DTYPES = ('complex64', 'uint8')
+# Codecs for the raw bytes of a per-capture .npy (None = stored as a plain uint8 array)
+CAPTURE_CODECS = (None, 'zlib')
+
+
+def iq_to_uint8(samples):
+    """Pack complex IQ in [-1, 1] back to the dongle's interleaved uint8 layout."""
+    samples = np.asarray(samples)
+    interleaved = np.empty(len(samples) * 2, dtype=np.float32)
+    interleaved[0::2] = samples.real
+    interleaved[1::2] = samples.imag
+    return np.clip(np.rint((interleaved + 1.0) * 127.5), 0, 255).astype(np.uint8)
+
+
+def uint8_to_iq(raw):
+    """Decode interleaved uint8 IQ to complex64 (pyrtlsdr scaling: x / 127.5 - 1)."""
+    raw = np.asarray(raw)
+    out = raw.astype(np.float32)
+    out *= 1 / 127.5
+    out -= 1.0
+    return out.view(np.complex64)
+
+
+def pack_capture(raw, codec=None, level=1):
+    """
+    Interleaved uint8 IQ -> the 'raw' entry of a capture .npy.
+
+    codec='zlib' stores compressed bytes (level 1: fast, and 8-bit IQ gains
+    little from higher levels).
+    """
+    if codec not in CAPTURE_CODECS:
+        raise ValueError(f"Unsupported codec {codec!r}, expected one of {CAPTURE_CODECS}")
+    raw = np.ascontiguousarray(raw, dtype=np.uint8)
+    if codec == 'zlib':
+        return zlib.compress(raw.tobytes(), level)
+    return raw
+
+
+def capture_raw(data):
+    """Interleaved uint8 IQ of a raw-storage capture dict."""
+    if data.get('codec') == 'zlib':
+        return np.frombuffer(zlib.decompress(data['raw']), dtype=np.uint8)
+    return np.asarray(data['raw'], dtype=np.uint8)
+
+
+def capture_samples(data):
+    """
+    Complex IQ of a capture dict as saved by capture_validated.py.
+
+    Raw captures ('raw', format cu8) are decoded to complex64 here, on
+    demand; older captures carry complex 'samples' and are returned as is.
+    """
+    if 'raw' in data:
+        return uint8_to_iq(capture_raw(data))
+    return data['samples']
+
+
+def load_capture(path):
+    """Metadata dict of a capture .npy; samples stay encoded until capture_samples()."""
+    return np.load(path, allow_pickle=True).item()
+
+
+def load_samples(path):
+    """Complex IQ of a capture .npy, whatever its storage format."""
+    return capture_samples(load_capture(path))
+
+
+def list_npy_captures(data_dir, verbose=True, select=None):
+    """
+    Capture files and labels of a <label>/<capture>.npy tree, in a reproducible order
+
+    An up-to-date dataset manifest (dataset_manifest.py) answers this
+    without listing any class directory; select (DatasetManifest.query
+    keyword arguments) picks a subset from it.
+    """
+    from dataset_manifest import DatasetManifest
+
+    manifest = DatasetManifest(data_dir)
+    if manifest.is_current():
+        records = manifest.query(**(select or {}))
+        filepaths = [manifest.abspath(record) for record in records]
+        y = [record['path'].split('/')[0] for record in records]
+        if verbose:
+            labels = sorted(set(y))
+            print(f"Loading {len(labels)} classes: {labels} (from manifest)")
+            for label in labels:
+                print(f"  {label}: {y.count(label)} samples")
+        return filepaths, y
+    if select:
+        raise ValueError(f"Selecting captures needs an up-to-date manifest: rtl-ml index sync {data_dir}")
+
+    labels = sorted(l for l in os.listdir(data_dir) if not l.startswith('.'))
+    if verbose:
+        print(f"Loading {len(labels)} classes: {labels}")
+
+    filepaths = []
+    y = []
+    for label in labels:
+        label_dir = os.path.join(data_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+
+        # Sorted so the sample order (and the train/test split) is reproducible
+        files = sorted(f for f in os.listdir(label_dir) if f.endswith('.npy'))
+        if verbose:
+            print(f"  {label}: {len(files)} samples")
+
+        for filename in files:
+            filepaths.append(os.path.join(label_dir, filename))
+            y.append(label)
+    return filepaths, y
+
+
+def is_iq_dataset(root):
+    """True if root holds binary shards rather than per-capture .npy files."""
+    return bool(glob.glob(os.path.join(root, '*.json'))) and bool(glob.glob(os.path.join(root, '*.iq')))
+
+
+def dataset_sample_rate(data_dir, select=None, default=1.024e6):
+    """
+    The sample rate every capture of a dataset was taken at (default if it is empty)
+
+    Shard sidecars and an up-to-date manifest cover every capture; a .npy
+    tree without a manifest is sampled by reading the first capture of each
+    class. Raises ValueError for a mix of rates, which one model cannot serve.
+    """
+    from dataset_manifest import DatasetManifest
+
+    if is_iq_dataset(data_dir):
+        rates = {record['sample_rate'] for record in IQDataset(data_dir).records}
+    else:
+        manifest = DatasetManifest(data_dir)
+        if manifest.is_current():
+            rates = {record['sample_rate'] for record in manifest.query(**(select or {}))}
+        else:
+            filepaths, labels = list_npy_captures(data_dir, verbose=False, select=select)
+            firsts = [filepaths[labels.index(label)] for label in sorted(set(labels))]
+            rates = {float(load_capture(fp).get('sample_rate', default)) for fp in firsts}
+    if len(rates) > 1:
+        raise ValueError(f"{data_dir} mixes sample rates ({', '.join(f'{r/1e6:.3f}' for r in sorted(rates))} MSPS); "
+                         f"train one model per rate")
+    return float(rates.pop()) if rates else default
+
+
+def _write_json_atomic(path, payload):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+class IQDatasetWriter:
+    """Append captures to per-class shards; the sidecar is rewritten atomically on flush."""
+
+    def __init__(self, root, dtype='complex64', shard_size=1024):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported storage dtype {dtype!r}, expected one of {STORAGE_DTYPES}")
+        self.root = root
+        self.dtype = dtype
+        self.shard_size = shard_size
+        self._shards = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _shard_for(self, label):
+        shard = self._shards.get(label)
+        if shard is not None and len(shard['captures']) < self.shard_size:
+            return shard
+        if shard is not None:
+            self._flush_shard(shard)
+            shard['file'].close()
+        # Continue after any shards already on disk for this label; a .iq
+        # without a sidecar is left over from a crashed run and is overwritten
+        # (its records were never indexed, so offsets restart at 0)
+        number = len(glob.glob(os.path.join(self.root, f'{label}_[0-9][0-9][0-9].json')))
+        name = f'{label}_{number:03d}'
+        shard = {
+            'name': name,
+            'file': open(os.path.join(self.root, name + '.iq'), 'wb'),
+            'captures': [],
+            'length': 0,
+            'label': label,
+        }
+        self._shards[label] = shard
+        return shard
+
+    def append(self, samples, label, center_freq, sample_rate, timestamp, raw=None):
+        """
+        Append one capture.
+
+        Args:
+            samples: Complex IQ samples (ignored for uint8 storage if raw is given)
+            label: Class label (selects the shard)
+            center_freq, sample_rate, timestamp: Capture metadata
+            raw: Optional interleaved uint8 bytes straight from the dongle
+        """
+        shard = self._shard_for(label)
+        if self.dtype == 'uint8':
+            data = np.asarray(raw, dtype=np.uint8) if raw is not None else iq_to_uint8(samples)
+            length = len(data) // 2
+        else:
+            data = np.asarray(samples, dtype=np.complex64)
+            length = len(data)
+        shard['file'].write(data.tobytes())
+        shard['captures'].append({
+            'offset': shard['length'],
+            'length': length,
+            'center_freq': float(center_freq),
+            'sample_rate': float(sample_rate),
+            'timestamp': timestamp,
+            'duration': length / float(sample_rate),
+        })
+        shard['length'] += length
+
+    def _flush_shard(self, shard):
+        shard['file'].flush()
+        _write_json_atomic(os.path.join(self.root, shard['name'] + '.json'), {
+            'version': FORMAT_VERSION,
+            'dtype': self.dtype,
+            'label': shard['label'],
+            'data_file': shard['name'] + '.iq',
+            'captures': shard['captures'],
+        })
+
+    def flush(self):
+        for shard in self._shards.values():
+            self._flush_shard(shard)
+
+    def close(self):
+        self.flush()
+        for shard in self._shards.values():
+            shard['file'].close()
+        self._shards = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class IQDataset:
+    """Read-only view over a shard directory; samples are memmap views, not copies."""
+
+    def __init__(self, root):
+        self.root = root
+        self.records = []
+        self._shards = []
+        for index_path in sorted(glob.glob(os.path.join(root, '*.json'))):
+            with open(index_path) as f:
+                index = json.load(f)
+            if index.get('version') != FORMAT_VERSION:
+                continue
+            shard_id = len(self._shards)
+            self._shards.append({
+                'path': os.path.join(root, index['data_file']),
+                'dtype': index['dtype'],
+                'map': None,
+            })
+            for capture in index['captures']:
+                self.records.append(dict(capture, label=index['label'], shard=shard_id))
+        self.labels = np.array([r['label'] for r in self.records])
+
+    def __len__(self):
+        return len(self.records)
+
+    def _map(self, shard_id):
+        shard = self._shards[shard_id]
+        if shard['map'] is None:
+            shard['map'] = np.memmap(shard['path'], dtype=np.dtype(shard['dtype']), mode='r')
+        return shard['map']
+
+    def shard_path(self, i):
+        """Path of the .iq shard holding capture i."""
+        return self._shards[self.records[i]['shard']]['path']
+
+    def raw(self, i):
+        """Stored representation of capture i (complex64 or interleaved uint8), as a view."""
+        record = self.records[i]
+        data = self._map(record['shard'])
+        if self._shards[record['shard']]['dtype'] == 'uint8':
+            return data[record['offset'] * 2:(record['offset'] + record['length']) * 2]
+        return data[record['offset']:record['offset'] + record['length']]
+
+    def samples(self, i):
+        """Complex IQ for capture i (zero-copy for complex64 shards)."""
+        if self._shards[self.records[i]['shard']]['dtype'] == 'uint8':
+            return uint8_to_iq(self.raw(i))
+        return self.raw(i)
+
+    def batch(self, indices):
+        """
+        (len(indices), length) complex batch for equal-length captures.
+
+        Consecutive captures of one complex64 shard come back as a reshaped
+        memmap view; anything else is stacked.
+        """
+        indices = list(indices)
+        first = self.records[indices[0]]
+        contiguous = all(
+            self.records[i]['shard'] == first['shard']
+            and self.records[i]['length'] == first['length']
+            and self.records[i]['offset'] == first['offset'] + k * first['length']
+            for k, i in enumerate(indices)
+        )
+        if contiguous and self._shards[first['shard']]['dtype'] == 'complex64':
+            data = self._map(first['shard'])
+            stop = first['offset'] + len(indices) * first['length']
+            return data[first['offset']:stop].reshape(len(indices), first['length'])
+        if contiguous:
+            data = self._map(first['shard'])
+            stop = (first['offset'] + len(indices) * first['length']) * 2
+            return uint8_to_iq(data[first['offset'] * 2:stop]).reshape(len(indices), first['length'])
+        return np.stack([self.samples(i) for i in indices])
+
+
+def convert_npy_tree(src_dir='datasets_validated', dst_dir='datasets_iq', dtype='complex64', shard_size=1024):
+    """Convert a capture_validated.py tree of pickled .npy dicts into binary shards."""
+    converted = 0
+    with IQDatasetWriter(dst_dir, dtype=dtype, shard_size=shard_size) as writer:
+        for label in sorted(os.listdir(src_dir)):
+            label_dir = os.path.join(src_dir, label)
+            if not os.path.isdir(label_dir):
+                continue
+            files = sorted(f for f in os.listdir(label_dir) if f.endswith('.npy'))
+            print(f"  {label}: {len(files)} samples")
+            for filename in files:
+                data = load_capture(os.path.join(label_dir, filename))
+                # Raw captures go to uint8 shards byte for byte
+                raw = capture_raw(data) if 'raw' in data and dtype == 'uint8' else None
+                samples = capture_samples(data) if raw is None else None
+                writer.append(samples, data.get('label', label), data['center_freq'],
+                              data['sample_rate'], data['timestamp'], raw=raw)
+                converted += 1
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a .npy capture tree into binary IQ shards')
+    parser.add_argument('src', nargs='?', default='datasets_validated')
+    parser.add_argument('dst', nargs='?', default='datasets_iq')
+    parser.add_argument('--dtype', choices=STORAGE_DTYPES, default='complex64',
+                        help='uint8 is 8x smaller but only lossless for captures read from an RTL-SDR')
+    parser.add_argument('--shard-size', type=int, default=1024, help='Captures per shard file')
+    args = parser.parse_args()
+
+    print(f"Converting {args.src} -> {args.dst} ({args.dtype})")
+    count = convert_npy_tree(args.src, args.dst, dtype=args.dtype, shard_size=args.shard_size)
+    print(f"✅ Converted {count} captures")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+RTL-ML IQ Sources
+Pluggable sample sources so capture and classification run with or without a dongle
+
+    rtlsdr[:INDEX]          live RTL-SDR (pyrtlsdr)
+    replay:PATH             recorded .npy / rtl_sdr .bin / SigMF / IQ shard dataset, max speed
+    replay-realtime:PATH    same, paced at the recorded sample rate
+    synthetic               generated IQ (synthetic_iq.py), class chosen by tuned frequency
+"""
+import numpy as np
+import glob
+import json
+import os
+import threading
+import time
+
+from iq_dataset import IQDataset, is_iq_dataset, capture_samples, iq_to_uint8, uint8_to_iq
+
+# Frequency plan used by capture_validated.py; the synthetic source plays the matching class
+DEFAULT_FREQUENCY_PLAN = {
+    1090e6: 'ADS_B',
+    137.62e6: 'NOAA_APT',
+    433.92e6: 'ISM_sensors',
+    98.7e6: 'FM_broadcast',
+    89.3e6: 'FM_broadcast',
+    162.4e6: 'NOAA_weather',
+    152.84e6: 'pager',
+    144.39e6: 'APRS',
+    145.0e6: 'noise',
+}
+
+SIGMF_DTYPES = {
+    'cf32_le': np.complex64,
+    'ci16_le': np.int16,
+    'ci8': np.int8,
+    'cu8': np.uint8,
+}
+
+
+class IQSource:
+    """
+    Common interface: sample_rate, gain, center_freq, read_samples(n), read_bytes(n), stream(), close().
+
+    stream() repeatedly calls read_samples and hands blocks to a callback;
+    `blocking` tells consumers whether they may apply backpressure (True)
+    or must drop data when they fall behind (False, like real hardware).
+    """
+
+    blocking = True
+
+    def __init__(self, sample_rate=1.024e6, realtime=False):
+        self.sample_rate = sample_rate
+        self.gain = 0
+        self.realtime = realtime
+        self._center_freq = 0.0
+        self._stopped = threading.Event()
+        self._clock_start = None
+        self._clock_samples = 0
+        if realtime:
+            self.blocking = False
+
+    @property
+    def center_freq(self):
+        return self._center_freq
+
+    @center_freq.setter
+    def center_freq(self, frequency):
+        self._center_freq = frequency
+        self._retune(frequency)
+
+    def _retune(self, frequency):
+        pass
+
+    def _read(self, num_samples):
+        raise NotImplementedError
+
+    def _pace(self, num_samples):
+        """Sleep so samples are delivered no faster than sample_rate."""
+        if self._clock_start is None:
+            self._clock_start = time.monotonic()
+        self._clock_samples += num_samples
+        delay = self._clock_start + self._clock_samples / self.sample_rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def read_samples(self, num_samples):
+        """Return num_samples complex IQ samples (blocking like RtlSdr.read_samples)."""
+        samples = self._read(int(num_samples))
+        if self.realtime:
+            self._pace(len(samples))
+        return samples
+
+    def read_bytes(self, num_bytes):
+        """Interleaved uint8 IQ like RtlSdr.read_bytes (num_bytes // 2 samples, quantized to 8 bits)."""
+        return iq_to_uint8(self.read_samples(int(num_bytes) // 2))
+
+    def stream(self, callback, block_size=256 * 1024):
+        """Deliver blocks to callback until stop() (or the source runs dry)."""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            block = self.read_samples(block_size)
+            if len(block) == 0:
+                return
+            callback(block)
+
+    def stream_bytes(self, callback, block_bytes=512 * 1024):
+        """stream(), delivering interleaved uint8 blocks of block_bytes."""
+        self._stopped.clear()
+        while not self._stopped.is_set():
+            block = self.read_bytes(block_bytes)
+            if len(block) == 0:
+                return
+            callback(block)
+
+    def stop(self):
+        self._stopped.set()
+
+    def close(self):
+        self.stop()
+
+
+class RtlSdrSource(IQSource):
+    """Live RTL-SDR dongle, opened by device index or serial number."""
+
+    blocking = False
+
+    def __init__(self, device_index=0, serial=None, sample_rate=1.024e6, gain=40):
+        from rtlsdr import RtlSdr
+
+        if serial is not None:
+            device_index = RtlSdr.get_device_index_by_serial(serial)
+        self.sdr = RtlSdr(device_index)
+        self.sdr.sample_rate = sample_rate
+        self.sdr.gain = gain
+        self.realtime = False
+        self._stopped = threading.Event()
+
+    @property
+    def sample_rate(self):
+        return self.sdr.sample_rate
+
+    @property
+    def gain(self):
+        return self.sdr.gain
+
+    @gain.setter
+    def gain(self, value):
+        self.sdr.gain = value
+
+    @property
+    def center_freq(self):
+        return self.sdr.center_freq
+
+    @center_freq.setter
+    def center_freq(self, frequency):
+        self.sdr.center_freq = frequency
+
+    def read_samples(self, num_samples):
+        return self.sdr.read_samples(int(num_samples))
+
+    def read_bytes(self, num_bytes):
+        return self.sdr.read_bytes(int(num_bytes))
+
+    def stream(self, callback, block_size=256 * 1024):
+        """Use pyrtlsdr's async reader so no samples are lost between blocks."""
+        self.sdr.read_samples_async(lambda samples, context: callback(samples), block_size)
+
+    def stream_bytes(self, callback, block_bytes=512 * 1024):
+        """Async raw reads; librtlsdr reuses its buffers, so each block is copied out."""
+        self.sdr.read_bytes_async(lambda values, context: callback(np.frombuffer(values, dtype=np.uint8).copy()),
+                                  block_bytes)
+
+    def stop(self):
+        self.sdr.cancel_read_async()
+
+    def close(self):
+        self.sdr.close()
+
+
+def _load_npy(path):
+    data = np.load(path, allow_pickle=True)
+    if data.dtype == object:
+        return np.asarray(capture_samples(data.item()), dtype=np.complex64)
+    return np.asarray(data, dtype=np.complex64)
+
+
+def _npy_metadata(path):
+    """center_freq/sample_rate from a capture_validated.py .npy dict (None for plain arrays)."""
+    data = np.load(path, allow_pickle=True)
+    if data.dtype == object:
+        data = data.item()
+        return {'center_freq': data.get('center_freq'), 'sample_rate': data.get('sample_rate')}
+    return {'center_freq': None, 'sample_rate': None}
+
+
+def _sigmf_recording(meta_path):
+    with open(meta_path) as f:
+        meta = json.load(f)
+    datatype = meta['global']['core:datatype']
+    if datatype not in SIGMF_DTYPES:
+        raise ValueError(f"Unsupported SigMF datatype {datatype!r}")
+    data_path = meta_path[:-len('.sigmf-meta')] + '.sigmf-data'
+    captures = meta.get('captures') or [{}]
+
+    def load():
+        raw = np.memmap(data_path, dtype=SIGMF_DTYPES[datatype], mode='r')
+        if datatype == 'cf32_le':
+            return raw
+        if datatype == 'cu8':
+            return uint8_to_iq(raw)
+        scale = 128.0 if datatype == 'ci8' else 32768.0
+        iq = raw.astype(np.float32) / scale
+        return iq.view(np.complex64)
+
+    return {'center_freq': captures[0].get('core:frequency'),
+            'sample_rate': meta['global'].get('core:sample_rate'), 'load': load}
+
+
+def recording_info(recording, key):
+    """center_freq or sample_rate of a recording, resolving deferred metadata once."""
+    if 'meta' in recording:
+        recording.update(recording.pop('meta')())
+    return recording[key]
+
+
+def find_recordings(path, sample_rate=1.024e6):
+    """Resolve a file, directory or glob into recording descriptors (loaded lazily)."""
+    if os.path.isdir(path) and is_iq_dataset(path):
+        dataset = IQDataset(path)
+        return [{'center_freq': r['center_freq'], 'sample_rate': r['sample_rate'],
+                 'load': (lambda i=i: dataset.samples(i))} for i, r in enumerate(dataset.records)]
+    if os.path.isdir(path):
+        paths = sorted(glob.glob(os.path.join(path, '**', '*'), recursive=True))
+    else:
+        paths = sorted(glob.glob(path)) or [path]
+
+    recordings = []
+    for p in paths:
+        if p.endswith('.npy'):
+            # Pickled dicts must be read in full to see their metadata, so defer it
+            recordings.append({'meta': (lambda p=p: _npy_metadata(p)),
+                               'load': (lambda p=p: _load_npy(p))})
+        elif p.endswith('.bin') or p.endswith('.cu8'):
+            # rtl_sdr's raw output: interleaved unsigned 8-bit I/Q, no metadata
+            recordings.append({'center_freq': None, 'sample_rate': sample_rate,
+                               'load': (lambda p=p: uint8_to_iq(np.memmap(p, dtype=np.uint8, mode='r')))})
+        elif p.endswith('.sigmf-meta'):
+            recordings.append(_sigmf_recording(p))
+    if not recordings:
+        raise FileNotFoundError(f"No .npy, .bin or SigMF recordings found at {path}")
+    return recordings
+
+
+class FileReplaySource(IQSource):
+    """
+    Replays recordings as if they came off the dongle.
+
+    Tuning selects the recordings whose center_freq matches (within
+    freq_tolerance); if none match, all recordings are played. read_samples
+    loops, so any number of samples can be read; stream() plays the
+    selection once unless loop_stream is set.
+    """
+
+    def __init__(self, path, sample_rate=1.024e6, realtime=False, loop=True, freq_tolerance=5e3,
+                 loop_stream=False):
+        super().__init__(sample_rate=sample_rate, realtime=realtime)
+        self.recordings = find_recordings(path, sample_rate)
+        self.loop = loop
+        self.loop_stream = loop_stream
+        self.freq_tolerance = freq_tolerance
+        self.sample_rate = recording_info(self.recordings[0], 'sample_rate') or sample_rate
+        self._selected = list(range(len(self.recordings)))
+        self._position = 0
+        self._current = None
+        self._offset = 0
+        self._exhausted = False
+
+    def _retune(self, frequency):
+        matching = []
+        for i, recording in enumerate(self.recordings):
+            recorded = recording_info(recording, 'center_freq')
+            if recorded is not None and abs(recorded - frequency) <= self.freq_tolerance:
+                matching.append(i)
+        selected = matching or list(range(len(self.recordings)))
+        if selected != self._selected:
+            self._selected = selected
+            self._position = 0
+            self._current = None
+            self._exhausted = False
+
+    def _next_recording(self):
+        if self._position >= len(self._selected):
+            if not self.loop:
+                self._exhausted = True
+                return False
+            self._position = 0
+        self._current = self.recordings[self._selected[self._position]]['load']()
+        self._position += 1
+        self._offset = 0
+        return True
+
+    def stream(self, callback, block_size=256 * 1024):
+        """Play the selected recordings from the start, once (or forever with loop_stream)."""
+        loop, self.loop = self.loop, self.loop_stream
+        self._position, self._current, self._exhausted = 0, None, False
+        try:
+            super().stream(callback, block_size)
+        finally:
+            self.loop = loop
+            self._exhausted = False
+
+    def _read(self, num_samples):
+        out = np.empty(num_samples, dtype=np.complex64)
+        filled = 0
+        while filled < num_samples and not self._exhausted:
+            if self._current is None or self._offset >= len(self._current):
+                if not self._next_recording():
+                    break
+                continue
+            take = min(num_samples - filled, len(self._current) - self._offset)
+            out[filled:filled + take] = self._current[self._offset:self._offset + take]
+            filled += take
+            self._offset += take
+        return out[:filled]
+
+
+class SyntheticSource(IQSource):
+    """Generated IQ; the class played at each frequency comes from frequency_plan (default: noise)."""
+
+    def __init__(self, sample_rate=1.024e6, realtime=False, frequency_plan=None, seed=None):
+        super().__init__(sample_rate=sample_rate, realtime=realtime)
+        self.frequency_plan = dict(DEFAULT_FREQUENCY_PLAN if frequency_plan is None else frequency_plan)
+        self.rng = np.random.default_rng(seed)
+
+    def label_for(self, frequency):
+        for freq, label in self.frequency_plan.items():
+            if abs(freq - frequency) < 5e3:
+                return label
+        return 'noise'
+
+    def _read(self, num_samples):
+        from synthetic_iq import generate
+
+        return generate(self.label_for(self.center_freq), num_samples, self.rng, self.sample_rate)
+
+
+def open_source(spec='rtlsdr', sample_rate=1.024e6, gain=40):
+    """
+    Build a source from a --source string.
+
+    Args:
+        spec: 'rtlsdr', 'rtlsdr:INDEX', 'rtlsdr:serial=SERIAL', 'replay:PATH',
+              'replay-realtime:PATH', 'synthetic' or 'synthetic-realtime'
+        sample_rate: Requested sample rate (replay uses the recorded rate when known)
+        gain: Tuner gain for live devices
+    """
+    kind, _, arg = spec.partition(':')
+    if kind == 'rtlsdr':
+        if arg.startswith('serial='):
+            return RtlSdrSource(serial=arg[len('serial='):], sample_rate=sample_rate, gain=gain)
+        return RtlSdrSource(int(arg or 0), sample_rate=sample_rate, gain=gain)
+    if kind in ('replay', 'replay-realtime'):
+        if not arg:
+            raise ValueError("replay sources need a path, e.g. replay:datasets_validated")
+        return FileReplaySource(arg, sample_rate=sample_rate, realtime=(kind == 'replay-realtime'))
+    if kind in ('synthetic', 'synthetic-realtime'):
+        return SyntheticSource(sample_rate=sample_rate, realtime=(kind == 'synthetic-realtime'))
+    raise ValueError(f"Unknown source {spec!r}")
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Lite Inference Runtime
+Pure-NumPy predict/predict_proba for exported models; scikit-learn is only needed to export
+"""
+import numpy as np
+import json
+import os
+
+LITE_FORMAT_VERSION = 1
+
+
+class LiteScaler:
+    """StandardScaler.transform from mean_ and scale_."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class LiteForest:
+    """RandomForestClassifier as flattened node arrays, traversed for all trees at once."""
+
+    def __init__(self, classes, roots, left, right, feature, threshold, leaf_proba, max_depth):
+        self.classes_ = classes
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.leaf_proba = leaf_proba
+        self.max_depth = int(max_depth)
+
+    def predict_proba(self, X):
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        # Leaves point at themselves, so max_depth steps lands every sample on its leaf
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.leaf_proba[node].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class LiteSVC:
+    """One-vs-one SVC decision from support vectors and dual coefficients (no probabilities)."""
+
+    def __init__(self, classes, support_vectors, dual_coef, intercept, n_support, kernel, gamma):
+        self.classes_ = classes
+        self.support_vectors = support_vectors
+        self.dual_coef = dual_coef
+        self.intercept = intercept
+        self.n_support = n_support
+        self.kernel = kernel
+        self.gamma = float(gamma)
+
+    def _kernel(self, X):
+        if self.kernel == 'linear':
+            return X @ self.support_vectors.T
+        sq_dist = (np.sum(X ** 2, axis=1)[:, np.newaxis]
+                   - 2 * X @ self.support_vectors.T
+                   + np.sum(self.support_vectors ** 2, axis=1)[np.newaxis, :])
+        return np.exp(-self.gamma * np.maximum(sq_dist, 0))
+
+    def predict(self, X):
+        K = self._kernel(np.asarray(X, dtype=np.float64))
+        n_classes = len(self.classes_)
+        start = np.concatenate([[0], np.cumsum(self.n_support)])
+        votes = np.zeros((len(K), n_classes), dtype=np.int32)
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                sv_i = slice(start[i], start[i + 1])
+                sv_j = slice(start[j], start[j + 1])
+                decision = (K[:, sv_i] @ self.dual_coef[j - 1, sv_i]
+                            + K[:, sv_j] @ self.dual_coef[i, sv_j]
+                            + self.intercept[pair])
+                votes[:, i] += decision > 0
+                votes[:, j] += decision <= 0
+                pair += 1
+        return self.classes_[np.argmax(votes, axis=1)]
+
+
+class LiteKNN:
+    """Euclidean k-nearest-neighbours over the stored training matrix, uniform or inverse-distance weighted."""
+
+    def __init__(self, classes, reference, reference_labels, n_neighbors, weights='uniform'):
+        self.classes_ = classes
+        self.reference = reference
+        self.reference_labels = reference_labels
+        self.n_neighbors = int(n_neighbors)
+        self.weights = weights
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        sq_dist = (np.sum(X ** 2, axis=1)[:, np.newaxis]
+                   - 2 * X @ self.reference.T
+                   + np.sum(self.reference ** 2, axis=1)[np.newaxis, :])
+        nearest = np.argpartition(sq_dist, self.n_neighbors - 1, axis=1)[:, :self.n_neighbors]
+        votes = self.reference_labels[nearest]
+        if self.weights == 'distance':
+            # sklearn's rule: weight 1/d, and a query that coincides with neighbours takes only those
+            dist = np.sqrt(np.maximum(np.take_along_axis(sq_dist, nearest, axis=1), 0))
+            exact = dist <= 1e-12 * np.maximum(np.sqrt(np.sum(X ** 2, axis=1)), 1.0)[:, np.newaxis]
+            with np.errstate(divide='ignore'):
+                weight = np.where(exact.any(axis=1)[:, np.newaxis], exact, 1.0 / dist)
+        else:
+            weight = np.ones(votes.shape)
+        proba = np.zeros((len(X), len(self.classes_)))
+        for c in range(len(self.classes_)):
+            proba[:, c] = np.sum(weight * (votes == c), axis=1)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class LiteLinear:
+    """Logistic-loss SGDClassifier: one-vs-rest sigmoids, normalized like sklearn's predict_proba."""
+
+    def __init__(self, classes, coef, intercept):
+        self.classes_ = classes
+        self.coef = coef
+        self.intercept = intercept
+
+    def predict_proba(self, X):
+        decision = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        proba = 1 / (1 + np.exp(-np.clip(decision, -500, 500)))
+        if proba.shape[1] == 1:
+            return np.hstack([1 - proba, proba])
+        return proba / np.maximum(proba.sum(axis=1, keepdims=True), 1e-300)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _export_forest(model):
+    roots, left, right, feature, threshold, leaf_proba = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        own = np.arange(n) + offset
+        left.append(np.where(is_leaf, own, tree.children_left + offset))
+        right.append(np.where(is_leaf, own, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        value = tree.value[:, 0, :]
+        leaf_proba.append(value / np.maximum(value.sum(axis=1, keepdims=True), 1e-12))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n
+    return {
+        'roots': np.array(roots, dtype=np.int64),
+        'left': np.concatenate(left).astype(np.int64),
+        'right': np.concatenate(right).astype(np.int64),
+        'feature': np.concatenate(feature).astype(np.int64),
+        'threshold': np.concatenate(threshold).astype(np.float64),
+        'leaf_proba': np.concatenate(leaf_proba).astype(np.float64),
+        'max_depth': np.array(max_depth),
+    }
+
+
+def export_model(path, model, scaler, model_name='', front_end=None, feature_schema=None):
+    """
+    Compile a fitted RandomForest/SVC/KNN/SGD plus StandardScaler into a .npz file.
+
+    Args:
+        path: Output path (.npz)
+        model: Fitted RandomForestClassifier, SVC (rbf/linear), euclidean KNeighborsClassifier
+               (uniform or distance weights) or log-loss SGDClassifier
+        scaler: Fitted StandardScaler
+        model_name: Display name stored with the model
+        front_end: DDCFrontEnd.config() the features were extracted behind (None = full rate)
+        feature_schema: front_end.feature_schema() of the training features, checked when loading
+    """
+    kind = type(model).__name__
+    arrays = {
+        'classes': np.asarray(model.classes_).astype(str),
+        'scaler_mean': scaler.mean_,
+        'scaler_scale': scaler.scale_,
+    }
+    if kind == 'RandomForestClassifier':
+        arrays.update(_export_forest(model))
+    elif kind == 'SVC':
+        if model.kernel not in ('rbf', 'linear'):
+            raise ValueError(f"Lite export supports rbf/linear SVC kernels, not {model.kernel!r}")
+        # libsvm's own coefficients: for two classes the public dual_coef_/intercept_ are negated
+        arrays.update({
+            'support_vectors': model.support_vectors_,
+            'dual_coef': model._dual_coef_,
+            'intercept': model._intercept_,
+            'n_support': model.n_support_,
+            'gamma': np.array(model._gamma),
+        })
+    elif kind == 'KNeighborsClassifier':
+        if model.weights not in ('uniform', 'distance') or model.effective_metric_ != 'euclidean':
+            raise ValueError("Lite export supports uniform- or distance-weighted euclidean KNN only")
+        arrays.update({
+            'reference': model._fit_X,
+            'reference_labels': model._y,
+            'n_neighbors': np.array(model.n_neighbors),
+            'weights': np.array(model.weights),
+        })
+    elif kind == 'SGDClassifier':
+        if model.loss != 'log_loss':
+            raise ValueError(f"Lite export supports log_loss SGDClassifier only, not {model.loss!r}")
+        arrays.update({'coef': model.coef_, 'intercept': model.intercept_})
+    else:
+        raise ValueError(f"No lite export for {kind}")
+
+    meta = {'version': LITE_FORMAT_VERSION, 'kind': kind, 'model_name': model_name,
+            'kernel': getattr(model, 'kernel', None), 'front_end': front_end, 'feature_schema': feature_schema}
+    if kind == 'SVC':
+        # Every support vector sits on or inside the margin of its pairs, so any sign or layout slip shows here
+        lite = _lite_model(meta, arrays)
+        expected = np.asarray(model.predict(model.support_vectors_)).astype(str)
+        mismatches = np.count_nonzero(lite.predict(model.support_vectors_) != expected)
+        if mismatches:
+            raise ValueError(f"Lite SVC disagrees with scikit-learn on {mismatches} of "
+                             f"{len(model.support_vectors_)} support vectors; not exported")
+    # Replace atomically so a running classifier never loads a half-written file
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, path)
+
+
+def _lite_model(meta, a):
+    """Lite model object from export meta and arrays."""
+    classes = a['classes']
+    if meta['kind'] == 'RandomForestClassifier':
+        return LiteForest(classes, a['roots'], a['left'], a['right'], a['feature'],
+                          a['threshold'], a['leaf_proba'], a['max_depth'])
+    if meta['kind'] == 'SVC':
+        return LiteSVC(classes, a['support_vectors'], a['dual_coef'], a['intercept'],
+                       a['n_support'], meta['kernel'], a['gamma'])
+    if meta['kind'] == 'SGDClassifier':
+        return LiteLinear(classes, a['coef'], a['intercept'])
+    # Exports from before distance weighting carry no 'weights'
+    weights = str(a['weights']) if 'weights' in a else 'uniform'
+    return LiteKNN(classes, a['reference'], a['reference_labels'], a['n_neighbors'], weights)
+
+
+def load_lite_model(path):
+    """Load an exported model as a model_data dict (same keys classify_live uses)."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+    if meta.get('kind') == 'stft':
+        # train_stft.py's spectrogram network, classified through the same dict
+        from stft_features import load_stft_model
+        return load_stft_model(path).model_data()
+    with np.load(path, allow_pickle=False) as data:
+        if meta['version'] != LITE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported lite model version {meta['version']}")
+        a = {key: data[key] for key in data.files}
+
+    return {
+        'model': _lite_model(meta, a),
+        'scaler': LiteScaler(a['scaler_mean'], a['scaler_scale']),
+        'model_name': meta['model_name'],
+        'front_end': meta.get('front_end'),
+        'feature_schema': meta.get('feature_schema'),
+    }
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Model Selection
+Parallel successive-halving cross-validation over a hyperparameter grid, with a JSON leaderboard
+"""
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.svm import SVC
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+import json
+import math
+import multiprocessing
+import time
+
+MODEL_FACTORIES = {
+    'Random Forest': RandomForestClassifier,
+    'SVM': SVC,
+    'KNN': KNeighborsClassifier,
+}
+
+# The first entry per model is the configuration train_validated.py always used
+DEFAULT_GRID = {
+    'Random Forest': [
+        {'n_estimators': 100, 'random_state': 42},
+        {'n_estimators': 300, 'random_state': 42},
+        {'n_estimators': 100, 'max_features': None, 'random_state': 42},
+        {'n_estimators': 200, 'min_samples_leaf': 2, 'random_state': 42},
+    ],
+    'SVM': [
+        {'kernel': 'rbf', 'random_state': 42},
+        {'kernel': 'rbf', 'C': 10, 'random_state': 42},
+        {'kernel': 'rbf', 'C': 100, 'random_state': 42},
+        {'kernel': 'linear', 'random_state': 42},
+    ],
+    'KNN': [
+        {'n_neighbors': 5},
+        {'n_neighbors': 3},
+        {'n_neighbors': 9, 'weights': 'distance'},
+    ],
+}
+
+# Per-process fold data, filled in once by _init_folds
+_shared = {}
+
+
+class Candidate:
+    """One model configuration and the fold scores it has collected so far."""
+
+    def __init__(self, model_name, params):
+        self.model_name = model_name
+        self.params = dict(params)
+        self.fold_scores = {}
+        self.fit_times = []
+        self.eliminated_round = None
+        self.test_score = None
+
+    @property
+    def name(self):
+        args = ', '.join(f"{k}={v}" for k, v in self.params.items() if k != 'random_state')
+        return f"{self.model_name}({args})"
+
+    def build(self):
+        return MODEL_FACTORIES[self.model_name](**self.params)
+
+    @property
+    def cv_mean(self):
+        return float(np.mean(list(self.fold_scores.values()))) if self.fold_scores else 0.0
+
+    @property
+    def cv_std(self):
+        return float(np.std(list(self.fold_scores.values()))) if self.fold_scores else 0.0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'model': self.model_name,
+            'params': self.params,
+            'cv_mean': self.cv_mean,
+            'cv_std': self.cv_std,
+            'folds_evaluated': len(self.fold_scores),
+            'fold_scores': {str(k): v for k, v in sorted(self.fold_scores.items())},
+            'fit_time_s': float(np.sum(self.fit_times)),
+            'eliminated_round': self.eliminated_round,
+            'test_score': self.test_score,
+        }
+
+
+def load_grid(path):
+    """
+    Read a grid from JSON: {"Random Forest": [{"n_estimators": 100}, ...], "SVM": [...], ...}.
+
+    Model names must be keys of MODEL_FACTORIES.
+    """
+    with open(path) as f:
+        grid = json.load(f)
+    unknown = set(grid) - set(MODEL_FACTORIES)
+    if unknown:
+        raise ValueError(f"Unknown models in {path}: {sorted(unknown)} (known: {sorted(MODEL_FACTORIES)})")
+    return grid
+
+
+def make_folds(X, y, n_splits=5, seed=42):
+    """
+    Stratified folds, each scaled with a StandardScaler fit on its own training part.
+
+    Computed once; every candidate is scored on the same arrays.
+    """
+    folds = []
+    splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+    for train_idx, val_idx in splitter.split(X, y):
+        scaler = StandardScaler().fit(X[train_idx])
+        folds.append((scaler.transform(X[train_idx]), y[train_idx],
+                      scaler.transform(X[val_idx]), y[val_idx]))
+    return folds
+
+
+def _init_folds(folds):
+    _shared['folds'] = folds
+
+
+def _score_job(job):
+    """Fit one candidate on one fold: (candidate index, fold index, model name, params)."""
+    index, fold, model_name, params = job
+    X_train, y_train, X_val, y_val = _shared['folds'][fold]
+    start = time.perf_counter()
+    model = MODEL_FACTORIES[model_name](**params).fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    return index, fold, float(model.score(X_val, y_val)), fit_time
+
+
+def halving_schedule(n_splits, eta=2):
+    """Cumulative folds per round, growing by eta and ending with all folds (e.g. 5, eta 2 -> 1, 2, 5)."""
+    if eta < 2:
+        raise ValueError(f"eta must be at least 2 (each round keeps 1/eta of the candidates), got {eta}")
+    budgets = [n_splits]
+    while budgets[0] > 1:
+        budgets.insert(0, max(1, budgets[0] // eta))
+    return sorted(set(budgets))
+
+
+def successive_halving(candidates, folds, eta=2, workers=1, log=print):
+    """
+    Score candidates on a growing number of folds, keeping the best 1/eta after each round.
+
+    Only the folds a survivor has not been scored on yet are run in a
+    round, and all (candidate, fold) jobs of a round run in parallel.
+    eta < 2 raises ValueError.
+
+    Returns:
+        The survivors of the final round, best mean CV score first
+    """
+    schedule = halving_schedule(len(folds), eta)
+    alive = list(candidates)
+    pool = multiprocessing.Pool(workers, initializer=_init_folds, initargs=(folds,)) if workers > 1 else None
+    if pool is None:
+        _init_folds(folds)
+    try:
+        for round_index, n_folds in enumerate(schedule):
+            jobs = [(candidates.index(c), fold, c.model_name, c.params)
+                    for c in alive for fold in range(n_folds) if fold not in c.fold_scores]
+            start = time.perf_counter()
+            results = pool.imap_unordered(_score_job, jobs) if pool is not None else map(_score_job, jobs)
+            for index, fold, score, fit_time in results:
+                candidates[index].fold_scores[fold] = score
+                candidates[index].fit_times.append(fit_time)
+            alive.sort(key=lambda c: c.cv_mean, reverse=True)
+            log(f"Round {round_index + 1}: {len(alive)} candidates x {n_folds} folds "
+                f"({len(jobs)} fits, {time.perf_counter() - start:.1f} s), "
+                f"best {alive[0].name} {alive[0].cv_mean:.3f}")
+            if round_index < len(schedule) - 1:
+                keep = max(1, math.ceil(len(alive) / eta))
+                for c in alive[keep:]:
+                    c.eliminated_round = round_index + 1
+                alive = alive[:keep]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return alive
+
+
+def select_model(X, y, grid=None, n_splits=5, eta=2, workers=1, seed=42, log=print):
+    """
+    Run successive halving over grid on (X, y).
+
+    Returns:
+        (finalists best first, every candidate) -- Candidate objects
+    """
+    grid = grid if grid is not None else DEFAULT_GRID
+    candidates = [Candidate(name, params) for name, configs in grid.items() for params in configs]
+    folds = make_folds(X, y, n_splits=n_splits, seed=seed)
+    log(f"{len(candidates)} candidates, {n_splits} folds, halving by {eta}, {workers} workers")
+    finalists = successive_halving(candidates, folds, eta=eta, workers=workers, log=log)
+    return finalists, candidates
+
+
+def write_leaderboard(path, candidates, extra=None):
+    """All candidates ranked by folds survived, then mean CV score."""
+    ranked = sorted(candidates, key=lambda c: (len(c.fold_scores), c.cv_mean), reverse=True)
+    report = dict(extra or {})
+    report['leaderboard'] = [dict(c.to_dict(), rank=i + 1) for i, c in enumerate(ranked)]
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Model Server
+Loads a classifier once and serves it on localhost (HTTP or a Unix socket), micro-batching concurrent requests
+
+    POST /classify  {"features": [[...], ...]}                       feature rows
+                    {"captures": [{"iq_cu8": BASE64, "sample_rate": FS}, ...]}
+                                                                     raw 8-bit IQ, features extracted here
+        -> {"labels": [...], "probabilities": [[...], ...] or null, "classes": [...]}
+    GET  /health    model name/version, front end, feature kind, classes and batching statistics
+"""
+import numpy as np
+import argparse
+import base64
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from stream_classify import predict_batch, model_class_names
+
+DEFAULT_PORT = 8765
+
+
+class MicroBatcher:
+    """
+    Funnels concurrent prediction requests into batched predict_batch calls.
+
+    One thread owns the model: it takes the first waiting request, collects
+    whatever else arrives within max_wait (up to max_batch rows; a larger
+    single request goes alone) and runs a single scaler.transform +
+    predict_proba over all of them. Callers get a Future per request. A ModelReloader, if given, is polled between
+    batches so a retrained model is swapped in without a restart.
+    """
+
+    def __init__(self, model_data, max_batch=256, max_wait=0.005, reloader=None):
+        self.model_data = model_data
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.reloader = reloader
+        self.stats = {'requests': 0, 'rows': 0, 'batches': 0, 'max_batch_rows': 0, 'reloads': 0}
+        self._requests = queue.Queue()
+        # A request that did not fit the previous batch; it opens the next one
+        self._pending = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """Queue a (n, n_features) matrix; the Future resolves to (labels, probabilities or None)."""
+        future = Future()
+        self._requests.put((np.atleast_2d(np.asarray(features, dtype=np.float32)), future))
+        return future
+
+    def classify(self, features, timeout=None):
+        return self.submit(features).result(timeout)
+
+    def close(self):
+        self._requests.put(None)
+        self._thread.join()
+
+    def _collect(self):
+        first = self._pending if self._pending is not None else self._requests.get()
+        self._pending = None
+        if first is None:
+            return None
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._requests.put(None)
+                break
+            if rows + len(item[0]) > self.max_batch:
+                self._pending = item
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            if self.reloader is not None and self.reloader.poll() is not None:
+                self.model_data = self.reloader.model_data
+                self.stats['reloads'] += 1
+            try:
+                labels, probabilities = predict_batch(self.model_data, np.concatenate([f for f, _ in batch]))
+            except Exception:
+                # One malformed request must not fail the others batched with it
+                for features, future in batch:
+                    try:
+                        future.set_result(predict_batch(self.model_data, features))
+                    except Exception as e:
+                        future.set_exception(e)
+                self.stats['requests'] += len(batch)
+                continue
+            start = 0
+            for features, future in batch:
+                stop = start + len(features)
+                future.set_result((labels[start:stop],
+                                   probabilities[start:stop] if probabilities is not None else None))
+                start = stop
+            self.stats['requests'] += len(batch)
+            self.stats['rows'] += start
+            self.stats['batches'] += 1
+            self.stats['max_batch_rows'] = max(self.stats['max_batch_rows'], start)
+
+
+def _capture_features(captures, model_data):
+    """
+    Feature rows for base64 cu8 captures behind the model's front end, one batch per (sample rate, length).
+
+    Captures at a rate the model was not trained on raise FeatureSchemaError (a ValueError).
+    """
+    from iq_dataset import uint8_to_iq
+    from front_end import model_extractor
+
+    decoded = [(float(c.get('sample_rate', 1.024e6)),
+                uint8_to_iq(np.frombuffer(base64.b64decode(c['iq_cu8']), dtype=np.uint8)))
+               for c in captures]
+    features = [None] * len(decoded)
+    for key in {(rate, len(samples)) for rate, samples in decoded}:
+        rows = [i for i, (rate, samples) in enumerate(decoded) if (rate, len(samples)) == key]
+        # Looked up per request: a hot reload may bring a model with a different front end
+        extractor = model_extractor(model_data, key[0])
+        for i, row in zip(rows, extractor.extract_batch(np.stack([decoded[i][1] for i in rows]))):
+            features[i] = row
+    return np.array(features, dtype=np.float32)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # Unix socket peers have no host/port
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._reply(404, {'error': f"unknown path {self.path}"})
+        batcher = self.server.batcher
+        model_data = batcher.model_data
+        stats = dict(batcher.stats)
+        stats['mean_batch_rows'] = stats['rows'] / stats['batches'] if stats['batches'] else 0.0
+        self._reply(200, {'model': model_data.get('model_name', type(model_data['model']).__name__),
+                          'version': model_data.get('version'), 'front_end': model_data.get('front_end'),
+                          'feature_kind': model_data.get('feature_kind', 'scalar'), 'stft': model_data.get('stft'),
+                          'feature_schema': (model_data.get('feature_schema') or {}).get('hash'),
+                          'classes': model_class_names(model_data), 'stats': stats})
+
+    def do_POST(self):
+        if self.path != '/classify':
+            return self._reply(404, {'error': f"unknown path {self.path}"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if 'captures' in request:
+                features = _capture_features(request['captures'], self.server.batcher.model_data)
+            else:
+                features = np.asarray(request['features'], dtype=np.float32)
+        except (ValueError, KeyError, TypeError) as e:
+            return self._reply(400, {'error': f"bad request: {e}"})
+        try:
+            labels, probabilities = self.server.batcher.classify(features)
+        except Exception as e:
+            return self._reply(500, {'error': str(e)})
+        self._reply(200, {
+            'labels': labels,
+            'probabilities': probabilities.tolist() if probabilities is not None else None,
+            'classes': model_class_names(self.server.batcher.model_data),
+        })
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(batcher, address, verbose=False):
+    """
+    HTTP server for batcher on 'HOST:PORT' (localhost only by default) or 'unix:PATH'.
+
+    Every connection gets its own thread; they all feed the one batcher.
+    """
+    if address.startswith('unix:'):
+        path = address[len('unix:'):]
+        if os.path.exists(path):
+            os.remove(path)
+        server = _UnixHTTPServer(path, _Handler)
+    else:
+        host, _, port = address.rpartition(':')
+        server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), _Handler)
+        server.daemon_threads = True
+    server.batcher = batcher
+    server.verbose = verbose
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=30):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class ModelClient:
+    """
+    Client for a running model server; keeps one keep-alive connection per thread.
+
+    Args:
+        address: 'http://HOST:PORT', 'HOST:PORT' or 'unix:PATH'
+    """
+
+    def __init__(self, address=f'127.0.0.1:{DEFAULT_PORT}', timeout=30):
+        self.address = address[len('http://'):] if address.startswith('http://') else address
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self.address.startswith('unix:'):
+                connection = _UnixHTTPConnection(self.address[len('unix:'):], timeout=self.timeout)
+            else:
+                host, _, port = self.address.rpartition(':')
+                connection = http.client.HTTPConnection(host, int(port), timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = json.loads(response.read())
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # Server closed the idle keep-alive connection; reconnect once
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Model server: {data.get('error', response.status)}")
+        return data
+
+    def classify(self, features):
+        """(n, n_features) -> (labels, probabilities or None), like stream_classify.predict_batch."""
+        features = np.atleast_2d(np.asarray(features, dtype=np.float32))
+        reply = self._request('POST', '/classify', {'features': features.tolist()})
+        probabilities = reply['probabilities']
+        return reply['labels'], np.array(probabilities) if probabilities is not None else None
+
+    def classify_captures(self, captures, sample_rate=1.024e6):
+        """Send raw interleaved uint8 captures; the server extracts features."""
+        payload = {'captures': [{'iq_cu8': base64.b64encode(np.asarray(c, dtype=np.uint8).tobytes()).decode(),
+                                 'sample_rate': sample_rate} for c in captures]}
+        reply = self._request('POST', '/classify', payload)
+        probabilities = reply['probabilities']
+        return reply['labels'], np.array(probabilities) if probabilities is not None else None
+
+    def health(self):
+        return self._request('GET', '/health')
+
+
+def main():
+    from classify_live import load_model, model_files
+    from model_store import ModelReloader
+
+    parser = argparse.ArgumentParser(description='Serve a trained classifier on localhost with micro-batching')
+    parser.add_argument('--model', default='rtl_classifier.pkl', help='Model pickle or .npz lite export')
+    parser.add_argument('--listen', default=f'127.0.0.1:{DEFAULT_PORT}', help='HOST:PORT or unix:PATH')
+    parser.add_argument('--max-batch', type=int, default=256, help='Most feature rows per predict call')
+    parser.add_argument('--max-wait', type=float, default=0.005,
+                        help='Seconds to wait for more requests before predicting (latency cost of batching)')
+    parser.add_argument('--reload', action='store_true', help='Hot-reload --model when it is replaced on disk')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    model_data = load_model(args.model)
+    reloader = (ModelReloader(args.model, load_model, model_data, watch=model_files(args.model))
+                if args.reload else None)
+    batcher = MicroBatcher(model_data, max_batch=args.max_batch, max_wait=args.max_wait, reloader=reloader)
+    server = make_server(batcher, args.listen, verbose=args.verbose)
+    print(f"🧠 Serving {args.model} ({', '.join(model_class_names(model_data))}) on {args.listen}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        stats = batcher.stats
+        if stats['batches']:
+            print(f"\n   {stats['requests']} requests, {stats['rows']} rows in {stats['batches']} batches "
+                  f"(mean {stats['rows'] / stats['batches']:.1f} rows/batch)")
+
+
+if __name__ == '__main__':
+    main()
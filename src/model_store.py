@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Model Store
+Atomic, versioned model saves and hot reloading for long-running classifiers
+"""
+import glob
+import os
+import pickle
+import re
+import time
+from datetime import datetime
+
+
+def _versions(path):
+    """Existing (version, path) pairs for <stem>.vN<ext> next to path, oldest first."""
+    stem, ext = os.path.splitext(path)
+    pattern = re.compile(re.escape(os.path.basename(stem)) + r'\.v(\d+)' + re.escape(ext) + '$')
+    found = []
+    for candidate in glob.glob(f"{glob.escape(stem)}.v*{ext}"):
+        match = pattern.match(os.path.basename(candidate))
+        if match:
+            found.append((int(match.group(1)), candidate))
+    return sorted(found)
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def save_model(path, model_data, keep=5):
+    """
+    Pickle model_data to path atomically and keep a numbered copy.
+
+    Writes <stem>.vN<ext> (N one past the newest existing version), then
+    replaces path itself, so readers only ever see a complete model. Only
+    the newest `keep` numbered copies are kept.
+
+    Returns:
+        The version number written (also stored as model_data['version'])
+    """
+    existing = _versions(path)
+    version = existing[-1][0] + 1 if existing else 1
+    model_data = dict(model_data, version=version,
+                      saved_at=datetime.now().isoformat(timespec='seconds'))
+    payload = pickle.dumps(model_data)
+    stem, ext = os.path.splitext(path)
+    _write_atomic(f"{stem}.v{version}{ext}", lambda f: f.write(payload))
+    _write_atomic(path, lambda f: f.write(payload))
+    for _, old in (existing + [(version, None)])[:-keep]:
+        if old is not None:
+            os.remove(old)
+    return version
+
+
+class ModelReloader:
+    """
+    Watches a model file and reloads it when it changes.
+
+    poll() costs one os.stat per watched file at most every `interval`
+    seconds; a changed (mtime, size) of any of them triggers loader(path).
+    watch defaults to path alone; a loader that may resolve path to another
+    file (classify_live.load_model picks up a sibling .npz) should have all
+    of them watched. Because save_model() replaces the file atomically, a
+    reload never sees a half-written model. Load errors keep the current
+    model.
+    """
+
+    def __init__(self, path, loader, model_data=None, interval=2.0, watch=None):
+        self.path = path
+        self.loader = loader
+        self.interval = interval
+        self.watch = tuple(watch) if watch is not None else (path,)
+        self._signature = self._stat()
+        self.model_data = model_data if model_data is not None else loader(path)
+        self.reloads = 0
+        self._next_check = time.monotonic() + interval
+
+    def _stat(self):
+        signature = []
+        for path in self.watch:
+            try:
+                st = os.stat(path)
+            except OSError:
+                signature.append(None)
+                continue
+            signature.append((st.st_mtime_ns, st.st_size))
+        return tuple(signature) if any(signature) else None
+
+    def poll(self):
+        """Return the new model_data if a watched file changed since the last load, else None."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return None
+        self._next_check = now + self.interval
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        try:
+            model_data = self.loader(self.path)
+        except Exception as e:
+            print(f"   ⚠️  Model reload failed, keeping current model: {e}")
+            return None
+        self._signature = signature
+        self.model_data = model_data
+        self.reloads += 1
+        return model_data
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Multi-Dongle Scheduler
+Shards a frequency plan across several receivers (one process each) and merges their results
+"""
+import numpy as np
+import argparse
+import json
+import multiprocessing
+import queue
+import sys
+import time
+from collections import namedtuple
+
+from iq_source import DEFAULT_FREQUENCY_PLAN
+
+MultiResult = namedtuple('MultiResult', ['timestamp', 'device', 'frequency', 'label', 'confidence',
+                                         'duration', 'round'])
+
+# How long the scheduler waits on the result queue before checking worker health
+_POLL_INTERVAL = 0.5
+
+
+def _device_worker(name, spec, model_path, options, tasks, events):
+    """
+    One receiver: open the source, then classify frequencies from the shared task queue.
+
+    Every job is announced ('start') before capture so the scheduler can
+    requeue it if this process dies. Capture errors hand the job back
+    ('retry'); max_failures consecutive errors retire the device ('failed').
+    """
+    try:
+        from iq_source import open_source
+        from classify_live import load_model, classify_signal
+        from adaptive_capture import adaptive_classify
+
+        source = open_source(spec, sample_rate=options['sample_rate'], gain=options['gain'])
+        model_data = load_model(model_path)
+    except Exception as e:
+        events.put(('failed', name, None, f"open: {e}"))
+        return
+
+    failures = 0
+    try:
+        while True:
+            job = tasks.get()
+            if job is None:
+                return
+            events.put(('start', name, job, None))
+            try:
+                started = time.time()
+                if options['adaptive']:
+                    result = adaptive_classify(source, model_data, job['frequency'],
+                                               max_duration=options['duration'],
+                                               confidence=options['confidence'])
+                    label, confidence, duration = result.label, result.confidence, result.duration
+                else:
+                    label, probs = classify_signal(source, model_data, job['frequency'],
+                                                   duration=options['duration'])
+                    confidence = float(np.max(probs)) if probs is not None else None
+                    duration = options['duration']
+            except Exception as e:
+                failures += 1
+                events.put(('retry', name, job, str(e)))
+                if failures >= options['max_failures']:
+                    events.put(('failed', name, None, f"{failures} consecutive errors, last: {e}"))
+                    return
+                continue
+            failures = 0
+            events.put(('result', name, job,
+                        MultiResult(started, name, job['frequency'], label, confidence, duration, job['round'])))
+    finally:
+        source.close()
+
+
+class DeviceScheduler:
+    """
+    Distribute frequency jobs over one process per receiver.
+
+    Devices pull jobs from a shared queue, so faster or less loaded
+    receivers take more of the plan and a retired device's share moves to
+    the rest automatically. Jobs in flight on a device that errors or dies
+    are requeued (up to max_attempts).
+    """
+
+    def __init__(self, devices, model_path, duration=0.5, adaptive=False, confidence=0.9,
+                 sample_rate=1.024e6, gain=40, max_failures=3, max_attempts=3):
+        # The same spec twice (e.g. two synthetic stand-ins) gets numbered names
+        self.devices = {}
+        for i, spec in enumerate(devices):
+            name = spec if list(devices).count(spec) == 1 else f"{spec}#{i}"
+            self.devices[name] = spec
+        self.model_path = model_path
+        self.options = {'duration': duration, 'adaptive': adaptive, 'confidence': confidence,
+                        'sample_rate': sample_rate, 'gain': gain, 'max_failures': max_failures}
+        self.max_attempts = max_attempts
+        self.stats = {'results': 0, 'retries': 0, 'dropped_jobs': 0,
+                      'per_device': {name: 0 for name in self.devices}, 'failed_devices': {}}
+        self._tasks = None
+        self._events = None
+        self._workers = {}
+
+    def start(self):
+        # spawn: every worker opens its own USB handle in a clean interpreter
+        context = multiprocessing.get_context('spawn')
+        self._tasks = context.Queue()
+        self._events = context.Queue()
+        for name, spec in self.devices.items():
+            process = context.Process(target=_device_worker, daemon=True,
+                                      args=(name, spec, self.model_path, self.options, self._tasks, self._events))
+            process.start()
+            self._workers[name] = process
+        return self
+
+    def _alive(self):
+        return [name for name, p in self._workers.items()
+                if p.is_alive() and name not in self.stats['failed_devices']]
+
+    def _requeue(self, job, pending):
+        job = dict(job, attempt=job['attempt'] + 1)
+        if job['attempt'] >= self.max_attempts:
+            self.stats['dropped_jobs'] += 1
+            pending.discard(job['id'])
+            return
+        self._tasks.put(job)
+
+    def run(self, frequencies, rounds=1):
+        """
+        Classify every frequency `rounds` times (0 = forever), yielding MultiResult as they arrive.
+
+        Raises RuntimeError if every device has failed.
+        """
+        round_index = 0
+        job_id = 0
+        while rounds == 0 or round_index < rounds:
+            pending = set()
+            for frequency in frequencies:
+                self._tasks.put({'id': job_id, 'frequency': frequency, 'round': round_index, 'attempt': 0})
+                pending.add(job_id)
+                job_id += 1
+            in_flight = {}
+            while pending:
+                try:
+                    kind, name, job, payload = self._events.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    kind = None
+                if kind == 'start':
+                    in_flight[name] = job
+                elif kind == 'result':
+                    in_flight.pop(name, None)
+                    pending.discard(job['id'])
+                    self.stats['results'] += 1
+                    self.stats['per_device'][name] += 1
+                    yield payload
+                elif kind == 'retry':
+                    in_flight.pop(name, None)
+                    self.stats['retries'] += 1
+                    print(f"   ⚠️  {name}: {payload} (requeueing {job['frequency']/1e6:.3f} MHz)", file=sys.stderr)
+                    self._requeue(job, pending)
+                elif kind == 'failed':
+                    self.stats['failed_devices'][name] = payload
+                    print(f"   ❌ {name} retired: {payload}", file=sys.stderr)
+
+                # A worker that died without reporting still holds its job
+                for name, process in self._workers.items():
+                    if not process.is_alive() and name in in_flight:
+                        self.stats['failed_devices'].setdefault(name, f"exited with code {process.exitcode}")
+                        self._requeue(in_flight.pop(name), pending)
+                if pending and not self._alive():
+                    raise RuntimeError(f"All devices failed: {self.stats['failed_devices']}")
+            round_index += 1
+
+    def stop(self):
+        for _ in self._workers:
+            self._tasks.put(None)
+        for process in self._workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+def frequency_range(start, stop, step):
+    return list(np.arange(start, stop + step / 2, step))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classify a frequency plan across several receivers')
+    parser.add_argument('--devices', nargs='+', default=['rtlsdr:0'],
+                        help='Source per receiver: rtlsdr:INDEX, rtlsdr:serial=SERIAL, replay:PATH, synthetic...')
+    parser.add_argument('--model', default='rtl_classifier.pkl', help='Model pickle or .npz lite export')
+    parser.add_argument('--freqs', type=float, nargs='+', help='Frequencies (Hz); default is the capture plan')
+    parser.add_argument('--range', type=float, nargs=3, metavar=('START', 'STOP', 'STEP'),
+                        help='Scan START..STOP every STEP Hz instead of --freqs')
+    parser.add_argument('--rounds', type=int, default=1, help='Passes over the plan (0 = run until Ctrl+C)')
+    parser.add_argument('--duration', type=float, default=0.5, help='Capture length (max with --adaptive)')
+    parser.add_argument('--adaptive', action='store_true', help='Adaptive settle and early stopping')
+    parser.add_argument('--output', help='Append results here as JSON lines')
+    args = parser.parse_args()
+
+    if args.range:
+        frequencies = frequency_range(*args.range)
+    else:
+        frequencies = args.freqs or sorted(DEFAULT_FREQUENCY_PLAN)
+
+    print("="*60)
+    print("RTL-ML MULTI-DONGLE SCHEDULER")
+    print("="*60)
+    print(f"\n📡 {len(args.devices)} devices, {len(frequencies)} frequencies, "
+          f"{args.rounds or '∞'} round(s)")
+
+    scheduler = DeviceScheduler(args.devices, args.model, duration=args.duration, adaptive=args.adaptive)
+    scheduler.start()
+    output = open(args.output, 'a') if args.output else None
+    start = time.perf_counter()
+    try:
+        for result in scheduler.run(frequencies, rounds=args.rounds):
+            stamp = time.strftime('%H:%M:%S', time.localtime(result.timestamp))
+            confidence = f" ({result.confidence*100:.1f}%)" if result.confidence is not None else ""
+            print(f"   {stamp}  {result.frequency/1e6:10.4f} MHz  {result.label}{confidence}  [{result.device}]")
+            if output:
+                output.write(json.dumps(result._asdict()) + '\n')
+                output.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        if output:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    stats = scheduler.stats
+    print(f"\n✅ {stats['results']} classifications in {elapsed:.1f} s "
+          f"({stats['results'] / max(elapsed, 1e-9):.2f}/s)")
+    for name, count in stats['per_device'].items():
+        state = f"  ❌ {stats['failed_devices'][name]}" if name in stats['failed_devices'] else ""
+        print(f"   {name}: {count}{state}")
+    if stats['retries'] or stats['dropped_jobs']:
+        print(f"   Retries: {stats['retries']}  Dropped jobs: {stats['dropped_jobs']}")
+
+
+if __name__ == '__main__':
+    main()
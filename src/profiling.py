@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Profiling
+Per-stage latency histograms, counters and gauges for the hot paths; off (and ~free) by default
+
+    from profiling import profiler
+    with profiler.stage('read_samples'):
+        samples = sdr.read_samples(n)
+
+Enable with profiler.enable() (classify_live.py --profile / --metrics) and
+read results with profiler.snapshot(), to_json() or to_prometheus().
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of nanosecond durations (4 buckets per power of two, <19% error).
+
+    record() is a few integer operations; quantiles are read from the bucket
+    counts, so memory stays constant however many samples are recorded.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    @staticmethod
+    def bucket(ns):
+        if ns < 4:
+            return ns
+        bits = ns.bit_length()
+        return 4 * (bits - 2) + ((ns >> (bits - 3)) & 3)
+
+    @staticmethod
+    def bucket_bounds(index):
+        if index < 4:
+            return index, index + 1
+        octave, step = divmod(index, 4)
+        return (4 + step) << (octave - 1), (5 + step) << (octave - 1)
+
+    def record(self, ns):
+        index = self.bucket(ns)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_ns += ns
+        if self.min_ns is None or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def quantile(self, q):
+        """Approximate q-quantile in ns (bucket midpoint, clamped to the observed range)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                low, high = self.bucket_bounds(index)
+                return min(max((low + high) / 2, self.min_ns), self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        """count, mean and p50/p95/p99/max in milliseconds."""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ns / self.count / 1e6,
+            'p50_ms': self.quantile(0.50) / 1e6,
+            'p95_ms': self.quantile(0.95) / 1e6,
+            'p99_ms': self.quantile(0.99) / 1e6,
+            'max_ms': self.max_ns / 1e6,
+        }
+
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+class Profiler:
+    """
+    Named stage histograms plus counters (e.g. dropped samples) and gauges (e.g. queue depths).
+
+    While disabled, stage() returns a shared no-op context manager and
+    count()/gauge() return immediately.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._dump_thread = None
+        self._dump_stop = threading.Event()
+
+    def enable(self):
+        self.enabled = True
+        return self
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    def stage(self, name):
+        """Context manager timing one pass through a stage."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, ns):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(ns)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'stages': {name: h.summary() for name, h in self.histograms.items()},
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix='rtl_ml'):
+        """Prometheus text exposition format (stage latencies as summaries, in seconds)."""
+        snapshot = self.snapshot()
+        lines = [f'# TYPE {prefix}_stage_seconds summary']
+        for name, stats in sorted(snapshot['stages'].items()):
+            if not stats['count']:
+                continue
+            for q in ('50', '95', '99'):
+                lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="0.{q}"}} '
+                             f'{stats[f"p{q}_ms"] / 1e3:.9f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} '
+                         f'{stats["mean_ms"] * stats["count"] / 1e3:.9f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {value}')
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            lines.append(f'{prefix}_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Write a snapshot atomically; .prom files get Prometheus text, anything else JSON."""
+        payload = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def start_periodic_dump(self, path, interval=10.0):
+        """Rewrite path every interval seconds from a daemon thread (e.g. for node_exporter's textfile collector)."""
+        def run():
+            while not self._dump_stop.wait(interval):
+                self.dump(path)
+        self._dump_stop.clear()
+        self._dump_thread = threading.Thread(target=run, daemon=True)
+        self._dump_thread.start()
+
+    def stop_periodic_dump(self):
+        if self._dump_thread is not None:
+            self._dump_stop.set()
+            self._dump_thread.join()
+            self._dump_thread = None
+
+    def report(self):
+        """Human-readable stage table."""
+        snapshot = self.snapshot()
+        lines = [f"   {'stage':16s} {'count':>7s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}"]
+        for name, stats in snapshot['stages'].items():
+            if stats['count']:
+                lines.append(f"   {name:16s} {stats['count']:7d} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} "
+                             f"{stats['p99_ms']:9.2f} {stats['max_ms']:9.2f}")
+        for name, value in snapshot['counters'].items():
+            lines.append(f"   {name}: {value}")
+        for name, value in snapshot['gauges'].items():
+            lines.append(f"   {name}: {value}")
+        return '\n'.join(lines)
+
+
+# Process-wide instance used by classify_live, stream_classify and friends
+profiler = Profiler()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Command Line
+One entry point for every tool: rtl-ml <command> [options] (python src/rtl_ml.py <command> ...)
+
+Only the module behind the chosen command is imported, and those modules
+import their heavy dependencies (scikit-learn, matplotlib, scipy.signal,
+tqdm) inside the code paths that use them, so e.g. `rtl-ml classify` with a
+lite model never loads scikit-learn.
+"""
+import importlib
+import sys
+
+# command -> (module with a main(), one-line description)
+COMMANDS = {
+    'capture': ('capture_validated', 'Capture and validate a training dataset'),
+    'train': ('train_validated', 'Train and select a classifier on a dataset'),
+    'train-incremental': ('train_incremental', 'Fold new captures into an incremental model'),
+    'train-stft': ('train_stft', 'Train the STFT spectrogram classifier'),
+    'classify': ('classify_live', 'Classify live (or replayed/synthetic) signals'),
+    'scan': ('scanner', 'Wideband scan, classifying FFT-channelized sub-bands'),
+    'multi': ('multi_sdr', 'Shard a frequency plan across several receivers'),
+    'serve': ('model_server', 'Serve a model on localhost with micro-batching'),
+    'render': ('spectrogram_render', 'Render spectrogram thumbnails for a dataset'),
+    'convert': ('iq_dataset', 'Convert a .npy capture tree into binary IQ shards'),
+    'index': ('dataset_manifest', 'Index, query and verify a .npy capture tree'),
+    'cache': ('feature_cache', 'List and prune the feature caches of a dataset'),
+    'bench': ('benchmark', 'Benchmark suite, including startup times'),
+}
+
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = ["usage: rtl-ml <command> [options]", "", "commands:"]
+    lines += [f"  {name:{width}s}  {description}" for name, (_, description) in COMMANDS.items()]
+    lines += ["", "rtl-ml <command> --help shows the options of a command."]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"rtl-ml: unknown command {command!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    module = importlib.import_module(COMMANDS[command][0])
+    # The command's own argparse parser reads sys.argv; its prog shows as "rtl-ml <command>"
+    sys.argv = [f"rtl-ml {command}"] + args
+    return module.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Wideband Scanner
+One capture per tuning, FFT-channelized into sub-bands that are classified as a batch
+"""
+import numpy as np
+from scipy import fft as sp_fft
+import argparse
+import json
+import time
+
+from front_end import FeatureSchemaError, baseband_bins, spectrum_to_baseband, channel_extractor
+from stream_classify import predict_batch
+from iq_source import open_source
+from adaptive_capture import SettleDetector
+
+
+def channelize(samples, n_channels):
+    """
+    Split a capture into n_channels adjacent baseband sub-bands.
+
+    FFT channelizer: one forward FFT of the whole capture, the spectrum is
+    cut into n_channels contiguous slices and each slice is brought back to
+    the time domain with one batched inverse FFT. This is the DDC front
+    end's slice-and-ifft (front_end.spectrum_to_baseband) once per channel,
+    with the same 1/n_channels scaling, so channel amplitudes match the capture.
+
+    Args:
+        samples: Complex IQ samples (truncated to a multiple of n_channels)
+        n_channels: Number of sub-bands
+
+    Returns:
+        (n_channels, len(samples) // n_channels) complex array, lowest
+        frequency first, each sampled at sample_rate / n_channels
+    """
+    samples = np.asarray(samples, dtype=np.complex64)
+    per_channel = len(samples) // n_channels
+    n_samples = per_channel * n_channels
+    spectrum = sp_fft.fft(samples[:n_samples])
+    # Centre bin of each contiguous slice of the centred spectrum, in FFT order
+    centres = np.arange(n_channels) * per_channel + per_channel // 2 - n_samples // 2
+    return spectrum_to_baseband(spectrum, baseband_bins(n_samples, per_channel, centres), n_channels)
+
+
+def channel_offsets(n_channels, sample_rate):
+    """Centre frequency offset (Hz) of each channelize() output row."""
+    channel_bw = sample_rate / n_channels
+    return (np.arange(n_channels) - n_channels // 2) * channel_bw + (channel_bw / 2 if n_channels % 2 == 0 else 0)
+
+
+def plan_tunings(start_freq, stop_freq, sample_rate, usable_fraction=0.75):
+    """Centre frequencies that cover [start, stop] using the flat middle of each capture."""
+    step = sample_rate * usable_fraction
+    centers = []
+    center = start_freq + step / 2
+    while center - step / 2 < stop_freq:
+        centers.append(center)
+        center += step
+    return centers
+
+
+class BandScanner:
+    """Step across a frequency range, channelize each capture and classify every channel."""
+
+    def __init__(self, sdr, model_data=None, n_channels=8, duration=0.5, settle=0.05,
+                 usable_fraction=0.75, threshold_db=6.0, settle_detector=None):
+        self.sdr = sdr
+        self.model_data = model_data
+        self.n_channels = n_channels
+        self.duration = duration
+        self.settle = settle
+        self.usable_fraction = usable_fraction
+        self.threshold_db = threshold_db
+        self.settle_detector = settle_detector
+        self.sample_rate = sdr.sample_rate
+        # The channelizer is the front end here: channels go straight to the extractor (never through the
+        # model's DDC a second time) and must run at the model's feature rate
+        self.extractor = channel_extractor(model_data, self.sample_rate / n_channels)
+
+    def scan_tuning(self, center_freq):
+        """Capture once at center_freq and return one result dict per usable channel."""
+        self.sdr.center_freq = center_freq
+        if self.settle_detector is not None:
+            self.settle_detector.settle(self.sdr)
+        else:
+            time.sleep(self.settle)
+        samples = self.sdr.read_samples(int(self.sample_rate * self.duration))
+
+        channels = channelize(samples, self.n_channels)
+        offsets = channel_offsets(self.n_channels, self.sample_rate)
+        keep = np.abs(offsets) <= self.sample_rate * self.usable_fraction / 2
+        channels, offsets = channels[keep], offsets[keep]
+
+        power = np.mean(channels.real ** 2 + channels.imag ** 2, axis=1)
+        power_db = 10 * np.log10(power + 1e-20)
+
+        labels = [None] * len(channels)
+        confidences = [None] * len(channels)
+        if self.model_data is not None:
+            features = self.extractor.extract_batch(channels)
+            labels, probabilities = predict_batch(self.model_data, features)
+            if probabilities is not None:
+                confidences = [float(p) for p in probabilities.max(axis=1)]
+
+        return [{
+            'freq': float(center_freq + offset),
+            'tuning': float(center_freq),
+            'power_db': float(p_db),
+            'label': label,
+            'confidence': confidence,
+        } for offset, p_db, label, confidence in zip(offsets, power_db, labels, confidences)]
+
+    def scan(self, start_freq, stop_freq):
+        """Scan [start, stop] and return the band occupancy map, sorted by frequency."""
+        results = []
+        for center in plan_tunings(start_freq, stop_freq, self.sample_rate, self.usable_fraction):
+            results.extend(r for r in self.scan_tuning(center) if start_freq <= r['freq'] <= stop_freq)
+        results.sort(key=lambda r: r['freq'])
+
+        # Occupied = this many dB above the band's median (noise floor estimate)
+        if results:
+            floor_db = float(np.median([r['power_db'] for r in results]))
+            for r in results:
+                r['occupied'] = r['power_db'] - floor_db >= self.threshold_db
+        return results
+
+
+def print_occupancy(results):
+    """Text occupancy map: one line per channel with a power bar."""
+    if not results:
+        return
+    floor_db = min(r['power_db'] for r in results)
+    for r in results:
+        bar = "█" * int(min(40, max(0, r['power_db'] - floor_db)))
+        label = f"{r['label']} ({r['confidence']*100:.0f}%)" if r['confidence'] is not None else (r['label'] or '')
+        mark = "●" if r.get('occupied') else " "
+        print(f"   {mark} {r['freq']/1e6:10.4f} MHz {r['power_db']:7.1f} dB {bar:40s} {label}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RTL-ML wideband band scanner')
+    parser.add_argument('start', type=float, help='Start frequency (Hz)')
+    parser.add_argument('stop', type=float, help='Stop frequency (Hz)')
+    parser.add_argument('--channels', type=int, default=8, help='Sub-bands per tuning')
+    parser.add_argument('--sample-rate', type=float, default=1.024e6)
+    parser.add_argument('--duration', type=float, default=0.5, help='Capture length per tuning (s)')
+    parser.add_argument('--threshold', type=float, default=6.0, help='Occupied if this many dB above floor')
+    parser.add_argument('--model', help='Classifier pickle (or .npz lite/STFT export) whose features run at the channel '
+                                        'rate (--sample-rate / --channels), e.g. trained behind --decimation')
+    parser.add_argument('--output', default='occupancy_map.json')
+    parser.add_argument('--adaptive-settle', action='store_true',
+                        help='Detect tuner settling from signal power instead of a fixed sleep')
+    parser.add_argument('--source', default='rtlsdr',
+                        help='rtlsdr[:INDEX], replay:PATH, replay-realtime:PATH or synthetic')
+    args = parser.parse_args()
+
+    print("="*60)
+    print("RTL-ML BAND SCANNER")
+    print("="*60)
+
+    model_data = None
+    if args.model:
+        from classify_live import load_model
+        model_data = load_model(args.model)
+
+    sdr = open_source(args.source, sample_rate=args.sample_rate, gain=40)
+    tunings = plan_tunings(args.start, args.stop, sdr.sample_rate)
+    print(f"\n📡 {args.start/1e6:.3f}-{args.stop/1e6:.3f} MHz: {len(tunings)} tunings x {args.channels} channels")
+
+    try:
+        scanner = BandScanner(sdr, model_data, n_channels=args.channels, duration=args.duration,
+                              threshold_db=args.threshold,
+                              settle_detector=SettleDetector() if args.adaptive_settle else None)
+    except FeatureSchemaError as e:
+        sdr.close()
+        parser.error(f"{args.model}: {e}")
+    try:
+        results = scanner.scan(args.start, args.stop)
+    finally:
+        sdr.close()
+
+    print_occupancy(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Occupancy map saved: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,77 +1,328 @@
 #!/usr/bin/env python3
 """
 Signal Feature Extractor
-Extracts 18 numerical features from IQ samples for ML classification
+Extracts 17 numerical features from IQ samples for ML classification
 """
 import numpy as np
+from scipy import fft as sp_fft
+import hashlib
+import inspect
+
+# Bump when a feature's definition changes in a way the source hash would miss
+FEATURE_VERSION = 1
+
+FEATURE_NAMES = [
+    'power_mean', 'power_std', 'power_max', 'power_min',
+    'fft_mean', 'fft_std', 'fft_max', 'fft_peak_idx',
+    'i_mean', 'i_std', 'q_mean', 'q_std',
+    'phase_mean', 'phase_std', 'phase_diff_mean', 'phase_diff_std',
+    'bandwidth_ratio'
+]
+
 
 class SignalFeatureExtractor:
-    """Extract 18 features from raw IQ samples."""
-    
-    def __init__(self, sample_rate=1.024e6):
+    """Extract 17 features from raw IQ samples, one capture or a whole batch."""
+
+    def __init__(self, sample_rate=1.024e6, dtype=np.complex64, workers=None):
         self.sample_rate = sample_rate
-    
+        # The dongle's ADC is 8-bit, so single precision loses nothing and halves memory traffic
+        self.dtype = np.dtype(dtype)
+        # Threads used by scipy.fft for the batched transform (None = 1, -1 = all cores)
+        self.workers = workers
+
     def extract_features(self, samples):
         """
-        Extract 18 features from IQ samples.
-        
+        Extract 17 features from IQ samples.
+
         Args:
             samples: Complex IQ samples (numpy array)
-            
+
+        Returns:
+            numpy array of 17 numerical features
+        """
+        samples = np.asarray(samples)
+        return self.extract_batch(samples[np.newaxis, :])[0]
+
+    def extract_batch(self, batch, out=None):
+        """
+        Extract features for a stack of equal-length captures in one pass.
+
+        Every statistic is reduced along axis 1, and intermediates (power,
+        phase, the FFT power spectrum) are computed once and shared.
+
+        Args:
+            batch: Complex IQ samples, shape (n_captures, n_samples)
+            out: Optional preallocated float32 array of shape (n_captures, 17)
+
         Returns:
-            numpy array of 18 numerical features
+            float32 array of shape (n_captures, 17)
         """
-        features = []
-        
-        # Power calculations
-        power = np.abs(samples) ** 2
-        features.append(np.mean(power))
-        features.append(np.std(power))
-        features.append(np.max(power))
-        features.append(np.min(power))
-        
-        # FFT analysis
-        fft_vals = np.fft.fft(samples)
-        fft_power = np.abs(fft_vals) ** 2
-        features.append(np.mean(fft_power))
-        features.append(np.std(fft_power))
-        features.append(np.max(fft_power))
-        
-        # Peak frequency index (normalized)
-        peak_freq_idx = np.argmax(fft_power)
-        features.append(peak_freq_idx / len(fft_power))
-        
+        batch = np.asarray(batch)
+        if batch.ndim != 2:
+            raise ValueError(f"Expected a 2-D (captures x samples) batch, got shape {batch.shape}")
+        batch = batch.astype(self.dtype, copy=False)
+        n_captures, n_samples = batch.shape
+        if out is None:
+            out = np.empty((n_captures, len(FEATURE_NAMES)), dtype=np.float32)
+        elif out.shape != (n_captures, len(FEATURE_NAMES)):
+            raise ValueError(f"Output buffer has shape {out.shape}, expected {(n_captures, len(FEATURE_NAMES))}")
+
+        i_samples = batch.real
+        q_samples = batch.imag
+
+        # Power: |x|^2 without the sqrt that np.abs would take
+        power = i_samples * i_samples + q_samples * q_samples
+        power_mean = power.mean(axis=1)
+        out[:, 0] = power_mean
+        out[:, 1] = power.std(axis=1)
+        out[:, 2] = power.max(axis=1)
+        out[:, 3] = power.min(axis=1)
+        del power
+
+        # FFT analysis, one transform for the whole batch
+        spectrum = sp_fft.fft(batch, axis=1, workers=self.workers)
+        fft_power = spectrum.real ** 2
+        fft_power += spectrum.imag ** 2
+        del spectrum
+        # Parseval: sum(|X|^2) / N == sum(|x|^2), so the spectral mean is free
+        out[:, 4] = power_mean * n_samples
+        out[:, 5] = fft_power.std(axis=1)
+        peak_idx = fft_power.argmax(axis=1)
+        fft_max = fft_power[np.arange(n_captures), peak_idx]
+        out[:, 6] = fft_max
+        out[:, 7] = peak_idx / n_samples
+
+        # Bandwidth estimation (bins within 10 dB of the peak)
+        out[:, 16] = np.count_nonzero(fft_power > (fft_max * 0.1)[:, np.newaxis], axis=1) / n_samples
+        del fft_power
+
         # I/Q component statistics
-        i_samples = np.real(samples)
-        q_samples = np.imag(samples)
-        features.append(np.mean(i_samples))
-        features.append(np.std(i_samples))
-        features.append(np.mean(q_samples))
-        features.append(np.std(q_samples))
-        
+        out[:, 8] = i_samples.mean(axis=1)
+        out[:, 9] = i_samples.std(axis=1)
+        out[:, 10] = q_samples.mean(axis=1)
+        out[:, 11] = q_samples.std(axis=1)
+
         # Phase analysis
-        phase = np.angle(samples)
-        features.append(np.mean(phase))
-        features.append(np.std(phase))
-        
-        # Instantaneous frequency (phase derivative)
-        phase_diff = np.diff(phase)
-        features.append(np.mean(phase_diff))
-        features.append(np.std(phase_diff))
-        
-        # Bandwidth estimation
-        bandwidth = np.sum(fft_power > np.max(fft_power) * 0.1)
-        features.append(bandwidth / len(fft_power))
-        
-        return np.array(features)
-    
+        phase = np.angle(batch)
+        out[:, 12] = phase.mean(axis=1)
+        out[:, 13] = phase.std(axis=1)
+
+        # Instantaneous frequency (phase derivative); the mean telescopes
+        phase_diff = np.diff(phase, axis=1)
+        out[:, 14] = (phase[:, -1] - phase[:, 0]) / (n_samples - 1)
+        out[:, 15] = phase_diff.std(axis=1)
+
+        return out
+
+    @property
+    def fingerprint(self):
+        """Short hash of everything that determines the feature values."""
+        h = hashlib.sha1()
+        h.update(str(FEATURE_VERSION).encode())
+        h.update(','.join(FEATURE_NAMES).encode())
+        h.update(self.dtype.str.encode())
+        h.update(inspect.getsource(SignalFeatureExtractor.extract_batch).encode())
+        return h.hexdigest()[:16]
+
     @property
     def feature_names(self):
         """List of feature names for documentation."""
-        return [
-            'power_mean', 'power_std', 'power_max', 'power_min',
-            'fft_mean', 'fft_std', 'fft_max', 'fft_peak_idx',
-            'i_mean', 'i_std', 'q_mean', 'q_std',
-            'phase_mean', 'phase_std', 'phase_diff_mean', 'phase_diff_std',
-            'bandwidth_ratio'
-        ]
+        return list(FEATURE_NAMES)
+
+
+class RunningStats:
+    """Mean/std (Welford, merged chunk-wise), min and max of a stream of values."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        n = len(values)
+        chunk_mean = float(np.mean(values, dtype=np.float64))
+        chunk_m2 = float(np.sum((values - chunk_mean) ** 2, dtype=np.float64))
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += chunk_m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(np.min(values)))
+        self.max = max(self.max, float(np.max(values)))
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / self.count)) if self.count else 0.0
+
+
+class StreamingFeatureExtractor:
+    """
+    Incremental 17-feature extractor with memory independent of capture length.
+
+    Time-domain features use running statistics and match the batch
+    extractor. FFT features come from a Welch-averaged spectrum of
+    welch_segment-sample segments, rescaled by N / welch_segment; they equal
+    the batch extractor's only for a single-segment capture. For longer ones
+    tonal peaks (fft_max, fft_std, bandwidth_ratio) differ by orders of
+    magnitude, so these are a feature set of their own: feature schemas
+    record it as spectrum 'welch' (train_validated.py --spectrum welch), and
+    only such models are classified chunk by chunk.
+    """
+
+    def __init__(self, sample_rate=1.024e6, welch_segment=8192, dtype=np.complex64, workers=None):
+        self.sample_rate = sample_rate
+        self.welch_segment = welch_segment
+        self.dtype = np.dtype(dtype)
+        self.workers = workers
+        self.reset()
+
+    def reset(self):
+        self._power = RunningStats()
+        self._i = RunningStats()
+        self._q = RunningStats()
+        self._phase = RunningStats()
+        self._phase_diff = RunningStats()
+        self._first_phase = None
+        self._last_phase = None
+        self._psd_sum = np.zeros(self.welch_segment, dtype=np.float64)
+        self._segments = 0
+        self._pending = np.empty(0, dtype=self.dtype)
+
+    @property
+    def n_samples(self):
+        return self._power.count
+
+    def update(self, chunk):
+        """Fold one chunk of complex IQ samples into the running state."""
+        chunk = np.asarray(chunk).astype(self.dtype, copy=False)
+        if len(chunk) == 0:
+            return
+        i_samples = chunk.real
+        q_samples = chunk.imag
+        self._power.update(i_samples * i_samples + q_samples * q_samples)
+        self._i.update(i_samples)
+        self._q.update(q_samples)
+
+        phase = np.angle(chunk)
+        self._phase.update(phase)
+        if self._last_phase is None:
+            self._first_phase = float(phase[0])
+            self._phase_diff.update(np.diff(phase))
+        else:
+            # Carry the derivative across the chunk boundary
+            self._phase_diff.update(np.diff(phase, prepend=self._last_phase))
+        self._last_phase = float(phase[-1])
+
+        # Welch: whole segments go straight into the averaged spectrum
+        data = np.concatenate([self._pending, chunk]) if len(self._pending) else chunk
+        n_segments = len(data) // self.welch_segment
+        if n_segments:
+            segments = data[:n_segments * self.welch_segment].reshape(n_segments, self.welch_segment)
+            spectrum = sp_fft.fft(segments, axis=1, workers=self.workers)
+            self._psd_sum += np.sum(spectrum.real ** 2 + spectrum.imag ** 2, axis=0)
+            self._segments += n_segments
+        self._pending = data[n_segments * self.welch_segment:].copy()
+
+    def features(self):
+        """Current 17-feature vector (float32) for everything seen since reset()."""
+        n = self.n_samples
+        if n < 2:
+            raise ValueError("Need at least 2 samples to compute features")
+        if self._segments:
+            psd = self._psd_sum / self._segments
+            segment = self.welch_segment
+        else:
+            # Shorter than one segment: a single zero-padded transform
+            spectrum = sp_fft.fft(self._pending, n=self.welch_segment)
+            psd = spectrum.real ** 2 + spectrum.imag ** 2
+            segment = len(self._pending)
+        fft_power = psd * (n / segment)
+        peak_idx = int(np.argmax(fft_power))
+        fft_max = fft_power[peak_idx]
+
+        out = np.empty(len(FEATURE_NAMES), dtype=np.float32)
+        out[0] = self._power.mean
+        out[1] = self._power.std
+        out[2] = self._power.max
+        out[3] = self._power.min
+        out[4] = self._power.mean * n
+        out[5] = fft_power.std()
+        out[6] = fft_max
+        out[7] = peak_idx / len(fft_power)
+        out[8] = self._i.mean
+        out[9] = self._i.std
+        out[10] = self._q.mean
+        out[11] = self._q.std
+        out[12] = self._phase.mean
+        out[13] = self._phase.std
+        out[14] = (self._last_phase - self._first_phase) / (n - 1)
+        out[15] = self._phase_diff.std
+        out[16] = np.count_nonzero(fft_power > fft_max * 0.1) / len(fft_power)
+        return out
+
+    def extract_features(self, samples, chunk_size=262144):
+        """Features of a (possibly memory-mapped) capture, read chunk_size samples at a time."""
+        self.reset()
+        for start in range(0, len(samples), chunk_size):
+            self.update(samples[start:start + chunk_size])
+        return self.features()
+
+    def extract_batch(self, batch, out=None):
+        """Welch features of each row of a (n_captures, n_samples) batch, like SignalFeatureExtractor.extract_batch."""
+        batch = np.asarray(batch)
+        if batch.ndim != 2:
+            raise ValueError(f"Expected a 2-D (captures x samples) batch, got shape {batch.shape}")
+        if out is None:
+            out = np.empty((len(batch), len(FEATURE_NAMES)), dtype=np.float32)
+        # A private instance: shared extractors (front_end.model_extractor) serve several threads
+        extractor = StreamingFeatureExtractor(self.sample_rate, self.welch_segment, self.dtype, self.workers)
+        for i, samples in enumerate(batch):
+            out[i] = extractor.extract_features(samples)
+        return out
+
+    @property
+    def fingerprint(self):
+        """Short hash of everything that determines the feature values (distinct from the batch extractor's)."""
+        h = hashlib.sha1()
+        h.update(f"welch:{FEATURE_VERSION}:{self.welch_segment}".encode())
+        h.update(','.join(FEATURE_NAMES).encode())
+        h.update(self.dtype.str.encode())
+        h.update(inspect.getsource(StreamingFeatureExtractor.update).encode())
+        h.update(inspect.getsource(StreamingFeatureExtractor.features).encode())
+        return h.hexdigest()[:16]
+
+    @property
+    def feature_names(self):
+        return list(FEATURE_NAMES)
+
+
+def extract_features_batched(extractor, sample_list, batch_size=16, out=None):
+    """
+    Extract features for a list of captures, batching equal-length neighbours.
+
+    Args:
+        extractor: SignalFeatureExtractor instance
+        sample_list: Sequence of 1-D complex IQ arrays
+        batch_size: Maximum number of captures stacked per extract_batch call
+        out: Optional preallocated float32 array of shape (len(sample_list), 17)
+
+    Returns:
+        float32 array of shape (len(sample_list), 17)
+    """
+    if out is None:
+        out = np.empty((len(sample_list), len(FEATURE_NAMES)), dtype=np.float32)
+    start = 0
+    while start < len(sample_list):
+        length = len(sample_list[start])
+        stop = start + 1
+        while (stop < len(sample_list) and stop - start < batch_size
+               and len(sample_list[stop]) == length):
+            stop += 1
+        extractor.extract_batch(np.stack(sample_list[start:stop], dtype=extractor.dtype),
+                                out=out[start:stop])
+        start = stop
+    return out
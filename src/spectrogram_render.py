@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Spectrogram Renderer
+Headless spectrogram + PSD images straight from NumPy (colormap LUT and a minimal PNG encoder, no matplotlib)
+"""
+import numpy as np
+import argparse
+import os
+import struct
+import time
+import zlib
+
+# Polynomial fit of matplotlib's viridis (within 4/255 per channel), highest power last
+_VIRIDIS_COEFFS = np.array([
+    [0.2777273272234177, 0.005407344544966578, 0.3340998053353061],
+    [0.1050930431085774, 1.404613529898575, 1.384590162594685],
+    [-0.3308618287255563, 0.214847559468213, 0.09509516302823659],
+    [-4.634230498983486, -5.799100973351585, -19.33244095627987],
+    [6.228269936347081, 14.17993336680509, 56.69055260068105],
+    [4.776384997670288, -13.74514537774601, -65.35303263337234],
+    [-5.435455855934631, 4.645852612178535, 26.3124352495832],
+])
+
+
+def viridis_lut():
+    """(256, 3) uint8 viridis colormap."""
+    t = np.linspace(0, 1, 256)[:, np.newaxis]
+    rgb = np.zeros((256, 3))
+    for coeffs in _VIRIDIS_COEFFS[::-1]:
+        rgb = rgb * t + coeffs
+    return np.clip(np.round(rgb * 255), 0, 255).astype(np.uint8)
+
+
+VIRIDIS = viridis_lut()
+
+BACKGROUND = np.array([20, 20, 28], dtype=np.uint8)
+TRACE = np.array([94, 201, 98], dtype=np.uint8)
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def encode_png(rgb, text=None, compression=6):
+    """
+    (height, width, 3) uint8 -> PNG file bytes.
+
+    Rows use filter type 0 and one zlib stream; text entries become tEXt
+    chunks (the renderer stores label/frequency/axis ranges there instead of
+    drawing captions).
+    """
+    rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+    height, width = rgb.shape[:2]
+    raw = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape(height, width * 3)
+    chunks = [_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))]
+    for key, value in (text or {}).items():
+        chunks.append(_png_chunk(b'tEXt', f"{key}\0{value}".encode('latin-1', 'replace')))
+    chunks.append(_png_chunk(b'IDAT', zlib.compress(raw.tobytes(), compression)))
+    chunks.append(_png_chunk(b'IEND', b''))
+    return b'\x89PNG\r\n\x1a\n' + b''.join(chunks)
+
+
+def write_png(path, rgb, text=None, compression=6):
+    with open(path, 'wb') as f:
+        f.write(encode_png(rgb, text=text, compression=compression))
+    return path
+
+
+def _resample(values, n, axis):
+    """Mean-pool (or repeat, when upsampling) values to n entries along axis."""
+    length = values.shape[axis]
+    if length <= n:
+        return np.take(values, np.arange(n) * length // n, axis=axis)
+    edges = np.arange(n) * length // n
+    sums = np.add.reduceat(values, edges, axis=axis)
+    counts = np.diff(np.append(edges, length))
+    shape = [1] * values.ndim
+    shape[axis] = n
+    return sums / counts.reshape(shape)
+
+
+def _to_db(power):
+    return 10 * np.log10(np.maximum(power, 1e-20))
+
+
+def _colormap(db, dynamic_range, lut=VIRIDIS):
+    """dB values -> RGB, with the top dynamic_range dB of each image mapped across the LUT."""
+    top = db.max(axis=(-2, -1), keepdims=True)
+    scaled = (db - (top - dynamic_range)) * (255.0 / dynamic_range)
+    return lut[np.clip(scaled, 0, 255).astype(np.uint8)]
+
+
+def _trace(spectrum_power, width, height):
+    """
+    Min/max envelope of the (n, n_bins) centred spectra at one column per pixel, as (n, height, width, 3).
+
+    Each column covers len/width bins and draws a vertical segment from
+    their minimum to their maximum, so narrow peaks survive decimation.
+    """
+    n, length = spectrum_power.shape
+    edges = np.arange(width) * length // width
+    db = _to_db(spectrum_power)
+    if length > width:
+        low = np.minimum.reduceat(db, edges, axis=1)
+        high = np.maximum.reduceat(db, edges, axis=1)
+    else:
+        low = high = db[:, edges]
+    top = high.max(axis=1, keepdims=True)
+    bottom = np.maximum(low.min(axis=1, keepdims=True), top - 100)
+    span = np.maximum(top - bottom, 1e-6)
+    # Row 0 is the top of the panel
+    row_high = np.round((top - high) / span * (height - 1))
+    row_low = np.round((top - np.maximum(low, bottom)) / span * (height - 1))
+    rows = np.arange(height)[np.newaxis, :, np.newaxis]
+    mask = (rows >= row_high[:, np.newaxis, :]) & (rows <= row_low[:, np.newaxis, :])
+    image = np.empty((n, height, width, 3), dtype=np.uint8)
+    image[:] = BACKGROUND
+    image[mask] = TRACE
+    return image
+
+
+def render_images(context, width=512, spec_height=256, psd_height=128, dynamic_range=80):
+    """
+    Spectrogram (top) and PSD trace (bottom) for every capture in a SpectralContext.
+
+    The STFT is pooled straight to (spec_height, width) pixels (frequency
+    centred, increasing upwards; time left to right) and colormapped; the
+    full-length spectrum is decimated to one min/max column per pixel.
+
+    Returns:
+        (n_captures, spec_height + 1 + psd_height, width, 3) uint8
+    """
+    f, t, Sxx = context.stft
+    # Two-sided STFT in FFT order -> centred, highest frequency in the top row
+    Sxx = np.fft.fftshift(Sxx, axes=-2)[..., ::-1, :]
+    spec = _resample(_resample(Sxx, spec_height, axis=-2), width, axis=-1)
+    spec_rgb = _colormap(_to_db(spec), dynamic_range)
+    psd_rgb = _trace(np.fft.fftshift(context.spectrum_power, axes=-1), width, psd_height)
+
+    images = np.empty((len(context), spec_height + 1 + psd_height, width, 3), dtype=np.uint8)
+    images[:, :spec_height] = spec_rgb
+    images[:, spec_height] = BACKGROUND
+    images[:, spec_height + 1:] = psd_rgb
+    return images
+
+
+def image_text(label, freq, context):
+    """tEXt metadata: what the image shows and the ranges of its axes."""
+    half_span = context.sample_rate / 2
+    return {
+        'Title': f"{label} - {freq/1e6:.2f} MHz" if freq is not None else str(label),
+        'Comment': f"top: spectrogram, 0-{context.n_samples / context.sample_rate:.3f} s left to right, "
+                   f"{-half_span/1e3:.0f}..{half_span/1e3:.0f} kHz bottom to top; "
+                   f"bottom: PSD (dB) over the same frequency range left to right",
+        'Software': 'rtl-ml spectrogram_render',
+    }
+
+
+def render_spectrogram(samples, label, freq, output_path, sample_rate=1.024e6, context=None, **options):
+    """Render one capture to output_path; reuses a SpectralContext if one is given."""
+    if context is None:
+        from capture_validated import SpectralContext
+        context = SpectralContext(samples, sample_rate)
+    image = render_images(context, **options)[0]
+    return write_png(output_path, image, text=image_text(label, freq, context))
+
+
+def render_thumbnails(context, labels, freqs, paths, width=256, spec_height=96, psd_height=48, **options):
+    """Render every capture in context to its path in paths (one small image each)."""
+    images = render_images(context, width=width, spec_height=spec_height, psd_height=psd_height, **options)
+    for image, label, freq, path in zip(images, labels, freqs, paths):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        write_png(path, image, text=image_text(label, freq, context))
+    return paths
+
+
+def iter_captures(data_dir):
+    """(name, label, center_freq, sample_rate, samples) for every capture of a .npy tree or IQ shard directory."""
+    from iq_dataset import IQDataset, is_iq_dataset, load_capture, capture_samples, list_npy_captures
+
+    if is_iq_dataset(data_dir):
+        dataset = IQDataset(data_dir)
+        for i, record in enumerate(dataset.records):
+            yield (f"{record['label']}_{record['timestamp']}", record['label'], record['center_freq'],
+                   record['sample_rate'], dataset.samples(i))
+        return
+    filepaths, labels = list_npy_captures(data_dir)
+    for filepath, label in zip(filepaths, labels):
+        capture = load_capture(filepath)
+        yield (os.path.splitext(os.path.basename(filepath))[0], label, capture.get('center_freq'),
+               capture.get('sample_rate', 1.024e6), capture_samples(capture))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render spectrogram thumbnails for every capture in a dataset')
+    parser.add_argument('data_dir', nargs='?', default='datasets_validated',
+                        help='.npy capture tree or IQ shard directory')
+    parser.add_argument('--output', default='thumbnails', help='Images go to OUTPUT/<label>/<capture>.png')
+    parser.add_argument('--width', type=int, default=256)
+    parser.add_argument('--height', type=int, default=144, help='Total image height (2/3 spectrogram, 1/3 PSD)')
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args()
+
+    from capture_validated import SpectralContext
+
+    spec_height = args.height * 2 // 3
+    psd_height = args.height - spec_height - 1
+    rendered = 0
+    batch = []
+
+    def flush():
+        names, labels, freqs, rates, captures = zip(*batch)
+        context = SpectralContext(np.stack(captures), rates[0])
+        render_thumbnails(context, labels, freqs,
+                          [os.path.join(args.output, label, name + '.png') for name, label in zip(names, labels)],
+                          width=args.width, spec_height=spec_height, psd_height=psd_height)
+        batch.clear()
+
+    start = time.perf_counter()
+    for capture in iter_captures(args.data_dir):
+        # A stack needs one length and sample rate
+        if batch and (len(capture[4]) != len(batch[0][4]) or capture[3] != batch[0][3]):
+            flush()
+        batch.append(capture)
+        rendered += 1
+        if len(batch) >= args.batch_size:
+            flush()
+    if batch:
+        flush()
+    elapsed = time.perf_counter() - start
+    print(f"✅ {rendered} thumbnails in {elapsed:.1f} s ({rendered / max(elapsed, 1e-9):.1f}/s) -> {args.output}/")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+RTL-ML STFT Features
+Fixed-size log-magnitude spectrograms, a float16 memmap cache and a small NumPy classifier
+"""
+import numpy as np
+from scipy import fft as sp_fft
+import hashlib
+import inspect
+import json
+import os
+
+from feature_cache import KEEP_CACHES, prune_caches, touch
+from lite_model import LiteScaler
+
+STFT_VERSION = 1
+STFT_FORMAT_VERSION = 1
+# pool_stft(): frequency bins pooled to, and frame-energy quantiles per capture
+POOL_FREQ_BINS = 32
+POOL_QUANTILES = 11
+
+
+class StftExtractor:
+    """
+    Capture -> (n_frames, n_fft) log-magnitude spectrogram in dB above the capture's noise floor.
+
+    The capture is cut into n_frames equal time slices; each slice is the
+    average power of its n_fft-point Hann-windowed frames, so every sample
+    contributes and the output shape does not depend on capture length.
+    """
+
+    def __init__(self, n_fft=128, n_frames=64, dtype=np.complex64):
+        self.n_fft = n_fft
+        self.n_frames = n_frames
+        self.dtype = np.dtype(dtype)
+        self.window = np.hanning(n_fft).astype(np.empty(0, self.dtype).real.dtype)
+
+    @property
+    def shape(self):
+        return (self.n_frames, self.n_fft)
+
+    @property
+    def fingerprint(self):
+        """Identifies the tensor definition; cached tensors are only reused on a match."""
+        h = hashlib.sha1()
+        h.update(f"{STFT_VERSION}:{self.n_fft}:{self.n_frames}:{self.dtype.str}".encode())
+        h.update(inspect.getsource(StftExtractor.extract_batch).encode())
+        return h.hexdigest()[:16]
+
+    def extract(self, samples):
+        return self.extract_batch(np.asarray(samples)[np.newaxis])[0]
+
+    def extract_batch(self, batch, out=None):
+        """
+        Spectrograms for equal-length captures.
+
+        Args:
+            batch: (n_captures, n_samples) complex IQ
+            out: Optional preallocated (n_captures, n_frames, n_fft) array (e.g. a memmap slice)
+
+        Returns:
+            (n_captures, n_frames, n_fft) float32 dB, DC in the middle column
+        """
+        batch = np.asarray(batch, dtype=self.dtype)
+        n, length = batch.shape
+        per_frame = length // (self.n_frames * self.n_fft)
+        if per_frame < 1:
+            raise ValueError(f"Captures need at least {self.n_frames * self.n_fft} samples")
+        frames = batch[:, :self.n_frames * per_frame * self.n_fft].reshape(
+            n, self.n_frames, per_frame, self.n_fft)
+        spectrum = sp_fft.fft(frames * self.window, axis=-1, workers=-1)
+        power = np.mean(spectrum.real ** 2 + spectrum.imag ** 2, axis=2)
+        db = 10 * np.log10(sp_fft.fftshift(power, axes=-1) + 1e-12)
+        # Relative to the median bin, so tensors do not depend on gain
+        db -= np.median(db.reshape(n, -1), axis=1)[:, np.newaxis, np.newaxis]
+        if out is None:
+            return db.astype(np.float32)
+        out[...] = db
+        return out
+
+
+def pool_stft(tensors, freq_bins=POOL_FREQ_BINS, quantiles=POOL_QUANTILES):
+    """
+    Fixed-length summary of (n, n_frames, n_fft) spectrograms for the classifier.
+
+    Per pooled frequency bin: mean, max and std over time (spectral shape and
+    how bursty each bin is). Per capture: quantiles of the frame energies,
+    which describe burst duty cycle independently of where the bursts fall.
+    """
+    tensors = np.asarray(tensors, dtype=np.float32)
+    n, n_frames, n_fft = tensors.shape
+    pooled = tensors.reshape(n, n_frames, freq_bins, n_fft // freq_bins).mean(axis=3)
+    frame_energy = pooled.mean(axis=2)
+    return np.concatenate([
+        pooled.mean(axis=1),
+        pooled.max(axis=1),
+        pooled.std(axis=1),
+        np.quantile(frame_energy, np.linspace(0, 1, quantiles), axis=1).T,
+    ], axis=1)
+
+
+def pooled_feature_names(freq_bins=POOL_FREQ_BINS, quantiles=POOL_QUANTILES):
+    """Names of the pool_stft() columns, in order (the feature schema of STFT models)."""
+    return ([f"bin{b}_{stat}" for stat in ('mean', 'max', 'std') for b in range(freq_bins)]
+            + [f"frame_energy_q{q}" for q in range(quantiles)])
+
+
+class StftFeatureExtractor:
+    """
+    Captures -> pool_stft() feature rows: the model_extractor() of STFT models.
+
+    Same extract_batch/feature_names/fingerprint interface as
+    SignalFeatureExtractor, so classifiers, the scanner and the model
+    server run STFT models through the scaler + predict_proba path.
+    """
+
+    def __init__(self, n_fft=128, n_frames=64, dtype=np.complex64):
+        self.stft = StftExtractor(n_fft, n_frames, dtype=dtype)
+        self.dtype = self.stft.dtype
+
+    def extract_features(self, samples):
+        return self.extract_batch(np.asarray(samples)[np.newaxis, :])[0]
+
+    def extract_batch(self, batch, out=None):
+        pooled = pool_stft(self.stft.extract_batch(batch)).astype(np.float32)
+        if out is None:
+            return pooled
+        out[...] = pooled
+        return out
+
+    @property
+    def fingerprint(self):
+        return self.stft.fingerprint
+
+    @property
+    def feature_names(self):
+        return pooled_feature_names()
+
+
+class StftCache:
+    """
+    Spectrograms for a whole dataset in one float16 memmap.
+
+    <cache_dir>/stft_<fingerprint>.f16 holds (n_captures, n_frames, n_fft)
+    rows in dataset order and stft_<fingerprint>.json their capture keys.
+    build() reuses every row whose key is still present, computes the rest
+    and returns a read-only memmap, so training epochs only read from disk.
+    Caches of other fingerprints are kept under feature_cache's LRU limit.
+    """
+
+    def __init__(self, cache_dir, fingerprint, shape):
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.shape = tuple(shape)
+        self.data_path = os.path.join(cache_dir, f'stft_{fingerprint}.f16')
+        self.index_path = os.path.join(cache_dir, f'stft_{fingerprint}.json')
+        self.hits = 0
+        self.misses = 0
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            if tuple(index['shape']) != self.shape:
+                return None
+            expected = len(index['keys']) * int(np.prod(self.shape)) * 2
+            if os.path.getsize(self.data_path) != expected:
+                return None
+            return index['keys']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _open(self, keys, mode='r'):
+        return np.memmap(self.data_path, dtype=np.float16, mode=mode, shape=(len(keys),) + self.shape)
+
+    def build(self, keys, compute, chunk_size=16):
+        """
+        Args:
+            keys: Capture keys in dataset order
+            compute: compute(indices) -> (len(indices), *shape) spectrograms
+            chunk_size: Missing captures computed per call
+
+        Returns:
+            Read-only (len(keys), *shape) float16 memmap
+        """
+        if not keys:
+            return np.empty((0,) + self.shape, dtype=np.float16)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        old_keys = self._load_index()
+        if old_keys == list(keys):
+            self.hits += len(keys)
+            touch([self.data_path, self.index_path])
+            self._remove_stale()
+            return self._open(keys)
+
+        tmp_path = self.data_path + '.tmp'
+        tensors = np.memmap(tmp_path, dtype=np.float16, mode='w+', shape=(len(keys),) + self.shape)
+        missing = list(range(len(keys)))
+        if old_keys is not None:
+            old = self._open(old_keys)
+            old_rows = {key: row for row, key in enumerate(old_keys)}
+            missing = []
+            for i, key in enumerate(keys):
+                if key in old_rows:
+                    tensors[i] = old[old_rows[key]]
+                else:
+                    missing.append(i)
+            del old
+        for start in range(0, len(missing), chunk_size):
+            rows = missing[start:start + chunk_size]
+            tensors[rows] = compute(rows)
+        tensors.flush()
+        del tensors
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        os.replace(tmp_path, self.data_path)
+        tmp_index = self.index_path + '.tmp'
+        with open(tmp_index, 'w') as f:
+            json.dump({'version': STFT_VERSION, 'shape': list(self.shape), 'keys': list(keys)}, f)
+        os.replace(tmp_index, self.index_path)
+        self._remove_stale()
+        return self._open(keys)
+
+    def _remove_stale(self):
+        prune_caches(self.cache_dir, KEEP_CACHES, current=(self.fingerprint,))
+
+
+def _softmax(z):
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+class StftClassifier:
+    """
+    One-hidden-layer network on pool_stft() features; inference is a few small matmuls.
+
+    Exposes classes_, predict_proba and predict on spectrogram batches like
+    the lite models do on feature rows. feature_schema (front_end.feature_schema
+    with stft=...) records the capture rate it was trained at; model_data()
+    turns it into the dict classify_live and the other classifiers use.
+    """
+
+    def __init__(self, classes, mean, scale, w1, b1, w2, b2, n_fft=128, n_frames=64, feature_schema=None):
+        self.classes_ = np.asarray(classes)
+        self.mean = mean
+        self.scale = scale
+        self.w1, self.b1, self.w2, self.b2 = w1, b1, w2, b2
+        self.n_fft = n_fft
+        self.n_frames = n_frames
+        self.feature_schema = feature_schema
+
+    def extractor(self):
+        return StftExtractor(self.n_fft, self.n_frames)
+
+    @property
+    def config(self):
+        return {'n_fft': self.n_fft, 'n_frames': self.n_frames}
+
+    def _hidden(self, pooled):
+        x = (pooled - self.mean) / self.scale
+        return x, np.maximum(x @ self.w1 + self.b1, 0)
+
+    def model_data(self):
+        """
+        model_data dict for classify_live and friends: features from StftFeatureExtractor
+        (model_data['feature_kind'] == 'stft'), the pooled-feature standardization as the
+        scaler and the network as the model.
+        """
+        return {
+            'model': StftNetwork(self),
+            'scaler': LiteScaler(self.mean, self.scale),
+            'model_name': 'STFT network',
+            'feature_kind': 'stft',
+            'stft': self.config,
+            'front_end': None,
+            'feature_schema': self.feature_schema,
+        }
+
+    def predict_proba(self, tensors):
+        _, h = self._hidden(pool_stft(tensors))
+        return _softmax(h @ self.w2 + self.b2)
+
+    def predict(self, tensors):
+        return self.classes_[np.argmax(self.predict_proba(tensors), axis=1)]
+
+    def classify_samples(self, batch):
+        """Probabilities straight from equal-length IQ captures."""
+        return self.predict_proba(self.extractor().extract_batch(batch))
+
+    def save(self, path):
+        meta = {'format_version': STFT_FORMAT_VERSION, 'kind': 'stft',
+                'n_fft': self.n_fft, 'n_frames': self.n_frames, 'feature_schema': self.feature_schema}
+        np.savez(path, meta=np.array(json.dumps(meta)), classes=self.classes_.astype(str),
+                 mean=self.mean, scale=self.scale, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+
+
+def load_stft_model(path):
+    with np.load(path) as data:
+        meta = json.loads(str(data['meta']))
+        if meta.get('kind') != 'stft':
+            raise ValueError(f"{path} is not an STFT model")
+        if meta['format_version'] > STFT_FORMAT_VERSION:
+            raise ValueError(f"{path} needs a newer stft_features.py (format {meta['format_version']})")
+        return StftClassifier(data['classes'], data['mean'], data['scale'], data['w1'], data['b1'],
+                              data['w2'], data['b2'], n_fft=meta['n_fft'], n_frames=meta['n_frames'],
+                              feature_schema=meta.get('feature_schema'))
+
+
+class StftNetwork:
+    """A StftClassifier's network on standardized pooled features (model_data()['model'])."""
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.classes_ = classifier.classes_
+
+    def predict_proba(self, X):
+        c = self.classifier
+        h = np.maximum(np.asarray(X, dtype=np.float32) @ c.w1 + c.b1, 0)
+        return _softmax(h @ c.w2 + c.b2)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _pooled_stats(tensors, chunk_size):
+    """Mean/std of pooled features, one chunk of the memmap at a time."""
+    total, total_sq, count = 0.0, 0.0, 0
+    for start in range(0, len(tensors), chunk_size):
+        pooled = pool_stft(tensors[start:start + chunk_size]).astype(np.float64)
+        total = total + pooled.sum(axis=0)
+        total_sq = total_sq + (pooled ** 2).sum(axis=0)
+        count += len(pooled)
+    mean = total / count
+    std = np.sqrt(np.maximum(total_sq / count - mean ** 2, 0))
+    return mean.astype(np.float32), np.where(std > 1e-6, std, 1.0).astype(np.float32)
+
+
+def train_stft_classifier(tensors, y, rows=None, hidden=64, epochs=60, batch_size=32,
+                          learning_rate=3e-3, weight_decay=1e-4, seed=0, n_fft=128, n_frames=64):
+    """
+    Fit a StftClassifier with mini-batch Adam.
+
+    Args:
+        tensors: (n, n_frames, n_fft) spectrograms, typically a StftCache memmap
+        y: Labels for every row of tensors
+        rows: Indices of tensors to train on (default: all)
+
+    Each epoch reads its batches from tensors and pools them on the fly;
+    no FFTs are computed during training.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.arange(len(tensors)) if rows is None else np.asarray(rows)
+    classes, targets = np.unique(np.asarray(y)[rows], return_inverse=True)
+    # Train rows in ascending order so the stats pass reads the memmap sequentially
+    order = np.argsort(rows)
+    rows, targets = rows[order], targets[order]
+    mean, scale = _pooled_stats(_Rows(tensors, rows), batch_size * 4)
+
+    n_in = len(mean)
+    params = {
+        'w1': (rng.standard_normal((n_in, hidden)) * np.sqrt(2 / n_in)).astype(np.float32),
+        'b1': np.zeros(hidden, dtype=np.float32),
+        'w2': (rng.standard_normal((hidden, len(classes))) * np.sqrt(1 / hidden)).astype(np.float32),
+        'b2': np.zeros(len(classes), dtype=np.float32),
+    }
+    model = StftClassifier(classes, mean, scale, n_fft=n_fft, n_frames=n_frames, **params)
+    moment1 = {k: np.zeros_like(v) for k, v in params.items()}
+    moment2 = {k: np.zeros_like(v) for k, v in params.items()}
+    beta1, beta2, step = 0.9, 0.999, 0
+
+    for _ in range(epochs):
+        perm = rng.permutation(len(rows))
+        for start in range(0, len(perm), batch_size):
+            # Sorted within the batch: fancy indexing a memmap reads in file order
+            batch = np.sort(perm[start:start + batch_size])
+            x, h = model._hidden(pool_stft(tensors[rows[batch]]))
+            probs = _softmax(h @ model.w2 + model.b2)
+            probs[np.arange(len(batch)), targets[batch]] -= 1
+            d_out = probs / len(batch)
+            d_hidden = (d_out @ model.w2.T) * (h > 0)
+            grads = {'w2': h.T @ d_out + weight_decay * model.w2, 'b2': d_out.sum(axis=0),
+                     'w1': x.T @ d_hidden + weight_decay * model.w1, 'b1': d_hidden.sum(axis=0)}
+            step += 1
+            for k, g in grads.items():
+                moment1[k] = beta1 * moment1[k] + (1 - beta1) * g
+                moment2[k] = beta2 * moment2[k] + (1 - beta2) * g ** 2
+                m_hat = moment1[k] / (1 - beta1 ** step)
+                v_hat = moment2[k] / (1 - beta2 ** step)
+                setattr(model, k, getattr(model, k) - learning_rate * m_hat / (np.sqrt(v_hat) + 1e-8))
+    return model
+
+
+class _Rows:
+    """Row subset of an array that slices like one (for chunked passes over a memmap)."""
+
+    def __init__(self, array, rows):
+        self.array = array
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.array[self.rows[index]]
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Streaming Classification
+Gap-free monitoring of a single frequency: async reader -> window/feature worker -> classifier
+"""
+import numpy as np
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from front_end import model_extractor
+from profiling import profiler
+
+StreamResult = namedtuple('StreamResult', ['timestamp', 'label', 'confidence', 'probabilities'])
+
+_STOP = object()
+
+
+class SlidingWindowBuffer:
+    """Preallocated sample buffer that yields overlapping fixed-size windows."""
+
+    def __init__(self, window_size, hop_size, dtype=np.complex64):
+        if not 0 < hop_size <= window_size:
+            raise ValueError("hop_size must be in (0, window_size]")
+        self.window_size = window_size
+        self.hop_size = hop_size
+        self._buf = np.empty(window_size * 2, dtype=dtype)
+        self._fill = 0
+        self.samples_consumed = 0  # absolute index of _buf[0]
+
+    def push(self, block):
+        """Append a block and return a list of (start_index, window) pairs now complete."""
+        windows = []
+        block = np.asarray(block)
+        while len(block):
+            take = min(len(block), len(self._buf) - self._fill)
+            self._buf[self._fill:self._fill + take] = block[:take]
+            self._fill += take
+            block = block[take:]
+            while self._fill >= self.window_size:
+                windows.append((self.samples_consumed, self._buf[:self.window_size].copy()))
+                remaining = self._fill - self.hop_size
+                self._buf[:remaining] = self._buf[self.hop_size:self._fill]
+                self._fill = remaining
+                self.samples_consumed += self.hop_size
+        return windows
+
+    @property
+    def next_index(self):
+        """Absolute index the next pushed sample is expected to have."""
+        return self.samples_consumed + self._fill
+
+    def skip_to(self, index):
+        """Restart at absolute sample index after a gap; buffered samples are dropped so no window spans it."""
+        self._fill = 0
+        self.samples_consumed = index
+
+
+def model_class_names(model_data):
+    """Class names in probability-column order."""
+    if model_data.get('class_names') is not None:
+        return [str(c) for c in model_data['class_names']]
+    return [str(c) for c in model_data['model'].classes_]
+
+
+def predict_batch(model_data, features):
+    """Scale and classify a (n, n_features) matrix; returns (labels, probabilities or None)."""
+    model = model_data['model']
+    with profiler.stage('scale'):
+        features_scaled = model_data['scaler'].transform(features)
+    probabilities = None
+    with profiler.stage('predict'):
+        if hasattr(model, 'predict_proba'):
+            probabilities = model.predict_proba(features_scaled)
+            predictions = model.classes_[np.argmax(probabilities, axis=1)]
+        else:
+            predictions = model.predict(features_scaled)
+    class_names = model_data.get('class_names')
+    if class_names is not None and np.issubdtype(np.asarray(predictions).dtype, np.integer):
+        labels = [class_names[p] for p in predictions]
+    else:
+        labels = [str(p) for p in predictions]
+    return labels, probabilities
+
+
+class StreamingClassifier:
+    """
+    Three-stage streaming pipeline over bounded queues.
+
+    reader     -> IQSource.stream callback pushes (first sample index, IQ block) into
+                  block_queue (dropping when full if the source is live hardware)
+    windowing  -> overlapping windows, batched feature extraction into feature_queue;
+                  after a dropped block the window restarts past the gap
+    classifier -> micro-batched predict_proba, StreamResult items into result_queue
+    """
+
+    def __init__(self, source, model_data, window_duration=0.5, overlap=0.5,
+                 queue_size=8, max_batch=8, block_size=256 * 1024):
+        self.source = source
+        self.block_size = block_size
+        self.sample_rate = source.sample_rate
+        self.model_data = model_data
+        self.window_size = int(self.sample_rate * window_duration)
+        self.hop_size = max(1, int(self.window_size * (1 - overlap)))
+        self.max_batch = max_batch
+
+        self.block_queue = queue.Queue(maxsize=queue_size)
+        self.feature_queue = queue.Queue(maxsize=queue_size)
+        self.result_queue = queue.Queue(maxsize=queue_size * max_batch)
+
+        self.stats = {'blocks': 0, 'windows': 0, 'results': 0,
+                      'dropped_blocks': 0, 'dropped_results': 0}
+        self._threads = []
+        self._start_time = None
+        self._samples_read = 0
+
+    @property
+    def model_data(self):
+        return self._model_data
+
+    @model_data.setter
+    def model_data(self, model_data):
+        # A reloaded model may have been trained behind a different front end
+        self._model_data = model_data
+        self.extractor = model_extractor(model_data, self.sample_rate)
+
+    def _put(self, q, item, blocking, counter):
+        """Queue item (or drop it when the queue is full and blocking is off); True if it was queued."""
+        if blocking:
+            q.put(item)
+            return True
+        try:
+            q.put_nowait(item)
+            return True
+        except queue.Full:
+            self.stats[counter] += 1
+            profiler.count(counter)
+            if counter == 'dropped_blocks':
+                profiler.count('dropped_samples', len(item[1]))
+            return False
+
+    def _reader(self):
+        def on_block(samples):
+            self.stats['blocks'] += 1
+            profiler.gauge('block_queue_depth', self.block_queue.qsize())
+            samples = np.asarray(samples, dtype=np.complex64)
+            # The sample clock counts dropped blocks too, so timestamps stay true across a gap
+            start = self._samples_read
+            self._samples_read += len(samples)
+            self._put(self.block_queue, (start, samples), self.source.blocking, 'dropped_blocks')
+        try:
+            self.source.stream(on_block, self.block_size)
+        finally:
+            self.block_queue.put(_STOP)
+
+    def _windowing(self):
+        buffer = SlidingWindowBuffer(self.window_size, self.hop_size)
+        try:
+            while True:
+                item = self.block_queue.get()
+                if item is _STOP:
+                    return
+                start, block = item
+                if start != buffer.next_index:
+                    buffer.skip_to(start)
+                windows = buffer.push(block)
+                if not windows:
+                    continue
+                batch = np.stack([w for _, w in windows])
+                with profiler.stage('stream_extract'):
+                    features = self.extractor.extract_batch(batch)
+                profiler.gauge('feature_queue_depth', self.feature_queue.qsize())
+                timestamps = [self._start_time + start / self.sample_rate for start, _ in windows]
+                self.stats['windows'] += len(windows)
+                # Windows carry sample-clock timestamps, so blocking here is safe
+                self.feature_queue.put((timestamps, features))
+        finally:
+            self.feature_queue.put(_STOP)
+
+    def _classifier(self):
+        try:
+            done = False
+            while not done:
+                item = self.feature_queue.get()
+                if item is _STOP:
+                    return
+                timestamps, features = list(item[0]), [item[1]]
+                # Micro-batch whatever else is already waiting
+                while len(timestamps) < self.max_batch:
+                    try:
+                        item = self.feature_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        done = True
+                        break
+                    timestamps.extend(item[0])
+                    features.append(item[1])
+                labels, probabilities = predict_batch(self.model_data, np.concatenate(features))
+                for i, (ts, label) in enumerate(zip(timestamps, labels)):
+                    probs = probabilities[i] if probabilities is not None else None
+                    confidence = float(np.max(probs)) if probs is not None else None
+                    if self._put(self.result_queue, StreamResult(ts, label, confidence, probs),
+                                 self.source.blocking, 'dropped_results'):
+                        self.stats['results'] += 1
+                profiler.gauge('result_queue_depth', self.result_queue.qsize())
+        finally:
+            self.result_queue.put(_STOP)
+
+    def start(self):
+        """Start all pipeline threads."""
+        self._start_time = time.time()
+        for target in (self._classifier, self._windowing, self._reader):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stop the source; the pipeline drains and results() ends."""
+        self.source.stop()
+
+    def results(self):
+        """Yield StreamResult items until the pipeline has drained."""
+        while True:
+            item = self.result_queue.get()
+            if item is _STOP:
+                break
+            yield item
+        for thread in self._threads:
+            thread.join()
+
+    def queue_depths(self):
+        return {
+            'blocks': self.block_queue.qsize(),
+            'features': self.feature_queue.qsize(),
+            'results': self.result_queue.qsize(),
+        }
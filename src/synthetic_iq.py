@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+RTL-ML Synthetic IQ Generators
+Realistic-looking 8-bit IQ for each of the 8 signal classes, for benchmarks and hardware-free tests
+"""
+import numpy as np
+from scipy.signal import fftconvolve
+import os
+from datetime import datetime, timedelta
+
+SAMPLE_RATE = 1.024e6
+
+
+def _fm(audio, deviation, sample_rate):
+    """Frequency-modulate a real baseband signal in [-1, 1]."""
+    phase = 2 * np.pi * deviation * np.cumsum(audio) / sample_rate
+    return np.exp(1j * phase)
+
+
+def _noise(n, rng, level=0.05):
+    return level * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+
+
+def _bits_to_fsk_audio(bits, baud, f_mark, f_space, sample_rate):
+    """Continuous-phase AFSK audio for a bit sequence."""
+    samples_per_bit = int(sample_rate / baud)
+    freqs = np.repeat(np.where(bits, f_mark, f_space), samples_per_bit)
+    return np.sin(2 * np.pi * np.cumsum(freqs) / sample_rate)
+
+
+def _place_bursts(x, burst, rng, count):
+    """Add copies of burst at random offsets into x."""
+    if len(burst) >= len(x):
+        x += burst[:len(x)]
+        return x
+    for start in rng.integers(0, len(x) - len(burst), size=count):
+        x[start:start + len(burst)] += burst
+    return x
+
+
+def fm_broadcast(n, rng, sample_rate=SAMPLE_RATE):
+    """Wideband FM: program audio plus the 19 kHz stereo pilot, 75 kHz deviation."""
+    t = np.arange(n) / sample_rate
+    # Program material is noise-like up to 15 kHz, so the carrier sweeps the whole +/-75 kHz
+    # and validate_fm sees a continuous ~80 kHz occupied band (a few tones only made Bessel lines)
+    program = rng.standard_normal(n)
+    kernel = np.hanning(int(sample_rate / 15e3))
+    program = fftconvolve(program, kernel / kernel.sum(), mode='same')
+    program = np.clip(0.3 * program / program.std(), -0.9, 0.9)
+    audio = program + 0.1 * np.sin(2 * np.pi * 19e3 * t)
+    return 0.6 * _fm(audio, 75e3, sample_rate) + _noise(n, rng)
+
+
+def adsb(n, rng, sample_rate=SAMPLE_RATE):
+    """ADS-B: 1 Mbit/s PPM squitters (8 us preamble + 112 bits) over noise."""
+    preamble = np.array([1, 0, 1, 0, 0, 0, 0, 1, 0, 1, 0, 0, 0, 0, 0, 0], dtype=float)
+    bits = rng.integers(0, 2, 112)
+    chips = np.concatenate([preamble, np.column_stack([bits, 1 - bits]).ravel()])
+    # Chips are 0.5 us; resample onto the capture's clock
+    chip_times = np.arange(int(len(chips) * 0.5e-6 * sample_rate)) / sample_rate
+    envelope = chips[np.minimum((chip_times / 0.5e-6).astype(int), len(chips) - 1)]
+    burst = 0.8 * envelope * np.exp(1j * rng.uniform(0, 2 * np.pi))
+    x = _noise(n, rng, 0.03)
+    return _place_bursts(x, burst, rng, count=max(1, int(n / sample_rate * 40)))
+
+
+def aprs(n, rng, sample_rate=SAMPLE_RATE):
+    """APRS: occasional 1200 baud Bell 202 AFSK packets on NBFM (3 kHz deviation)."""
+    bits = rng.integers(0, 2, 200)
+    audio = _bits_to_fsk_audio(bits, 1200, 1200, 2200, sample_rate)
+    burst = 0.5 * _fm(audio, 3e3, sample_rate)
+    x = _noise(n, rng)
+    return _place_bursts(x, burst, rng, count=1 if rng.random() < 0.7 else 0)
+
+
+def noaa_apt(n, rng, sample_rate=SAMPLE_RATE):
+    """NOAA APT: 2400 Hz AM subcarrier (image lines) on FM with 17 kHz deviation."""
+    t = np.arange(n) / sample_rate
+    image = 0.5 + 0.4 * np.sin(2 * np.pi * 2 * t) * rng.uniform(0.5, 1.0)
+    sync = (np.sin(2 * np.pi * 1040 * t) > 0) * ((t * 2) % 1 < 0.03)
+    audio = (image + 0.3 * sync) * np.sin(2 * np.pi * 2400 * t)
+    return 0.3 * _fm(audio, 17e3, sample_rate) + _noise(n, rng)
+
+
+def noaa_weather(n, rng, sample_rate=SAMPLE_RATE):
+    """NOAA Weather Radio: NBFM synthetic speech (band-limited noise bursts), 5 kHz deviation."""
+    voice = rng.standard_normal(n)
+    kernel = np.hanning(int(sample_rate / 3000))
+    voice = fftconvolve(voice, kernel / kernel.sum(), mode='same')
+    syllables = (np.sin(2 * np.pi * 4 * np.arange(n) / sample_rate + rng.uniform(0, 6)) > -0.2)
+    audio = np.clip(voice * syllables * 8, -1, 1)
+    return 0.5 * _fm(audio, 5e3, sample_rate) + _noise(n, rng)
+
+
+def pager(n, rng, sample_rate=SAMPLE_RATE):
+    """POCSAG pager: 1200 baud 2-FSK (+/-4.5 kHz) transmissions."""
+    samples_per_bit = int(sample_rate / 1200)
+    bits = rng.integers(0, 2, n // samples_per_bit + 1)
+    freq = np.repeat(np.where(bits, 4.5e3, -4.5e3), samples_per_bit)[:n]
+    burst = 0.6 * np.exp(2j * np.pi * np.cumsum(freq) / sample_rate)
+    keyed = np.zeros(n)
+    on = int(n * rng.uniform(0.3, 0.8))
+    start = rng.integers(0, n - on + 1)
+    keyed[start:start + on] = 1
+    return burst * keyed + _noise(n, rng)
+
+
+def ism_sensors(n, rng, sample_rate=SAMPLE_RATE):
+    """433 MHz ISM sensors: short OOK packets at random offsets from centre."""
+    x = _noise(n, rng)
+    for _ in range(rng.integers(1, 4)):
+        bits = rng.integers(0, 2, 64)
+        symbol = int(sample_rate * 500e-6)
+        envelope = np.repeat(bits, symbol).astype(float)
+        offset = rng.uniform(-200e3, 200e3)
+        t = np.arange(len(envelope)) / sample_rate
+        burst = 0.7 * envelope * np.exp(2j * np.pi * offset * t)
+        x = _place_bursts(x, burst, rng, count=1)
+    return x
+
+
+def noise(n, rng, sample_rate=SAMPLE_RATE):
+    """Empty channel: receiver noise only."""
+    return _noise(n, rng, 0.08)
+
+
+CLASS_GENERATORS = {
+    'ADS_B': adsb,
+    'APRS': aprs,
+    'FM_broadcast': fm_broadcast,
+    'ISM_sensors': ism_sensors,
+    'NOAA_APT': noaa_apt,
+    'NOAA_weather': noaa_weather,
+    'noise': noise,
+    'pager': pager,
+}
+
+
+def quantize_8bit(x):
+    """Round-trip through the RTL-SDR's 8-bit ADC (pyrtlsdr scaling), returning complex64."""
+    x = np.asarray(x)
+    i = np.clip(np.rint((x.real + 1.0) * 127.5), 0, 255)
+    q = np.clip(np.rint((x.imag + 1.0) * 127.5), 0, 255)
+    return (i / 127.5 - 1.0 + 1j * (q / 127.5 - 1.0)).astype(np.complex64)
+
+
+def generate(label, n_samples, rng=None, sample_rate=SAMPLE_RATE):
+    """One synthetic capture of the given class as 8-bit-quantized complex64 IQ."""
+    rng = rng if rng is not None else np.random.default_rng()
+    return quantize_8bit(CLASS_GENERATORS[label](n_samples, rng, sample_rate))
+
+
+def generate_dataset(output_dir, per_class=30, duration=0.5, sample_rate=SAMPLE_RATE, seed=0):
+    """Write a synthetic dataset in capture_validated.py's .npy layout; returns the file count."""
+    rng = np.random.default_rng(seed)
+    n_samples = int(sample_rate * duration)
+    start = datetime(2024, 1, 1)
+    count = 0
+    for label in CLASS_GENERATORS:
+        os.makedirs(os.path.join(output_dir, label), exist_ok=True)
+        for i in range(per_class):
+            timestamp = (start + timedelta(seconds=count)).strftime('%Y%m%d_%H%M%S_%f')
+            np.save(os.path.join(output_dir, label, f"{label}_{timestamp}.npy"), {
+                'samples': generate(label, n_samples, rng, sample_rate),
+                'center_freq': 0.0,
+                'sample_rate': sample_rate,
+                'timestamp': timestamp,
+                'label': label,
+                'duration': duration,
+            })
+            count += 1
+    return count
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Incrementally update a classifier with captures it has not seen yet"""
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+import os
+import pickle
+import argparse
+
+from signal_features import FEATURE_NAMES, extract_features_batched
+from front_end import (DDCFrontEnd, FeatureSchemaError, feature_extractor, feature_schema, model_front_end,
+                       check_model_schema)
+from iq_dataset import IQDataset, is_iq_dataset, load_samples, list_npy_captures, dataset_sample_rate
+from feature_cache import npy_capture_key, shard_capture_key
+from lite_model import export_model
+from model_store import save_model
+
+def load_new_captures(data_dir, seen_keys, chunk_size=16, front_end=None, sample_rate=1.024e6):
+    """Features, labels and keys of captures in data_dir whose key is not in seen_keys"""
+    extractor = feature_extractor(front_end, sample_rate)
+    if is_iq_dataset(data_dir):
+        dataset = IQDataset(data_dir)
+        keys = [shard_capture_key(dataset, i) for i in range(len(dataset))]
+        new = [i for i, key in enumerate(keys) if key not in seen_keys]
+        X = np.empty((len(new), len(extractor.feature_names)), dtype=np.float32)
+        for start in range(0, len(new), chunk_size):
+            rows = new[start:start + chunk_size]
+            X[start:start + len(rows)] = extractor.extract_batch(dataset.batch(rows))
+        return X, dataset.labels[new], [keys[i] for i in new]
+
+    filepaths, y = list_npy_captures(data_dir)
+    keys = [npy_capture_key(fp, data_dir) for fp in filepaths]
+    new = [i for i, key in enumerate(keys) if key not in seen_keys]
+    X = np.empty((len(new), len(extractor.feature_names)), dtype=np.float32)
+    for start in range(0, len(new), chunk_size):
+        rows = new[start:start + chunk_size]
+        samples = [load_samples(filepaths[i]) for i in rows]
+        extract_features_batched(extractor, samples, batch_size=chunk_size, out=X[start:start + len(rows)])
+    return X, np.array([y[i] for i in new]), [keys[i] for i in new]
+
+def new_incremental_model(classes, replay_per_class=200, front_end=None, sample_rate=1.024e6):
+    """An empty incremental model_data dict for a fixed set of classes"""
+    return {
+        'model': SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42),
+        'scaler': StandardScaler(),
+        'model_name': 'SGD (incremental)',
+        'front_end': front_end.config() if front_end is not None else None,
+        'feature_schema': feature_schema(front_end, sample_rate),
+        'class_names': sorted(classes),
+        'incremental': {
+            'classes': sorted(classes),
+            'seen_keys': set(),
+            'replay': {label: np.empty((0, len(FEATURE_NAMES)), dtype=np.float32)
+                       for label in classes},
+            'replay_per_class': replay_per_class,
+            'n_seen': 0,
+            # Rows ever offered to each class's replay buffer (the reservoir's n)
+            'class_seen': {label: 0 for label in classes},
+        },
+    }
+
+def replay_buffer(state):
+    """Replay feature rows and their labels as one (X, y) pair"""
+    classes = state['classes']
+    X = np.concatenate([state['replay'][label] for label in classes])
+    y = np.repeat(np.array(classes), [len(state['replay'][label]) for label in classes])
+    return X, y
+
+def reservoir_update(reservoir, rows, n_seen, size, rng):
+    """
+    Reservoir sampling (Algorithm R): fold rows into a uniform sample of every row seen.
+
+    reservoir holds `size` rows drawn uniformly from the n_seen rows offered
+    before; row number n (1-based, over all time) replaces a random entry
+    with probability size / n. Returns the new reservoir and n_seen.
+    """
+    reservoir = np.array(reservoir, copy=True)
+    fill = min(max(size - len(reservoir), 0), len(rows))
+    reservoir = np.concatenate([reservoir, rows[:fill]])
+    n_seen += fill
+    for row in rows[fill:]:
+        n_seen += 1
+        slot = rng.integers(n_seen)
+        if slot < size:
+            reservoir[slot] = row
+    return reservoir, n_seen
+
+def update_model(model_data, X_new, y_new, keys_new, epochs=5, seed=0):
+    """
+    Fold new captures into an incremental model.
+
+    The scaler's running mean/variance absorb the new rows (partial_fit),
+    then the classifier takes `epochs` partial_fit passes over the new rows
+    mixed with a per-class replay buffer of earlier feature vectors, so a
+    batch of one class does not wash out the others. Only new captures are
+    ever loaded or extracted.
+    """
+    state = model_data['incremental']
+    unknown = sorted(set(y_new.tolist()) - set(state['classes']))
+    if unknown:
+        raise ValueError(f"New classes {unknown} need a full retrain (train_validated.py "
+                         f"or train_incremental.py --init)")
+    rng = np.random.default_rng(seed + state['n_seen'])
+
+    scaler = model_data['scaler']
+    scaler.partial_fit(X_new)
+
+    replay_X, replay_y = replay_buffer(state)
+    X_train = np.concatenate([X_new, replay_X])
+    y_train = np.concatenate([y_new, replay_y])
+    X_scaled = scaler.transform(X_train)
+    classes = np.array(state['classes'])
+    for _ in range(epochs):
+        order = rng.permutation(len(X_scaled))
+        model_data['model'].partial_fit(X_scaled[order], y_train[order], classes=classes)
+
+    # Each class's replay buffer is a uniform sample of every row that class has ever had
+    # (models from before class_seen was kept start counting from their buffer size)
+    class_seen = state.setdefault('class_seen', {label: len(state['replay'][label]) for label in state['classes']})
+    for label in sorted(set(y_new.tolist())):
+        state['replay'][label], class_seen[label] = reservoir_update(
+            state['replay'][label], X_new[y_new == label], class_seen[label], state['replay_per_class'], rng)
+    state['seen_keys'].update(keys_new)
+    state['n_seen'] += len(keys_new)
+    return model_data
+
+def main():
+    parser = argparse.ArgumentParser(description='Incrementally update a classifier with new captures')
+    parser.add_argument('--data-dir', default='datasets_validated', help='.npy capture tree or IQ shard directory')
+    parser.add_argument('--model', default='rtl_classifier_incremental.pkl',
+                        help='Incremental model to update (versioned copies are kept next to it)')
+    parser.add_argument('--init', action='store_true', help='Start a new model from every capture in --data-dir')
+    parser.add_argument('--epochs', type=int, default=5, help='partial_fit passes per update')
+    parser.add_argument('--replay', type=int, default=200, help='Feature vectors kept per class for rehearsal')
+    parser.add_argument('--keep', type=int, default=5, help='Numbered model versions to keep')
+    parser.add_argument('--export', default='', help='Also write a pure-NumPy .npz for classify_live.py')
+    parser.add_argument('--decimation', type=int, default=1,
+                        help='DDC front end decimation for a new model (--init); updates reuse the model\'s own')
+    parser.add_argument('--offset', type=float, default=0.0, help='DDC front end offset (Hz) for a new model')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("INCREMENTAL MODEL UPDATE")
+    print("="*70)
+
+    if args.init or not os.path.exists(args.model):
+        model_data = None
+    else:
+        with open(args.model, 'rb') as f:
+            model_data = pickle.load(f)
+        if 'incremental' not in model_data:
+            parser.error(f"{args.model} is not an incremental model; create one with --init")
+
+    try:
+        sample_rate = dataset_sample_rate(args.data_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    if model_data is not None:
+        # Features must come from the front end (and capture rate) the model was started with
+        try:
+            check_model_schema(model_data, sample_rate)
+        except FeatureSchemaError as e:
+            parser.error(f"{args.model}: {e}")
+        seen = model_data['incremental']['seen_keys']
+        front_end = model_front_end(model_data)
+        # Models started before schemas existed get one from here on
+        model_data.setdefault('feature_schema', feature_schema(front_end, sample_rate))
+    else:
+        seen = set()
+        front_end = DDCFrontEnd(args.decimation, args.offset)
+    X_new, y_new, keys_new = load_new_captures(args.data_dir, seen, front_end=front_end, sample_rate=sample_rate)
+    print(f"\nNew captures: {len(keys_new)}")
+    if not keys_new:
+        print("✅ Model is up to date")
+        return
+
+    if model_data is None:
+        model_data = new_incremental_model(np.unique(y_new).tolist(), replay_per_class=args.replay,
+                                           front_end=front_end, sample_rate=sample_rate)
+    update_model(model_data, X_new, y_new, keys_new, epochs=args.epochs)
+
+    state = model_data['incremental']
+    X_replay, y_replay = replay_buffer(state)
+    replay_score = model_data['model'].score(model_data['scaler'].transform(X_replay), y_replay)
+    print(f"Captures seen: {state['n_seen']}")
+    print(f"Replay-buffer accuracy: {replay_score:.3f}")
+
+    version = save_model(args.model, model_data, keep=args.keep)
+    print(f"\n✅ Model saved: {args.model} (version {version})")
+    if args.export:
+        export_model(args.export, model_data['model'], model_data['scaler'], model_name=model_data['model_name'],
+                     front_end=model_data.get('front_end'), feature_schema=model_data.get('feature_schema'))
+        print(f"✅ Lite model exported: {args.export}")
+
+if __name__ == '__main__':
+    main()
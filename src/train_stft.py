@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Train the spectrogram (STFT) classifier on a validated dataset"""
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import classification_report
+import glob
+import os
+import time
+import argparse
+
+from stft_features import StftExtractor, StftCache, train_stft_classifier
+from iq_dataset import IQDataset, is_iq_dataset, load_samples, list_npy_captures, dataset_sample_rate
+from feature_cache import npy_capture_key, shard_capture_key
+from front_end import feature_schema
+
+def load_stft_dataset(data_dir, extractor, chunk_size=16, use_cache=True):
+    """
+    Spectrogram tensors for every capture in a dataset.
+
+    With the cache the result is a read-only float16 memmap in
+    <data_dir>/.feature_cache, next to the scalar feature cache.
+    """
+    if is_iq_dataset(data_dir):
+        dataset = IQDataset(data_dir)
+        y = dataset.labels
+        keys = [shard_capture_key(dataset, i) for i in range(len(dataset))]
+        compute = lambda rows: extractor.extract_batch(dataset.batch(rows))
+    else:
+        filepaths, y = list_npy_captures(data_dir)
+        keys = [npy_capture_key(fp, data_dir) for fp in filepaths]
+        compute = lambda rows: extractor.extract_batch(
+            np.stack([load_samples(filepaths[i]) for i in rows]))
+
+    if not use_cache:
+        tensors = np.empty((len(keys),) + extractor.shape, dtype=np.float16)
+        for start in range(0, len(keys), chunk_size):
+            rows = list(range(start, min(start + chunk_size, len(keys))))
+            tensors[rows] = compute(rows)
+        return tensors, np.array(y)
+
+    cache = StftCache(os.path.join(data_dir, '.feature_cache'), extractor.fingerprint, extractor.shape)
+    tensors = cache.build(keys, compute, chunk_size=chunk_size)
+    print(f"STFT cache: {cache.hits} cached, {cache.misses} computed")
+    return tensors, np.array(y)
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the spectrogram (STFT) classifier')
+    parser.add_argument('--data-dir', default='datasets_validated', help='.npy capture tree or IQ shard directory')
+    parser.add_argument('--n-fft', type=int, default=128, help='FFT size (frequency bins)')
+    parser.add_argument('--frames', type=int, default=64, help='Time slices per capture')
+    parser.add_argument('--hidden', type=int, default=64, help='Hidden units')
+    parser.add_argument('--epochs', type=int, default=60)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--chunk-size', type=int, default=16, help='Captures per STFT batch')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute spectrograms, ignoring the cache')
+    parser.add_argument('--output', default='rtl_classifier_stft.npz')
+    args = parser.parse_args()
+
+    print("="*70)
+    print("TRAINING SPECTROGRAM CLASSIFIER")
+    print("="*70)
+
+    try:
+        sample_rate = dataset_sample_rate(args.data_dir)
+    except ValueError as e:
+        parser.error(str(e))
+
+    extractor = StftExtractor(args.n_fft, args.frames)
+    start = time.perf_counter()
+    tensors, y = load_stft_dataset(args.data_dir, extractor, args.chunk_size, use_cache=not args.no_cache)
+    print(f"\nDataset: {len(tensors)} spectrograms of {extractor.shape} "
+          f"({time.perf_counter() - start:.1f} s), {len(np.unique(y))} classes")
+
+    train_rows, test_rows = train_test_split(
+        np.arange(len(y)), test_size=0.2, random_state=42, stratify=y
+    )
+
+    start = time.perf_counter()
+    model = train_stft_classifier(tensors, y, train_rows, hidden=args.hidden, epochs=args.epochs,
+                                  batch_size=args.batch_size, n_fft=args.n_fft, n_frames=args.frames)
+    print(f"Training: {args.epochs} epochs in {time.perf_counter() - start:.1f} s")
+    # Stored with the model: classify_live and the other classifiers check it like a scalar model's
+    model.feature_schema = feature_schema(sample_rate=sample_rate, stft=model.config)
+
+    test_rows = np.sort(test_rows)
+    train_score = np.mean(model.predict(tensors[np.sort(train_rows)]) == y[np.sort(train_rows)])
+    y_pred = model.predict(tensors[test_rows])
+    test_score = np.mean(y_pred == y[test_rows])
+    print(f"Training accuracy: {train_score:.3f}")
+    print(f"Test accuracy: {test_score:.3f}")
+    print("\nClassification Report:")
+    print(classification_report(y[test_rows], y_pred))
+
+    # Latency from raw IQ, as classify_live would see it
+    if is_iq_dataset(args.data_dir):
+        sample = IQDataset(args.data_dir).samples(0)
+    else:
+        first = sorted(glob.glob(os.path.join(args.data_dir, '*', '*.npy')))[0]
+        sample = load_samples(first)
+    batch = np.stack([sample] * 8)
+    for n in (1, 8):
+        start = time.perf_counter()
+        for _ in range(5):
+            model.classify_samples(batch[:n])
+        per_capture = (time.perf_counter() - start) / 5 / n
+        print(f"Inference (batch {n}): {per_capture * 1e3:.1f} ms per {len(sample)}-sample capture")
+
+    model.save(args.output)
+    print(f"\n✅ Model saved: {args.output} (classify with: rtl-ml classify --model {args.output})")
+    print(f"✅ Accuracy: {test_score:.1%}")
+
+if __name__ == '__main__':
+    main()
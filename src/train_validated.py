@@ -1,85 +1,249 @@
 #!/usr/bin/env python3
 """Train classifier on validated dataset"""
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.svm import SVC
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import classification_report, confusion_matrix
 import os
-import pickle
+import argparse
+import multiprocessing
+import multiprocessing.util
+from tqdm import tqdm
 
-class SignalFeatureExtractor:
-    def extract_features(self, samples):
-        features = []
-        power = np.abs(samples) ** 2
-        features.append(np.mean(power))
-        features.append(np.std(power))
-        features.append(np.max(power))
-        features.append(np.min(power))
-        
-        fft_vals = np.fft.fft(samples)
-        fft_power = np.abs(fft_vals) ** 2
-        features.append(np.mean(fft_power))
-        features.append(np.std(fft_power))
-        features.append(np.max(fft_power))
-        
-        peak_freq_idx = np.argmax(fft_power)
-        features.append(peak_freq_idx / len(fft_power))
-        
-        i_samples = np.real(samples)
-        q_samples = np.imag(samples)
-        features.append(np.mean(i_samples))
-        features.append(np.std(i_samples))
-        features.append(np.mean(q_samples))
-        features.append(np.std(q_samples))
-        
-        phase = np.angle(samples)
-        features.append(np.mean(phase))
-        features.append(np.std(phase))
-        
-        phase_diff = np.diff(phase)
-        features.append(np.mean(phase_diff))
-        features.append(np.std(phase_diff))
-        
-        bandwidth = np.sum(fft_power > np.max(fft_power) * 0.1)
-        features.append(bandwidth / len(fft_power))
-        
-        return np.array(features)
+from signal_features import extract_features_batched
+from front_end import SPECTRA, DDCFrontEnd, feature_extractor, feature_schema, choose_front_end
+from iq_dataset import IQDataset, is_iq_dataset, load_samples, list_npy_captures, dataset_sample_rate
+from feature_cache import FeatureCache, npy_capture_key, shard_capture_key
+from dataset_manifest import add_query_arguments, query_filters
+from lite_model import export_model
+from model_selection import load_grid, select_model, write_leaderboard
+from model_store import save_model
 
-def load_dataset(data_dir='datasets_validated'):
-    X = []
-    y = []
-    
-    labels = sorted(os.listdir(data_dir))
+# Per-process state for parallel loading, filled in by _init_worker
+_worker = {}
+
+def _init_worker(lock, counter):
+    tqdm.set_lock(lock)
+    with counter.get_lock():
+        counter.value += 1
+        position = counter.value
+    _worker['bar'] = tqdm(desc=f"   worker {position}", position=position, unit='cap', leave=False)
+    # Clear the bar when the pool shuts the worker down
+    multiprocessing.util.Finalize(None, _worker['bar'].close, exitpriority=10)
+
+def _extract_job(job):
+    """Extract one chunk: ('npy'|'iq', data_dir, filepaths or consecutive rows, front-end config, sample rate, spectrum)"""
+    kind, data_dir, items, front_end, sample_rate, spectrum = job
+    if 'extractor' not in _worker or _worker['front_end'] != (front_end, sample_rate, spectrum):
+        _worker['extractor'] = feature_extractor(DDCFrontEnd.from_config(front_end), sample_rate, spectrum)
+        _worker['front_end'] = (front_end, sample_rate, spectrum)
+    extractor = _worker['extractor']
+    if kind == 'npy':
+        samples = [load_samples(fp) for fp in items]
+        features = extract_features_batched(extractor, samples, batch_size=len(items))
+    else:
+        if _worker.get('data_dir') != data_dir:
+            _worker['dataset'] = IQDataset(data_dir)
+            _worker['data_dir'] = data_dir
+        features = extractor.extract_batch(_worker['dataset'].batch(items))
+    if 'bar' in _worker:
+        _worker['bar'].update(len(items))
+    return features
+
+def _run_jobs(jobs, rows, X, workers=1):
+    """Run extraction jobs (serially or on a process pool) and scatter results into X in job order"""
+    with tqdm(total=sum(len(r) for r in rows), desc="   Extracting", unit='cap', position=0) as bar:
+        if workers <= 1 or len(jobs) <= 1:
+            results = map(_extract_job, jobs)
+            for job_rows, features in zip(rows, results):
+                X[job_rows] = features
+                bar.update(len(job_rows))
+            return
+        # imap keeps job order, so X is identical to the serial result
+        counter = multiprocessing.Value('i', 0)
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(tqdm.get_lock(), counter)) as pool:
+            for job_rows, features in zip(rows, pool.imap(_extract_job, jobs)):
+                X[job_rows] = features
+                bar.update(len(job_rows))
+            pool.close()
+            pool.join()
+
+def _finish_cache(cache, keys, X, missing, prune=True):
+    """Store freshly computed rows, drop entries for deleted captures (unless keys is a subset), persist"""
+    cache.store([keys[i] for i in missing], X[missing])
+    if prune:
+        cache.prune(keys)
+    cache.save()
+    print(f"Feature cache: {cache.hits} cached, {cache.misses} computed")
+
+def load_iq_dataset(data_dir, chunk_size=16, cache_dir=None, workers=1, front_end=None, sample_rate=1.024e6,
+                    spectrum='fft'):
+    """Load binary IQ shards (see iq_dataset.py); batches are memmap views"""
+    dataset = IQDataset(data_dir)
+    labels = sorted(set(dataset.labels.tolist()))
     print(f"Loading {len(labels)} classes: {labels}")
-    
     for label in labels:
-        label_dir = os.path.join(data_dir, label)
-        if not os.path.isdir(label_dir):
-            continue
-        
-        files = [f for f in os.listdir(label_dir) if f.endswith('.npy')]
-        print(f"  {label}: {len(files)} samples")
-        
-        extractor = SignalFeatureExtractor()
-        for filename in files:
-            filepath = os.path.join(label_dir, filename)
-            data = np.load(filepath, allow_pickle=True).item()
-            samples = data['samples']
-            features = extractor.extract_features(samples)
-            X.append(features)
-            y.append(label)
-    
-    return np.array(X), np.array(y)
+        print(f"  {label}: {int(np.sum(dataset.labels == label))} samples")
+    
+    extractor = feature_extractor(front_end, sample_rate, spectrum)
+    X = np.empty((len(dataset), len(extractor.feature_names)), dtype=np.float32)
+    cache = FeatureCache(cache_dir, extractor.fingerprint) if cache_dir else None
+    if cache is not None:
+        keys = [shard_capture_key(dataset, i) for i in range(len(dataset))]
+        missing = cache.lookup(keys, X)
+    else:
+        missing = list(range(len(dataset)))
+    
+    rows = []
+    start = 0
+    while start < len(missing):
+        # Chunk over consecutive equal-length captures so batch() can return one view
+        length = dataset.records[missing[start]]['length']
+        stop = start + 1
+        while (stop < len(missing) and stop - start < chunk_size
+               and missing[stop] == missing[stop - 1] + 1
+               and dataset.records[missing[stop]]['length'] == length):
+            stop += 1
+        rows.append(missing[start:stop])
+        start = stop
+    config = front_end.config() if front_end is not None else None
+    _run_jobs([('iq', data_dir, r, config, sample_rate, spectrum) for r in rows], rows, X, workers=workers)
+    
+    if cache is not None:
+        _finish_cache(cache, keys, X, missing)
+    return X, dataset.labels
+
+def load_dataset(data_dir='datasets_validated', chunk_size=16, use_cache=True, workers=1, front_end=None,
+                 select=None, sample_rate=1.024e6, spectrum='fft'):
+    """
+    Load a dataset and extract features.
+    
+    Args:
+        data_dir: .npy capture tree or binary IQ shard directory
+        chunk_size: Captures per extraction job (and per batched FFT)
+        use_cache: Reuse features from <data_dir>/.feature_cache
+        workers: Extraction processes; rows come back in the same order for any count
+        front_end: DDCFrontEnd applied to every capture before extraction (None = full rate)
+        select: DatasetManifest.query filters for a training subset (.npy trees with a manifest)
+        sample_rate: Capture sample rate (see iq_dataset.dataset_sample_rate); places the front end's offset
+        spectrum: 'fft' (full-length transform) or 'welch' (StreamingFeatureExtractor, for classify_live.py --chunk)
+    """
+    # The cache lives inside the dataset so it travels (and is pruned) with it
+    cache_dir = os.path.join(data_dir, '.feature_cache') if use_cache else None
+    if is_iq_dataset(data_dir):
+        if select:
+            raise ValueError("Capture selection works on .npy trees; IQ shard datasets have no manifest")
+        return load_iq_dataset(data_dir, chunk_size=chunk_size, cache_dir=cache_dir, workers=workers,
+                               front_end=front_end, sample_rate=sample_rate, spectrum=spectrum)
+    
+    filepaths, y = list_npy_captures(data_dir, select=select)
+    
+    extractor = feature_extractor(front_end, sample_rate, spectrum)
+    X = np.empty((len(filepaths), len(extractor.feature_names)), dtype=np.float32)
+    cache = FeatureCache(cache_dir, extractor.fingerprint) if cache_dir else None
+    if cache is not None:
+        keys = [npy_capture_key(fp, data_dir) for fp in filepaths]
+        missing = cache.lookup(keys, X)
+    else:
+        missing = list(range(len(filepaths)))
+    
+    # Each job loads and extracts one chunk, so only chunk_size captures per worker are in memory
+    rows = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+    config = front_end.config() if front_end is not None else None
+    _run_jobs([('npy', data_dir, [filepaths[i] for i in r], config, sample_rate, spectrum) for r in rows], rows, X,
+              workers=workers)
+    
+    if cache is not None:
+        # A subset must not evict the cached features of the captures it left out
+        _finish_cache(cache, keys, X, missing, prune=not select)
+    return X, np.array(y)
+
+def class_examples(data_dir, per_class=8, select=None):
+    """Up to per_class captures of every class, for choosing a front end before extraction"""
+    examples = {}
+    if is_iq_dataset(data_dir):
+        dataset = IQDataset(data_dir)
+        for i, label in enumerate(dataset.labels.tolist()):
+            if len(examples.setdefault(label, [])) < per_class:
+                examples[label].append(dataset.samples(i))
+        return examples
+    filepaths, labels = list_npy_captures(data_dir, verbose=False, select=select)
+    for filepath, label in zip(filepaths, labels):
+        if len(examples.setdefault(label, [])) < per_class:
+            examples[label].append(load_samples(filepath))
+    return examples
+
+def parse_decimation(value):
+    """--decimation: a positive integer or 'auto'"""
+    if value == 'auto':
+        return value
+    try:
+        decimation = int(value)
+    except ValueError:
+        decimation = 0
+    if decimation < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer or 'auto', got {value!r}")
+    return decimation
 
 def main():
+    parser = argparse.ArgumentParser(description='Train classifier on validated dataset')
+    parser.add_argument('--data-dir', default='datasets_validated', help='.npy capture tree or IQ shard directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Feature extraction processes')
+    parser.add_argument('--chunk-size', type=int, default=16, help='Captures per extraction job')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute all features, ignoring the cache')
+    parser.add_argument('--export', default='rtl_classifier_validated.npz',
+                        help='Pure-NumPy model for classify_live.py --model (empty to skip)')
+    parser.add_argument('--grid', help='JSON hyperparameter grid (default: model_selection.DEFAULT_GRID)')
+    parser.add_argument('--folds', type=int, default=5, help='Cross-validation folds')
+    parser.add_argument('--eta', type=int, default=2, help='Successive halving: keep 1/eta per round (>= 2)')
+    parser.add_argument('--leaderboard', default='model_leaderboard.json', help='JSON model ranking')
+    parser.add_argument('--decimation', type=parse_decimation, default=1,
+                        help="DDC front end: decimate captures by this factor before extraction, or 'auto' "
+                             "to pick the largest factor every class's occupied bandwidth fits through")
+    parser.add_argument('--offset', type=float, default=0.0,
+                        help='DDC front end: shift this offset from the tuned frequency (Hz) to DC first')
+    parser.add_argument('--max-decimation', type=int, default=64, help="Upper limit for --decimation auto")
+    parser.add_argument('--spectrum', choices=SPECTRA, default='fft',
+                        help="FFT features from one full-length transform, or Welch-averaged ones, which "
+                             "classify_live.py --chunk needs (full rate only: no --decimation/--offset)")
+    add_query_arguments(parser)
+    args = parser.parse_args()
+    try:
+        select = query_filters(args)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.eta < 2:
+        parser.error("--eta must be at least 2")
+    if args.spectrum == 'welch' and (args.decimation != 1 or args.offset):
+        parser.error("--spectrum welch computes features on full-rate chunks; drop --decimation/--offset")
+    if select and is_iq_dataset(args.data_dir):
+        parser.error("--labels/--freq-range/--since/--until/--passed-only need a .npy capture tree")
+    
     print("="*70)
     print("TRAINING REDDIT-PROOF CLASSIFIER")
     print("="*70)
     
-    X, y = load_dataset()
+    try:
+        sample_rate = dataset_sample_rate(args.data_dir, select=select)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.decimation == 'auto':
+        front_end, per_class = choose_front_end(class_examples(args.data_dir, select=select), sample_rate,
+                                                offset_hz=args.offset, max_decimation=args.max_decimation)
+        print("\nOccupied bandwidth per class:")
+        for label, (bandwidth, factor) in sorted(per_class.items()):
+            print(f"  {label:15s} {bandwidth/1e3:8.1f} kHz  -> decimation {factor}")
+    else:
+        front_end = DDCFrontEnd(args.decimation, args.offset)
+    print(f"\nFront end: {front_end} at {sample_rate/1e6:.3f} MSPS")
+    # Stored with the model; classifiers check it before extracting a single feature
+    schema = feature_schema(front_end, sample_rate, spectrum=args.spectrum)
+    
+    X, y = load_dataset(args.data_dir, chunk_size=args.chunk_size, use_cache=not args.no_cache,
+                        workers=args.workers, front_end=front_end, select=select, sample_rate=sample_rate,
+                        spectrum=args.spectrum)
     print(f"\nDataset: {len(X)} samples, {len(np.unique(y))} classes")
     
     X_train, X_test, y_train, y_test = train_test_split(
@@ -90,38 +254,35 @@ def main():
     X_train_scaled = scaler.fit_transform(X_train)
     X_test_scaled = scaler.transform(X_test)
     
-    models = {
-        'Random Forest': RandomForestClassifier(n_estimators=100, random_state=42),
-        'SVM': SVC(kernel='rbf', random_state=42),
-        'KNN': KNeighborsClassifier(n_neighbors=5)
-    }
+    print(f"\n{'='*70}")
+    print("MODEL SELECTION")
+    print(f"{'='*70}")
+    grid = load_grid(args.grid) if args.grid else None
+    finalists, candidates = select_model(X_train, y_train, grid=grid, n_splits=args.folds,
+                                         eta=args.eta, workers=args.workers)
     
+    # Finalists are refit on the whole training split; the best CV score wins
     best_model = None
-    best_score = 0
     best_name = ""
+    for candidate in finalists:
+        model = candidate.build().fit(X_train_scaled, y_train)
+        candidate.test_score = model.score(X_test_scaled, y_test)
+        print(f"\n{candidate.name}")
+        print(f"Cross-validation: {candidate.cv_mean:.3f} (+/- {candidate.cv_std:.3f})")
+        print(f"Training accuracy: {model.score(X_train_scaled, y_train):.3f}")
+        print(f"Test accuracy: {candidate.test_score:.3f}")
+        if best_model is None:
+            best_model, best_name = model, candidate.model_name
+            best_score = candidate.test_score
     
-    for name, model in models.items():
-        print(f"\n{'='*70}")
-        print(f"{name}")
-        print(f"{'='*70}")
-        
-        cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5)
-        print(f"Cross-validation: {cv_scores.mean():.3f} (+/- {cv_scores.std():.3f})")
-        
-        model.fit(X_train_scaled, y_train)
-        train_score = model.score(X_train_scaled, y_train)
-        test_score = model.score(X_test_scaled, y_test)
-        
-        print(f"Training accuracy: {train_score:.3f}")
-        print(f"Test accuracy: {test_score:.3f}")
-        
-        if test_score > best_score:
-            best_score = test_score
-            best_model = model
-            best_name = name
+    write_leaderboard(args.leaderboard, candidates, extra={
+        'n_train': len(X_train), 'n_test': len(X_test), 'folds': args.folds, 'eta': args.eta,
+        'best': finalists[0].name,
+    })
+    print(f"\n✅ Leaderboard saved: {args.leaderboard}")
     
     print(f"\n{'='*70}")
-    print(f"BEST MODEL: {best_name} ({best_score:.1%})")
+    print(f"BEST MODEL: {finalists[0].name} ({best_score:.1%})")
     print(f"{'='*70}")
     
     y_pred = best_model.predict(X_test_scaled)
@@ -141,10 +302,21 @@ def main():
             print(f"{cm[i,j]:>8}", end=' ')
         print()
     
-    with open('rtl_classifier_validated.pkl', 'wb') as f:
-        pickle.dump({'model': best_model, 'scaler': scaler, 'model_name': best_name}, f)
+    version = save_model('rtl_classifier_validated.pkl',
+                         {'model': best_model, 'scaler': scaler, 'model_name': best_name,
+                          'front_end': front_end.config(), 'feature_schema': schema,
+                          'class_names': [str(c) for c in best_model.classes_]})
+    
+    print(f"\n✅ Model saved: rtl_classifier_validated.pkl (version {version}, feature schema {schema['hash']})")
     
-    print(f"\n✅ Model saved: rtl_classifier_validated.pkl")
+    if args.export:
+        # A --grid may pick a model the lite runtime cannot run; the pickle above still serves it
+        try:
+            export_model(args.export, best_model, scaler, model_name=best_name, front_end=front_end.config(),
+                         feature_schema=schema)
+            print(f"✅ Lite model exported: {args.export}")
+        except ValueError as e:
+            print(f"⚠️  Lite export skipped: {e}")
     print(f"✅ Accuracy: {best_score:.1%}")
     print(f"✅ Ready for Reddit!")
 
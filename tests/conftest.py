@@ -0,0 +1,5 @@
+"""Shared pytest setup: the modules in src/ import each other by bare name, as when run as scripts"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,61 @@
+"""Adaptive capture against sources that run out"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from adaptive_capture import SettleDetector, adaptive_classify
+from iq_dataset import iq_to_uint8
+from iq_source import FileReplaySource
+from signal_features import SignalFeatureExtractor
+from synthetic_iq import generate
+
+SAMPLE_RATE = 1.024e6
+
+
+@pytest.fixture(scope='module')
+def model_data():
+    rng = np.random.default_rng(0)
+    labels = np.array(['pager', 'noise'] * 6)
+    X = SignalFeatureExtractor().extract_batch(np.stack([generate(label, 51200, rng) for label in labels]))
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaler.transform(X), labels)
+    return {'model': model, 'scaler': scaler, 'model_name': 'test'}
+
+
+def _short_replay(tmp_path, monkeypatch, n_samples):
+    path = tmp_path / 'short.cu8'
+    iq_to_uint8(generate('pager', n_samples, np.random.default_rng(1))).tofile(path)
+    source = FileReplaySource(str(path), loop=False)
+    read_samples = source.read_samples
+    calls = []
+
+    def guarded(num_samples):
+        # A regression would spin forever on empty reads; fail instead
+        calls.append(num_samples)
+        assert len(calls) < 1000, "read loop does not stop on an exhausted source"
+        return read_samples(num_samples)
+
+    monkeypatch.setattr(source, 'read_samples', guarded)
+    return source
+
+
+def test_exhausted_replay_classifies_what_was_read(tmp_path, monkeypatch, model_data):
+    source = _short_replay(tmp_path, monkeypatch, 150000)
+    result = adaptive_classify(source, model_data, 929.6e6, SettleDetector(min_discard=8192),
+                               min_duration=0.2, max_duration=0.5)
+    assert 0 < result.duration < 0.5
+    assert result.label in ('pager', 'noise')
+    assert not result.early_stop
+
+
+def test_settle_stops_on_an_empty_source(tmp_path, monkeypatch):
+    source = _short_replay(tmp_path, monkeypatch, 4096)
+    discarded, _, block = SettleDetector(min_discard=8192, max_settle=60).settle(source)
+    assert discarded == 4096 and len(block) == 0
+
+
+def test_nothing_read_raises(tmp_path, monkeypatch, model_data):
+    source = _short_replay(tmp_path, monkeypatch, 4096)
+    with pytest.raises(EOFError):
+        adaptive_classify(source, model_data, 929.6e6, SettleDetector(min_discard=8192))
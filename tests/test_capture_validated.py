@@ -0,0 +1,109 @@
+"""Capture-time validation: shared spectral context, batched validators and the pipelined capture"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from capture_validated import BatchValidator, PipelinedCapture, SpectralContext, ValidatedSignalCapture
+from dataset_manifest import DatasetManifest
+from iq_source import SyntheticSource
+from synthetic_iq import generate
+
+SAMPLE_RATE = 1.024e6
+SIGNALS = [{'label': 'pager', 'freq': 152.84e6}, {'label': 'noise', 'freq': 145e6},
+           {'label': 'ADS_B', 'freq': 1090e6}]
+
+
+def _pipeline(tmp_path, monkeypatch, **options):
+    monkeypatch.chdir(tmp_path)   # spectrograms go to ./visualizations
+    capture = ValidatedSignalCapture(source=SyntheticSource(SAMPLE_RATE, realtime=True, seed=0))
+    return PipelinedCapture(capture, output_dir=str(tmp_path / 'ds'), settle=0, **options)
+
+
+def test_wall_time_tracks_capture_time(tmp_path, monkeypatch):
+    pipeline = _pipeline(tmp_path, monkeypatch)
+    summary = pipeline.run(SIGNALS, samples_per_class=4, duration=0.25)
+    report = pipeline.report()
+    assert report['errors'] == []
+    assert report['capture_time_s'] == 3.0
+    assert report['wall_time_s'] < report['capture_time_s'] * 1.3 + 0.5
+    assert set(summary) == {'pager', 'noise', 'ADS_B'}
+    assert all(summary[label]['captures']['validated'] == 4 for label in summary)
+    for label in summary:
+        assert len(os.listdir(tmp_path / 'ds' / label)) == 4
+        assert os.path.exists(tmp_path / 'visualizations' / f'{label}_spectrum.png')
+
+
+def test_slow_plots_do_not_hold_up_the_reader(tmp_path, monkeypatch):
+    pipeline = _pipeline(tmp_path, monkeypatch, fast_plots=False, queue_size=2)
+
+    def slow_plot(samples, label, freq, context=None, fast=False):
+        time.sleep(1.5)
+
+    monkeypatch.setattr(pipeline.capture, 'generate_spectrogram', slow_plot)
+    pipeline.run(SIGNALS, samples_per_class=4, duration=0.25)
+    report = pipeline.report()
+    assert report['stages']['plot']['items'] == 3
+    # The reader streams at capture rate; only the final join waits for the plots
+    assert report['stages']['read']['busy_s'] == pytest.approx(report['capture_time_s'], rel=0.2, abs=0.3)
+
+
+LABELS = ['ADS_B', 'NOAA_APT', 'ISM_sensors', 'FM_broadcast', 'pager', 'noise']
+
+
+def test_spectral_context_computes_each_view_once():
+    rng = np.random.default_rng(0)
+    batch = np.stack([generate('pager', 4096, rng) for _ in range(3)])
+    context = SpectralContext(batch, SAMPLE_RATE, nperseg=256)
+    assert len(context) == 3 and context.n_samples == 4096
+    np.testing.assert_allclose(context.power, np.abs(batch) ** 2, rtol=1e-6)
+    for row, samples in zip(context.spectrum_power, batch):
+        np.testing.assert_allclose(row, np.abs(np.fft.fft(samples)) ** 2, rtol=1e-3, atol=1e-3)
+    np.testing.assert_allclose(context.fft_freqs, np.fft.fftfreq(4096, 1 / SAMPLE_RATE))
+    assert context.spectrum_power is context.spectrum_power
+    f, t, Sxx = context.stft
+    assert Sxx.shape == (3, 256, len(t)) and len(f) == 256
+    single = SpectralContext(batch[0], SAMPLE_RATE)
+    assert len(single) == 1
+    np.testing.assert_allclose(single.spectrum_power[0], context.spectrum_power[0])
+
+
+@pytest.mark.parametrize('label', LABELS)
+def test_batch_validation_matches_one_capture_at_a_time(label):
+    capture = ValidatedSignalCapture(source=SyntheticSource(SAMPLE_RATE))
+    rng = np.random.default_rng(1)
+    batch = np.stack([generate(label, 32768, rng) for _ in range(4)])
+    results = capture.validate_batch(batch, label)
+    assert len(results) == 4
+    for samples, result in zip(batch, results):
+        single = capture.validate_signal(samples, label)
+        assert single.keys() == result.keys()
+        for key, value in result.items():
+            assert single[key] == (pytest.approx(value, rel=1e-4) if isinstance(value, float) else value)
+
+
+def test_batch_validator_keeps_capture_order_and_records_results(tmp_path):
+    capture = ValidatedSignalCapture(source=SyntheticSource(SAMPLE_RATE))
+    (tmp_path / 'ds').mkdir()
+    validator = BatchValidator(capture, batch_size=4, thumbnail_dir=str(tmp_path / 'thumbs'),
+                               output_dir=str(tmp_path / 'ds'))
+    rng = np.random.default_rng(2)
+    timestamps = [f'20240101_00000{i}_000000' for i in range(7)]
+    for i, timestamp in enumerate(timestamps):
+        # Capture 5 is short, so the last batch is validated in two length groups
+        validator.add(generate('ADS_B', 4096 if i == 5 else 8192, rng), 'ADS_B', timestamp, 1090e6)
+    assert len(validator.results['ADS_B']) == 4
+    validator.add(generate('noise', 8192, rng), 'noise', 'n0', 145e6)
+    validator.flush()
+
+    summary = validator.summary('ADS_B')
+    assert [r['timestamp'] for r in summary['captures']] == timestamps
+    assert summary['validated'] == 7 and summary['passed'] == 7
+    assert all('note' not in r for r in summary['captures'])
+    assert validator.summary('noise')['validated'] == 1
+    assert validator.summary('APRS') == {'validated': 0, 'passed': None, 'captures': []}
+
+    records = DatasetManifest(str(tmp_path / 'ds')).records
+    assert records[f'ADS_B/ADS_B_{timestamps[0]}.npy']['validation']['has_bursts'] is True
+    assert sorted(os.listdir(tmp_path / 'thumbs' / 'ADS_B')) == [f'ADS_B_{t}.png' for t in timestamps]
@@ -0,0 +1,31 @@
+"""The scanner's channelizer and the DDC front end are one operation and must agree"""
+import numpy as np
+import pytest
+
+from front_end import DDCFrontEnd
+from scanner import channelize, channel_offsets
+from synthetic_iq import generate
+
+SAMPLE_RATE = 1.024e6
+
+
+@pytest.mark.parametrize('n_channels', [4, 5, 8])
+def test_each_channel_is_the_ddc_at_its_offset(n_channels):
+    capture = generate('ISM_sensors', 65536, rng=np.random.default_rng(0))
+    channels = channelize(capture, n_channels)
+    offsets = channel_offsets(n_channels, SAMPLE_RATE)
+    usable = capture[:channels.shape[1] * n_channels][np.newaxis, :]
+    for channel, offset in zip(channels, offsets):
+        ddc = DDCFrontEnd(n_channels, offset).apply(usable, SAMPLE_RATE)[0]
+        np.testing.assert_allclose(channel, ddc, atol=1e-5)
+
+
+def test_channel_amplitude_matches_the_capture():
+    n = 65536
+    t = np.arange(n) / SAMPLE_RATE
+    offsets = channel_offsets(8, SAMPLE_RATE)
+    # A tone at the centre of channel 5
+    tone = (0.5 * np.exp(2j * np.pi * offsets[5] * t)).astype(np.complex64)
+    channels = channelize(tone, 8)
+    np.testing.assert_allclose(np.abs(channels[5]), 0.5, rtol=1e-4)
+    assert np.max(np.abs(np.delete(channels, 5, axis=0))) < 1e-4
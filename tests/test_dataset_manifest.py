@@ -0,0 +1,103 @@
+"""Manifest lines merge in order, torn lines are skipped, and sync/verify track the tree"""
+import os
+
+from dataset_manifest import DatasetManifest, build, sync, verify
+from synthetic_iq import generate_dataset
+
+
+def _record(path, label='pager', center_freq=152.84e6, timestamp='20240101_000000_000000'):
+    return {'path': path, 'label': label, 'center_freq': center_freq, 'sample_rate': 1.024e6,
+            'length': 1024, 'duration': 0.001, 'timestamp': timestamp}
+
+
+def test_later_lines_win_and_deletes_drop(tmp_path):
+    manifest = DatasetManifest(str(tmp_path))
+    manifest.append(_record('pager/a.npy'))
+    manifest.append(_record('noise/b.npy', label='noise', center_freq=145e6))
+    manifest.update('pager/a.npy', validation={'snr_db': 3.0, 'has_bursts': False})
+    manifest.update('pager/a.npy', validation={'snr_db': 9.0, 'has_bursts': True})
+    manifest.remove('noise/b.npy')
+    manifest.update('ADS_B/orphan.npy', validation={'has_bursts': True})   # never indexed
+
+    for records in (manifest.records, DatasetManifest(str(tmp_path)).records):
+        assert set(records) == {'pager/a.npy', 'ADS_B/orphan.npy'}
+        assert records['pager/a.npy']['validation'] == {'snr_db': 9.0, 'has_bursts': True}
+        assert records['pager/a.npy']['center_freq'] == 152.84e6
+    reloaded = DatasetManifest(str(tmp_path))
+    assert [r['path'] for r in reloaded.query()] == ['pager/a.npy']
+    assert [r['path'] for r in reloaded.query(passed=True)] == ['pager/a.npy']
+    assert reloaded.query(passed=False) == []
+
+
+def test_readd_after_delete(tmp_path):
+    manifest = DatasetManifest(str(tmp_path))
+    manifest.append(_record('pager/a.npy'))
+    manifest.update('pager/a.npy', validation={'has_bursts': True})
+    manifest.remove('pager/a.npy')
+    manifest.append(_record('pager/a.npy', center_freq=152.0e6))
+    record = DatasetManifest(str(tmp_path)).records['pager/a.npy']
+    assert record['center_freq'] == 152.0e6
+    assert 'validation' not in record
+
+
+def test_torn_line_is_skipped_and_not_glued_to(tmp_path):
+    manifest = DatasetManifest(str(tmp_path))
+    manifest.append(_record('pager/a.npy'))
+    # A crash mid-write leaves a partial line without its newline
+    with open(manifest.path, 'a') as f:
+        f.write('{"path":"pager/b.npy","lab')
+    writer = DatasetManifest(str(tmp_path))
+    writer.append(_record('pager/c.npy'))
+    writer.update('pager/a.npy', validation={'has_bursts': True})
+
+    reader = DatasetManifest(str(tmp_path))
+    assert set(reader.records) == {'pager/a.npy', 'pager/c.npy'}
+    assert reader.skipped_lines == 1
+    assert reader.records['pager/a.npy']['validation'] == {'has_bursts': True}
+
+    assert reader.compact() == 2
+    compacted = DatasetManifest(str(tmp_path))
+    assert compacted.records == reader.records and compacted.skipped_lines == 0
+    with open(compacted.path) as f:
+        assert len(f.readlines()) == 2
+
+
+def test_query_filters(tmp_path):
+    manifest = DatasetManifest(str(tmp_path))
+    manifest.append(_record('pager/a.npy', timestamp='20240101_120000_000000'))
+    manifest.append(_record('pager/b.npy', timestamp='20240301_120000_000000'))
+    manifest.append(_record('noise/c.npy', label='noise', center_freq=145e6, timestamp='20240201_120000_000000'))
+    paths = lambda **filters: [r['path'] for r in manifest.query(**filters)]
+    assert paths(labels=['pager']) == ['pager/a.npy', 'pager/b.npy']
+    assert paths(max_freq=150e6) == ['noise/c.npy']
+    assert paths(since='2024-02-01', until='2024-03-01') == ['noise/c.npy']
+    assert manifest.summary()['pager']['captures'] == 2
+
+
+def test_sync_and_verify(tmp_path):
+    root = str(tmp_path)
+    generate_dataset(root, per_class=2, duration=0.002)
+    assert build(root) == 16
+    manifest = DatasetManifest(root)
+    assert manifest.is_current()
+    # A rebuild keeps validation results of files it finds unchanged
+    noise = manifest.query(labels=['noise'])[0]['path']
+    manifest.update(noise, validation={'snr_db': 1.0})
+    build(root)
+    manifest = DatasetManifest(root)
+    assert manifest.records[noise]['validation'] == {'snr_db': 1.0}
+
+    first, second = [manifest.abspath(r) for r in manifest.query(labels=['pager'])]
+    os.remove(first)
+    with open(second, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    result = verify(root)
+    assert result['ok'] == 14
+    assert result['missing'] == [os.path.relpath(first, root).replace(os.sep, '/')]
+    assert result['corrupt'] == [os.path.relpath(second, root).replace(os.sep, '/')]
+
+    assert sync(root) == (0, 1)
+    assert len(DatasetManifest(root).query()) == 15
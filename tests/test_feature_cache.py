@@ -0,0 +1,49 @@
+"""Feature caches persist per extractor fingerprint, under an LRU limit"""
+import os
+
+import numpy as np
+
+from feature_cache import FeatureCache, cache_entries, prune_caches
+
+
+def _save(cache_dir, fingerprint, keep=4, mtime=None):
+    cache = FeatureCache(str(cache_dir), fingerprint, keep=keep)
+    cache.store(['a', 'b'], np.ones((2, 3)))
+    cache.save()
+    if mtime is not None:
+        os.utime(cache.path, (mtime, mtime))
+    return cache
+
+
+def test_switching_fingerprints_keeps_both_caches(tmp_path):
+    _save(tmp_path, 'dec1')
+    _save(tmp_path, 'dec4')
+    cache = FeatureCache(str(tmp_path), 'dec1')
+    out = np.zeros((2, 3), dtype=np.float32)
+    assert cache.lookup(['a', 'b'], out) == []
+    assert cache.hits == 2
+
+
+def test_save_evicts_least_recently_used(tmp_path):
+    for i, fingerprint in enumerate(['old', 'mid', 'new']):
+        _save(tmp_path, fingerprint, mtime=1000 + i)
+    _save(tmp_path, 'current', keep=2)
+    assert [e['fingerprint'] for e in cache_entries(str(tmp_path))] == ['current', 'new']
+
+
+def test_reusing_a_cache_refreshes_it(tmp_path):
+    _save(tmp_path, 'old', mtime=1000)
+    _save(tmp_path, 'new', mtime=2000)
+    FeatureCache(str(tmp_path), 'old').save()   # loaded and reused, nothing new to write
+    _save(tmp_path, 'current', keep=2)
+    assert {e['fingerprint'] for e in cache_entries(str(tmp_path))} == {'current', 'old'}
+
+
+def test_prune_limits_each_kind_separately(tmp_path):
+    _save(tmp_path, 'f1', mtime=1000)
+    _save(tmp_path, 'f2', mtime=2000)
+    for suffix in ('.f16', '.json'):
+        (tmp_path / f'stft_s1{suffix}').write_bytes(b'x')
+    removed = prune_caches(str(tmp_path), keep=1)
+    assert [(e['kind'], e['fingerprint']) for e in removed] == [('features', 'f1')]
+    assert sorted(os.listdir(tmp_path)) == ['features_f2.npz', 'stft_s1.f16', 'stft_s1.json']
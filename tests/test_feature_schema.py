@@ -0,0 +1,90 @@
+"""Feature schemas stored with models, and the checks made when a model is used"""
+import copy
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+import classify_live
+from front_end import (DDCFrontEnd, FeatureSchemaError, channel_extractor, check_model_schema,
+                       feature_schema, model_extractor)
+from lite_model import export_model
+from signal_features import FEATURE_NAMES, SignalFeatureExtractor
+from synthetic_iq import generate
+
+SAMPLE_RATE = 1.024e6
+
+
+def _model_data(front_end=None, n_features=len(FEATURE_NAMES), schema=True):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, n_features))
+    y = np.array(['noise', 'pager'])[np.arange(40) % 2]
+    scaler = StandardScaler().fit(X)
+    model_data = {
+        'model': RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y),
+        'scaler': scaler,
+        'model_name': 'test',
+        'front_end': front_end.config() if front_end is not None else None,
+    }
+    if schema:
+        model_data['feature_schema'] = feature_schema(front_end, SAMPLE_RATE)
+    return model_data
+
+
+def test_matching_model_gets_a_working_extractor():
+    model_data = _model_data(DDCFrontEnd(4))
+    extractor = model_extractor(model_data, SAMPLE_RATE)
+    assert extractor is model_extractor(model_data, SAMPLE_RATE)
+    features = extractor.extract_batch(generate('pager', 16384, rng=np.random.default_rng(1))[np.newaxis, :])
+    assert features.shape == (1, len(FEATURE_NAMES))
+
+
+def test_lite_export_carries_the_schema(tmp_path):
+    model_data = _model_data(DDCFrontEnd(2, 25e3))
+    path = str(tmp_path / 'model.npz')
+    export_model(path, model_data['model'], model_data['scaler'], front_end=model_data['front_end'],
+                 feature_schema=model_data['feature_schema'])
+    loaded = classify_live.load_model(path)
+    assert loaded['feature_schema'] == model_data['feature_schema']
+
+
+@pytest.mark.parametrize('tamper, message', [
+    (lambda d: d['feature_schema']['names'].reverse(), 'hash'),
+    (lambda d: d.__setitem__('front_end', {'decimation': 8, 'offset_hz': 0.0}), 'front end'),
+    (lambda d: d['feature_schema'].update(feature_version=0, hash=None), 'hash'),
+])
+def test_tampered_models_are_refused(tamper, message):
+    model_data = copy.deepcopy(_model_data())
+    tamper(model_data)
+    with pytest.raises(FeatureSchemaError, match=message):
+        check_model_schema(model_data)
+
+
+def test_old_feature_version_is_refused(monkeypatch):
+    model_data = _model_data()
+    monkeypatch.setattr('front_end.FEATURE_VERSION', 2)
+    # A schema that passed earlier in this process is not compared again
+    monkeypatch.setattr('front_end._checked_schemas', set())
+    with pytest.raises(FeatureSchemaError, match='feature_version'):
+        check_model_schema(model_data)
+
+
+def test_source_at_another_rate_is_refused():
+    with pytest.raises(FeatureSchemaError, match='sample_rate'):
+        model_extractor(_model_data(), 2.048e6)
+
+
+def test_legacy_models_are_checked_by_feature_count():
+    assert isinstance(model_extractor(_model_data(schema=False), 2.048e6), SignalFeatureExtractor)
+    with pytest.raises(FeatureSchemaError, match='18 features'):
+        check_model_schema(_model_data(n_features=18, schema=False))
+
+
+def test_channels_must_run_at_the_feature_rate():
+    model_data = _model_data(DDCFrontEnd(4))
+    assert isinstance(channel_extractor(model_data, SAMPLE_RATE / 4), SignalFeatureExtractor)
+    with pytest.raises(FeatureSchemaError, match='channels run at 128.0 kHz'):
+        channel_extractor(model_data, SAMPLE_RATE / 8)
+    with pytest.raises(FeatureSchemaError):
+        channel_extractor(_model_data(), SAMPLE_RATE / 8)
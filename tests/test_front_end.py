@@ -0,0 +1,85 @@
+"""DDC front end: tones reach baseband intact, out-of-band energy is removed, decimation follows bandwidth"""
+import numpy as np
+import pytest
+
+from front_end import (DDCFrontEnd, FrontEndExtractor, choose_front_end, decimation_for_bandwidth,
+                       feature_extractor, occupied_bandwidth)
+from signal_features import SignalFeatureExtractor
+from synthetic_iq import SAMPLE_RATE, generate
+
+N = 65536
+
+
+def _tone(freq, amplitude=0.5, n=N):
+    t = np.arange(n) / SAMPLE_RATE
+    return (amplitude * np.exp(2j * np.pi * freq * t)).astype(np.complex64)
+
+
+@pytest.mark.parametrize('decimation,offset', [(4, 0.0), (8, 200e3), (16, -300e3)])
+def test_in_band_tone_is_shifted_and_kept(decimation, offset):
+    front_end = DDCFrontEnd(decimation, offset)
+    out_rate = front_end.output_rate(SAMPLE_RATE)
+    # A tone a quarter of the output band above the offset, on an exact bin
+    freq = offset + round(out_rate / 4 / (SAMPLE_RATE / N)) * (SAMPLE_RATE / N)
+    baseband = front_end.apply(_tone(freq)[np.newaxis], SAMPLE_RATE)
+    assert baseband.shape == (1, N // decimation) and baseband.dtype == np.complex64
+    np.testing.assert_allclose(np.abs(baseband[0]), 0.5, rtol=1e-3)
+    peak = np.argmax(np.abs(np.fft.fft(baseband[0])))
+    assert np.fft.fftfreq(N // decimation, 1 / out_rate)[peak] == pytest.approx(freq - offset, abs=out_rate / N)
+
+
+def test_out_of_band_tone_is_removed():
+    front_end = DDCFrontEnd(8, 0.0)
+    capture = _tone(20e3) + _tone(300e3)   # the output band is +-64 kHz
+    baseband = front_end.apply(capture[np.newaxis], SAMPLE_RATE)[0]
+    np.testing.assert_allclose(baseband, front_end.apply(_tone(20e3)[np.newaxis], SAMPLE_RATE)[0], atol=1e-4)
+
+
+def test_identity_and_configuration():
+    batch = generate('pager', 4096, np.random.default_rng(0))[np.newaxis]
+    identity = DDCFrontEnd()
+    assert identity.identity and identity.config() is None and identity.apply(batch) is batch
+    assert DDCFrontEnd.from_config(None).identity
+    front_end = DDCFrontEnd(4, 25e3)
+    rebuilt = DDCFrontEnd.from_config(front_end.config())
+    assert rebuilt.config() == {'decimation': 4, 'offset_hz': 25e3}
+    np.testing.assert_array_equal(rebuilt.apply(batch), front_end.apply(batch))
+    for bad in (0, 2.5, -1):
+        with pytest.raises(ValueError):
+            DDCFrontEnd(bad)
+    with pytest.raises(ValueError):
+        front_end.apply(batch[0])
+
+
+def test_extractor_behind_the_front_end():
+    rng = np.random.default_rng(1)
+    batch = np.stack([generate(label, N, rng) for label in ('pager', 'APRS', 'noise')])
+    front_end = DDCFrontEnd(8, 0.0)
+    extractor = feature_extractor(front_end, SAMPLE_RATE)
+    assert isinstance(extractor, FrontEndExtractor)
+    expected = SignalFeatureExtractor(SAMPLE_RATE / 8).extract_batch(front_end.apply(batch, SAMPLE_RATE))
+    np.testing.assert_array_equal(extractor.extract_batch(batch), expected)
+    np.testing.assert_array_equal(extractor.extract_features(batch[1]), expected[1])
+    assert isinstance(feature_extractor(DDCFrontEnd(), SAMPLE_RATE), SignalFeatureExtractor)
+    fingerprints = {feature_extractor(f, SAMPLE_RATE).fingerprint
+                    for f in (DDCFrontEnd(), DDCFrontEnd(8), DDCFrontEnd(8, 10e3), DDCFrontEnd(4))}
+    assert len(fingerprints) == 4
+
+
+def test_decimation_follows_occupied_bandwidth():
+    rng = np.random.default_rng(2)
+    fm = [generate('FM_broadcast', N, rng) for _ in range(2)]
+    pager = [generate('pager', N, rng) for _ in range(2)]
+    fm_bandwidth = occupied_bandwidth(fm, SAMPLE_RATE)
+    assert 100e3 < fm_bandwidth < 400e3
+    assert occupied_bandwidth(pager, SAMPLE_RATE) < fm_bandwidth
+    with pytest.raises(ValueError):
+        occupied_bandwidth([np.zeros(100, dtype=np.complex64)])
+
+    assert decimation_for_bandwidth(200e3, SAMPLE_RATE) == 4
+    assert decimation_for_bandwidth(0, SAMPLE_RATE) == 64
+    assert decimation_for_bandwidth(1e3, SAMPLE_RATE, n_samples=N) == N // 8192
+    front_end, per_class = choose_front_end({'FM_broadcast': fm, 'pager': pager}, SAMPLE_RATE)
+    # The widest class sets the decimation
+    assert front_end.decimation == per_class['FM_broadcast'][1] <= per_class['pager'][1]
+    assert front_end.output_rate(SAMPLE_RATE) >= 1.25 * per_class['FM_broadcast'][0]
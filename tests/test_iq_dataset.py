@@ -0,0 +1,136 @@
+"""IQ storage: cu8 captures and shards round-trip through the writers and readers"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from capture_validated import ValidatedSignalCapture
+from dataset_manifest import DatasetManifest
+from iq_dataset import (IQDataset, IQDatasetWriter, capture_raw, iq_to_uint8, load_capture, load_samples,
+                        pack_capture, uint8_to_iq)
+from iq_source import SyntheticSource
+from synthetic_iq import generate
+
+SAMPLE_RATE = 1.024e6
+
+
+def _captures(n, length=4096, seed=0):
+    rng = np.random.default_rng(seed)
+    return [generate('pager', length, rng=rng) for _ in range(n)]
+
+
+def test_complex64_round_trip(tmp_path):
+    captures = _captures(3)
+    with IQDatasetWriter(str(tmp_path)) as writer:
+        for i, samples in enumerate(captures):
+            writer.append(samples, 'pager', 152.84e6, SAMPLE_RATE, f'2024010{i}')
+        writer.append(captures[0][:1000], 'noise', 145e6, SAMPLE_RATE, '20240104')
+
+    dataset = IQDataset(str(tmp_path))
+    assert len(dataset) == 4
+    pager = [i for i, r in enumerate(dataset.records) if r['label'] == 'pager']
+    for i, samples in zip(pager, captures):
+        np.testing.assert_array_equal(dataset.samples(i), samples.astype(np.complex64))
+    np.testing.assert_array_equal(dataset.batch(pager), np.stack(captures).astype(np.complex64))
+    noise = dataset.records[dataset.labels.tolist().index('noise')]
+    assert noise['length'] == 1000 and noise['duration'] == pytest.approx(1000 / SAMPLE_RATE)
+
+
+def test_cu8_round_trip(tmp_path):
+    captures = _captures(2)
+    raws = [iq_to_uint8(samples) for samples in captures]
+    with IQDatasetWriter(str(tmp_path), dtype='uint8') as writer:
+        writer.append(None, 'pager', 152.84e6, SAMPLE_RATE, 't0', raw=raws[0])
+        writer.append(captures[1], 'pager', 152.84e6, SAMPLE_RATE, 't1')   # packed by the writer
+
+    dataset = IQDataset(str(tmp_path))
+    for i, raw in enumerate(raws):
+        np.testing.assert_array_equal(dataset.raw(i), raw)
+        np.testing.assert_array_equal(dataset.samples(i), uint8_to_iq(raw))
+        # 8-bit quantisation: within half a step of the original
+        assert np.max(np.abs(dataset.samples(i) - captures[i])) <= 1 / 127.5 * np.sqrt(2)
+    np.testing.assert_array_equal(dataset.batch([0, 1]), np.stack([uint8_to_iq(r) for r in raws]))
+
+
+def test_rotation_closes_shards_and_continues_numbering(tmp_path):
+    captures = _captures(5, length=256)
+    writer = IQDatasetWriter(str(tmp_path), shard_size=2)
+    opened = []
+    for i, samples in enumerate(captures):
+        writer.append(samples, 'pager', 152.84e6, SAMPLE_RATE, str(i))
+        shard_file = writer._shards['pager']['file']
+        if shard_file not in opened:
+            opened.append(shard_file)
+    assert [f.closed for f in opened] == [True, True, False]
+    writer.close()
+    assert sorted(os.listdir(tmp_path)) == [f'pager_{n:03d}.{ext}' for n in range(3) for ext in ('iq', 'json')]
+
+    # A second run appends new shards after the existing ones
+    with IQDatasetWriter(str(tmp_path), shard_size=2) as writer:
+        writer.append(captures[0], 'pager', 152.84e6, SAMPLE_RATE, '5')
+    dataset = IQDataset(str(tmp_path))
+    assert len(dataset) == 6
+    assert os.path.basename(dataset.shard_path(5)) == 'pager_003.iq'
+    for i, samples in enumerate(captures + captures[:1]):
+        np.testing.assert_array_equal(dataset.samples(i), samples.astype(np.complex64))
+
+
+def test_stale_shard_without_sidecar_is_overwritten(tmp_path):
+    # A crashed run wrote samples but never its sidecar
+    (tmp_path / 'pager_000.iq').write_bytes(np.ones(999, dtype=np.complex64).tobytes())
+    captures = _captures(2, length=512)
+    with IQDatasetWriter(str(tmp_path)) as writer:
+        for i, samples in enumerate(captures):
+            writer.append(samples, 'pager', 152.84e6, SAMPLE_RATE, str(i))
+
+    with open(tmp_path / 'pager_000.json') as f:
+        assert [c['offset'] for c in json.load(f)['captures']] == [0, 512]
+    assert os.path.getsize(tmp_path / 'pager_000.iq') == 2 * 512 * 8
+    dataset = IQDataset(str(tmp_path))
+    for i, samples in enumerate(captures):
+        np.testing.assert_array_equal(dataset.samples(i), samples.astype(np.complex64))
+
+
+def test_uint8_codec_is_exact_on_dongle_values():
+    raw = np.arange(256, dtype=np.uint8)
+    np.testing.assert_array_equal(iq_to_uint8(uint8_to_iq(raw)), raw)
+    assert uint8_to_iq(np.array([0, 255], dtype=np.uint8))[0] == np.complex64(-1 + 1j)
+    # Out-of-range samples clip instead of wrapping
+    np.testing.assert_array_equal(iq_to_uint8(np.array([2 - 3j], dtype=np.complex64)), [255, 0])
+
+
+@pytest.mark.parametrize('codec', [None, 'zlib'])
+def test_pack_capture_round_trip(codec):
+    raw = iq_to_uint8(generate('noise', 4096, np.random.default_rng(0)))
+    np.testing.assert_array_equal(capture_raw({'raw': pack_capture(raw, codec), 'codec': codec}), raw)
+    with pytest.raises(ValueError):
+        pack_capture(raw, 'lzma')
+
+
+@pytest.mark.parametrize('storage,codec', [('cu8', None), ('cu8', 'zlib'), ('complex', None)])
+def test_saved_captures_decode_to_the_samples(tmp_path, storage, codec):
+    capture = ValidatedSignalCapture(source=SyntheticSource(SAMPLE_RATE, seed=0), storage=storage, codec=codec)
+    # cu8 storage reads the source's bytes and decodes them to complex64
+    samples = capture.capture_signal(152.84e6, duration=0.01)
+    assert samples.dtype == np.complex64 and len(samples) == 10240
+    path = capture.save_sample(samples, 'pager', 152.84e6, str(tmp_path), timestamp='t0')
+    data = load_capture(path)
+    assert ('raw' in data) == (storage == 'cu8') and data['duration'] == pytest.approx(10240 / SAMPLE_RATE)
+    np.testing.assert_array_equal(load_samples(path), samples)
+    if storage == 'cu8':
+        assert data['format'] == 'cu8' and data['codec'] == codec
+        # The dongle's bytes are kept as is when given
+        raw = iq_to_uint8(samples)
+        raw_path = capture.save_sample(None, 'pager', 152.84e6, str(tmp_path), timestamp='t1', raw=raw)
+        np.testing.assert_array_equal(capture_raw(load_capture(raw_path)), raw)
+        if codec is None:
+            assert os.path.getsize(path) < 2 * 10240 + 1024
+    assert set(DatasetManifest(str(tmp_path)).records) >= {'pager/pager_t0.npy'}
+
+
+def test_capture_rejects_unknown_storage():
+    with pytest.raises(ValueError):
+        ValidatedSignalCapture(source=SyntheticSource(SAMPLE_RATE), storage='cs16')
+    with pytest.raises(ValueError):
+        ValidatedSignalCapture(source=SyntheticSource(SAMPLE_RATE), codec='lzma')
@@ -0,0 +1,154 @@
+"""IQ sources: synthetic and replayed IQ behave like the dongle, and the live source's async reads are safe"""
+import json
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+import pytest
+
+from iq_dataset import iq_to_uint8, uint8_to_iq
+from iq_source import FileReplaySource, RtlSdrSource, SyntheticSource, open_source
+from synthetic_iq import SAMPLE_RATE, generate
+
+
+def test_synthetic_source_plays_the_class_of_the_tuned_frequency():
+    source = SyntheticSource(SAMPLE_RATE, frequency_plan={152.84e6: 'pager'}, seed=0)
+    source.center_freq = 152.842e6
+    assert source.label_for(source.center_freq) == 'pager'
+    assert source.label_for(90e6) == 'noise'
+    samples = source.read_samples(4096)
+    assert samples.dtype == np.complex64 and len(samples) == 4096
+    # Seeded sources are reproducible
+    again = SyntheticSource(SAMPLE_RATE, frequency_plan={152.84e6: 'pager'}, seed=0)
+    again.center_freq = 152.84e6
+    np.testing.assert_array_equal(again.read_samples(4096), samples)
+
+
+def test_read_bytes_is_the_dongle_layout():
+    source = SyntheticSource(SAMPLE_RATE, seed=1)
+    raw = source.read_bytes(8192)
+    assert raw.dtype == np.uint8 and len(raw) == 8192
+    # Synthetic IQ is already 8-bit quantized, so the bytes decode losslessly
+    np.testing.assert_array_equal(iq_to_uint8(uint8_to_iq(raw)), raw)
+
+
+def test_realtime_source_is_paced_at_the_sample_rate():
+    source = SyntheticSource(SAMPLE_RATE, realtime=True, seed=2)
+    assert source.blocking is False and SyntheticSource(SAMPLE_RATE).blocking is True
+    started = time.monotonic()
+    for _ in range(4):
+        source.read_samples(int(SAMPLE_RATE * 0.05))
+    assert time.monotonic() - started >= 0.19
+
+
+def test_stream_delivers_blocks_until_stopped():
+    source = SyntheticSource(SAMPLE_RATE, seed=3)
+    blocks = []
+
+    def on_block(block):
+        blocks.append(block)
+        if len(blocks) == 3:
+            source.stop()
+
+    source.stream_bytes(on_block, 2048)
+    assert [len(b) for b in blocks] == [2048] * 3
+
+
+def _cu8(tmp_path, name, label, n, seed):
+    samples = generate(label, n, np.random.default_rng(seed))
+    iq_to_uint8(samples).tofile(tmp_path / name)
+    return samples
+
+
+def test_replay_reads_loop_and_stream_plays_once(tmp_path):
+    samples = _cu8(tmp_path, 'pager.cu8', 'pager', 5000, 0)
+    source = FileReplaySource(str(tmp_path / 'pager.cu8'))
+    np.testing.assert_allclose(source.read_samples(3000), samples[:3000], atol=1e-6)
+    # read_samples wraps around to the start of the recording
+    np.testing.assert_allclose(source.read_samples(4000), np.concatenate([samples[3000:], samples[:2000]]), atol=1e-6)
+
+    blocks = []
+    source.stream(blocks.append, 2048)
+    assert [len(b) for b in blocks] == [2048, 2048, 904]
+
+    once = FileReplaySource(str(tmp_path / 'pager.cu8'), loop=False)
+    assert len(once.read_samples(8000)) == 5000
+    assert len(once.read_samples(10)) == 0
+
+
+def test_replay_tuning_selects_recordings_by_frequency(tmp_path):
+    for label, freq, seed in [('pager', 152.84e6, 0), ('noise', 145e6, 1)]:
+        np.save(tmp_path / f'{label}.npy', {'samples': generate(label, 2048, np.random.default_rng(seed)),
+                                            'center_freq': freq, 'sample_rate': 2.048e6})
+    source = open_source(f'replay:{tmp_path}')
+    assert source.sample_rate == 2.048e6
+    source.center_freq = 145e6
+    noise = np.load(tmp_path / 'noise.npy', allow_pickle=True).item()['samples']
+    np.testing.assert_array_equal(source.read_samples(2048), noise)
+    source.center_freq = 152.84e6
+    pager = np.load(tmp_path / 'pager.npy', allow_pickle=True).item()['samples']
+    np.testing.assert_array_equal(source.read_samples(2048), pager)
+
+
+def test_replay_sigmf(tmp_path):
+    samples = generate('APRS', 4096, np.random.default_rng(4))
+    samples.astype(np.complex64).tofile(tmp_path / 'aprs.sigmf-data')
+    with open(tmp_path / 'aprs.sigmf-meta', 'w') as f:
+        json.dump({'global': {'core:datatype': 'cf32_le', 'core:sample_rate': 1.024e6},
+                   'captures': [{'core:frequency': 144.39e6}]}, f)
+    source = FileReplaySource(str(tmp_path / 'aprs.sigmf-meta'))
+    np.testing.assert_array_equal(source.read_samples(4096), samples)
+
+
+def test_unknown_source_spec():
+    with pytest.raises(ValueError):
+        open_source('hackrf')
+    with pytest.raises(ValueError):
+        open_source('replay:')
+
+
+class FakeRtlSdr:
+    """Stands in for pyrtlsdr's RtlSdr: async reads reuse one buffer, as librtlsdr does"""
+
+    def __init__(self, device_index=0):
+        self.device_index = device_index
+        self.sample_rate = 0
+        self.gain = 0
+        self.center_freq = 0
+        self.cancelled = threading.Event()
+        self.rng = np.random.default_rng(5)
+
+    def read_bytes_async(self, callback, num_bytes):
+        buffer = bytearray(num_bytes)
+        while not self.cancelled.is_set():
+            buffer[:] = iq_to_uint8(generate('pager', num_bytes // 2, self.rng)).tobytes()
+            callback(buffer, None)
+
+    def cancel_read_async(self):
+        self.cancelled.set()
+
+    def close(self):
+        pass
+
+
+def test_live_source_copies_async_buffers(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'rtlsdr', types.SimpleNamespace(RtlSdr=FakeRtlSdr))
+    source = RtlSdrSource(device_index=1, sample_rate=SAMPLE_RATE, gain=20)
+    assert source.sdr.device_index == 1 and source.sample_rate == SAMPLE_RATE and source.gain == 20
+    assert source.blocking is False
+    blocks, seen = [], []
+
+    def on_block(block):
+        blocks.append(block)
+        seen.append(block.copy())
+        if len(blocks) == 4:
+            source.stop()
+
+    source.stream_bytes(on_block, 4096)
+    assert source.sdr.cancelled.is_set()
+    # Blocks kept by the consumer are not overwritten by later reads
+    for block, copy in zip(blocks, seen):
+        np.testing.assert_array_equal(block, copy)
+    assert len({block.tobytes() for block in blocks}) == 4
@@ -0,0 +1,69 @@
+"""Lite export parity: the pure-NumPy runtime must predict exactly what scikit-learn does"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+import lite_model
+from lite_model import export_model, load_lite_model
+
+
+def _blobs(n_classes, n=150, n_features=17, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = np.array(['ADS_B', 'FM_broadcast', 'noise'][:n_classes])
+    y = labels[rng.integers(0, n_classes, n)]
+    X = rng.normal(size=(n, n_features))
+    for i, label in enumerate(labels):
+        X[y == label, i] += 1.5
+    return X, y
+
+
+def _roundtrip(tmp_path, model, X, y):
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    model.fit(X_scaled, y)
+    path = str(tmp_path / 'model.npz')
+    export_model(path, model, scaler, model_name='test')
+    lite = load_lite_model(path)
+    return model.predict(X_scaled), lite['model'].predict(lite['scaler'].transform(X))
+
+
+@pytest.mark.parametrize('n_classes', [2, 3])
+@pytest.mark.parametrize('model', [
+    SVC(kernel='rbf'), SVC(kernel='linear'),
+    RandomForestClassifier(n_estimators=20, random_state=0),
+    KNeighborsClassifier(n_neighbors=5),
+    KNeighborsClassifier(n_neighbors=9, weights='distance'),
+    SGDClassifier(loss='log_loss', random_state=0),
+], ids=lambda m: f"{type(m).__name__}-{getattr(m, 'kernel', '')}{getattr(m, 'weights', '')}")
+def test_lite_predictions_match_sklearn(tmp_path, model, n_classes):
+    X, y = _blobs(n_classes)
+    expected, actual = _roundtrip(tmp_path, model, X, y)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_svc_export_refuses_a_model_it_cannot_reproduce(tmp_path, monkeypatch):
+    X, y = _blobs(2)
+    model = SVC(kernel='rbf').fit(X, y)
+    # The two-class decision the export used to reproduce (public, sign-flipped coefficients)
+    lite_svc_predict = lite_model.LiteSVC.predict
+    monkeypatch.setattr(lite_model.LiteSVC, 'predict',
+                        lambda self, X: self.classes_[::-1][np.searchsorted(self.classes_, lite_svc_predict(self, X))])
+    with pytest.raises(ValueError, match='disagrees'):
+        export_model(str(tmp_path / 'model.npz'), model, StandardScaler().fit(X))
+
+
+def test_distance_knn_matches_sklearn_on_unseen_rows(tmp_path):
+    X, y = _blobs(3)
+    X_new, _ = _blobs(3, n=60, seed=1)
+    scaler = StandardScaler().fit(X)
+    model = KNeighborsClassifier(n_neighbors=9, weights='distance').fit(scaler.transform(X), y)
+    path = str(tmp_path / 'model.npz')
+    export_model(path, model, scaler)
+    lite = load_lite_model(path)
+    rows = lite['scaler'].transform(X_new)
+    np.testing.assert_allclose(lite['model'].predict_proba(rows), model.predict_proba(scaler.transform(X_new)),
+                               atol=1e-9)
@@ -0,0 +1,40 @@
+"""Successive halving: the fold schedule, eta validation and a small end-to-end selection"""
+import numpy as np
+import pytest
+
+from model_selection import halving_schedule, select_model
+
+
+@pytest.mark.parametrize('n_splits, eta, expected', [
+    (5, 2, [1, 2, 5]),
+    (5, 3, [1, 5]),
+    (10, 3, [1, 3, 10]),
+    (8, 2, [1, 2, 4, 8]),
+    (1, 2, [1]),
+    (3, 10, [1, 3]),
+])
+def test_halving_schedule(n_splits, eta, expected):
+    assert halving_schedule(n_splits, eta) == expected
+
+
+@pytest.mark.parametrize('eta', [1, 0, -2])
+def test_invalid_eta(eta):
+    with pytest.raises(ValueError, match='eta'):
+        halving_schedule(5, eta)
+    X = np.random.default_rng(0).normal(size=(20, 3))
+    y = np.array(['a', 'b'] * 10)
+    with pytest.raises(ValueError, match='eta'):
+        select_model(X, y, grid={'Random Forest': [{'n_estimators': 5}]}, n_splits=2, eta=eta, log=lambda _: None)
+
+
+def test_select_model_keeps_the_separable_winner():
+    rng = np.random.default_rng(0)
+    y = np.array(['a', 'b'] * 30)
+    X = rng.normal(size=(60, 4)) + (y == 'a')[:, np.newaxis] * 3.0
+    grid = {'Random Forest': [{'n_estimators': 5, 'random_state': 0}], 'KNN': [{'n_neighbors': 3}, {'n_neighbors': 5}]}
+    finalists, candidates = select_model(X, y, grid=grid, n_splits=4, eta=2, log=lambda _: None)
+    assert len(candidates) == 3
+    assert len(finalists) == 1 and len(finalists[0].fold_scores) == 4
+    assert finalists[0].cv_mean > 0.9
+    eliminated = [c for c in candidates if c.eliminated_round is not None]
+    assert len(eliminated) == 2
@@ -0,0 +1,93 @@
+"""Micro-batching: each request gets exactly its own rows back, batches stay within max_batch"""
+import threading
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from iq_dataset import iq_to_uint8
+from model_server import MicroBatcher, ModelClient, make_server
+from signal_features import FEATURE_NAMES, SignalFeatureExtractor
+from stream_classify import predict_batch
+from synthetic_iq import generate
+
+
+@pytest.fixture(scope='module')
+def model_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, len(FEATURE_NAMES)))
+    y = np.array(['noise', 'pager', 'APRS'])[rng.integers(0, 3, 60)]
+    scaler = StandardScaler().fit(X)
+    return {'model': LogisticRegression().fit(scaler.transform(X), y), 'scaler': scaler, 'model_name': 'test'}
+
+
+def _requests(sizes, seed=1):
+    rng = np.random.default_rng(seed)
+    return [rng.normal(size=(n, len(FEATURE_NAMES))).astype(np.float32) for n in sizes]
+
+
+def test_batched_results_split_per_request(model_data):
+    sizes = [1, 4, 2, 7, 1, 3]
+    batcher = MicroBatcher(model_data, max_batch=8, max_wait=0.2)
+    try:
+        futures = [batcher.submit(features) for features in _requests(sizes)]
+        results = [future.result(timeout=10) for future in futures]
+    finally:
+        batcher.close()
+    for features, (labels, probabilities) in zip(_requests(sizes), results):
+        expected_labels, expected = predict_batch(model_data, features)
+        assert labels == expected_labels
+        np.testing.assert_allclose(probabilities, expected, rtol=1e-6)
+    stats = batcher.stats
+    assert stats['requests'] == len(sizes) and stats['rows'] == sum(sizes)
+    assert stats['batches'] < len(sizes)
+    assert stats['max_batch_rows'] <= 8
+
+
+def test_oversized_request_runs_alone(model_data):
+    batcher = MicroBatcher(model_data, max_batch=4, max_wait=0.2)
+    try:
+        futures = [batcher.submit(features) for features in _requests([2, 9, 2])]
+        assert [len(future.result(timeout=10)[0]) for future in futures] == [2, 9, 2]
+    finally:
+        batcher.close()
+    assert batcher.stats['max_batch_rows'] == 9 and batcher.stats['batches'] == 3
+
+
+def test_malformed_request_fails_alone(model_data):
+    batcher = MicroBatcher(model_data, max_batch=64, max_wait=0.2)
+    try:
+        good = batcher.submit(_requests([3])[0])
+        bad = batcher.submit(np.zeros((2, len(FEATURE_NAMES) - 1)))
+        also_good = batcher.submit(_requests([1])[0])
+        assert len(good.result(timeout=10)[0]) == 3
+        assert len(also_good.result(timeout=10)[0]) == 1
+        with pytest.raises(ValueError):
+            bad.result(timeout=10)
+    finally:
+        batcher.close()
+
+
+def test_http_round_trip(model_data):
+    batcher = MicroBatcher(model_data, max_wait=0.001)
+    server = make_server(batcher, '127.0.0.1:0')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = ModelClient(f"127.0.0.1:{server.server_address[1]}")
+        features = _requests([5])[0]
+        labels, probabilities = client.classify(features)
+        expected_labels, expected = predict_batch(model_data, features)
+        assert labels == expected_labels
+        np.testing.assert_allclose(probabilities, expected, rtol=1e-5)
+
+        captures = [generate(label, 16384, np.random.default_rng(i)) for i, label in enumerate(['pager', 'noise'])]
+        labels, _ = client.classify_captures([iq_to_uint8(c) for c in captures])
+        features = SignalFeatureExtractor().extract_batch(np.stack(captures))
+        assert labels == predict_batch(model_data, features)[0]
+        assert client.health()['stats']['requests'] == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
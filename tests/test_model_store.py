@@ -0,0 +1,67 @@
+"""Hot reloading follows whichever file load_model resolves, .pkl or its lite export"""
+import os
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from classify_live import load_model, model_files
+from lite_model import export_model
+from model_store import ModelReloader, save_model
+
+
+def _model_data(name, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(40, 17))
+    y = np.array(['pager', 'noise'] * 20)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=5, random_state=seed).fit(scaler.transform(X), y)
+    return {'model': model, 'scaler': scaler, 'model_name': name}
+
+
+def _touch_later(path, seconds):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + int(seconds * 1e9)))
+
+
+def test_reloads_on_pickle_replacement(tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    save_model(path, _model_data('first'))
+    reloader = ModelReloader(path, load_model, interval=0, watch=model_files(path))
+    assert reloader.model_data['model_name'] == 'first'
+    assert reloader.poll() is None
+
+    save_model(path, _model_data('second', seed=1))
+    _touch_later(path, 1)
+    assert reloader.poll()['model_name'] == 'second'
+    assert reloader.poll() is None
+    assert reloader.reloads == 1
+
+
+def test_reloads_when_a_lite_export_appears_and_changes(tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    lite_path = str(tmp_path / 'model.npz')
+    data = _model_data('pickled')
+    save_model(path, data)
+    reloader = ModelReloader(path, load_model, interval=0, watch=model_files(path))
+    assert model_files(path) == (path, lite_path)
+
+    # An export written after the .pkl is what load_model now resolves
+    export_model(lite_path, data['model'], data['scaler'], model_name='lite v1')
+    _touch_later(lite_path, 1)
+    assert reloader.poll()['model_name'] == 'lite v1'
+
+    export_model(lite_path, data['model'], data['scaler'], model_name='lite v2')
+    _touch_later(lite_path, 2)
+    assert reloader.poll()['model_name'] == 'lite v2'
+    assert reloader.reloads == 2
+
+
+def test_without_watch_only_the_path_is_watched(tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    data = _model_data('pickled')
+    save_model(path, data)
+    reloader = ModelReloader(path, load_model, interval=0)
+    export_model(str(tmp_path / 'model.npz'), data['model'], data['scaler'], model_name='lite')
+    _touch_later(str(tmp_path / 'model.npz'), 1)
+    assert reloader.poll() is None
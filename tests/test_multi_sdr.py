@@ -0,0 +1,60 @@
+"""The multi-dongle scheduler covers every job once and survives receivers that fail"""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from model_store import save_model
+from multi_sdr import DeviceScheduler, frequency_range
+from signal_features import SignalFeatureExtractor
+from synthetic_iq import generate
+
+PLAN = [152.84e6, 145.0e6, 1090e6, 433.92e6]
+
+
+@pytest.fixture(scope='module')
+def model_path(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    labels = np.array(['pager', 'noise', 'ADS_B', 'ISM_sensors'] * 5)
+    X = SignalFeatureExtractor().extract_batch(np.stack([generate(label, 51200, rng) for label in labels]))
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(scaler.transform(X), labels)
+    path = str(tmp_path_factory.mktemp('model') / 'model.pkl')
+    save_model(path, {'model': model, 'scaler': scaler, 'model_name': 'test'})
+    return path
+
+
+def _run(devices, model_path, rounds=1):
+    scheduler = DeviceScheduler(devices, model_path, duration=0.05).start()
+    try:
+        return scheduler, list(scheduler.run(PLAN, rounds=rounds))
+    finally:
+        scheduler.stop()
+
+
+def test_every_job_runs_once_across_devices(model_path):
+    scheduler, results = _run(['synthetic', 'synthetic'], model_path, rounds=2)
+    assert sorted((r.round, r.frequency) for r in results) == sorted((k, f) for k in range(2) for f in PLAN)
+    assert set(scheduler.devices) == {'synthetic#0', 'synthetic#1'}
+    assert sum(scheduler.stats['per_device'].values()) == len(results) == 8
+    assert scheduler.stats['failed_devices'] == {} and scheduler.stats['dropped_jobs'] == 0
+    # The synthetic source plays the plan's class at each frequency
+    labels = {r.frequency: r.label for r in results}
+    assert labels[152.84e6] == 'pager' and labels[1090e6] == 'ADS_B'
+    assert all(0 < r.confidence <= 1 for r in results)
+
+
+def test_a_failed_device_leaves_its_share_to_the_others(model_path, tmp_path):
+    scheduler, results = _run(['synthetic', f'replay:{tmp_path / "missing"}'], model_path)
+    assert sorted(r.frequency for r in results) == sorted(PLAN)
+    assert {r.device for r in results} == {'synthetic'}
+    assert list(scheduler.stats['failed_devices']) == [f'replay:{tmp_path / "missing"}']
+
+
+def test_all_devices_failing_raises(model_path, tmp_path):
+    with pytest.raises(RuntimeError, match='All devices failed'):
+        _run([f'replay:{tmp_path / "missing"}'], model_path)
+
+
+def test_frequency_range_includes_the_stop():
+    np.testing.assert_allclose(frequency_range(144e6, 145e6, 0.25e6), [144e6, 144.25e6, 144.5e6, 144.75e6, 145e6])
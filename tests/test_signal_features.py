@@ -0,0 +1,141 @@
+"""Scalar features: batch extraction against the per-capture definitions, chunked (Welch) extraction against batch"""
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from classify_live import classify_signal
+from front_end import FeatureSchemaError, check_model_schema, feature_schema, model_extractor
+from iq_source import SyntheticSource
+from signal_features import FEATURE_NAMES, SignalFeatureExtractor, StreamingFeatureExtractor, extract_features_batched
+from synthetic_iq import SAMPLE_RATE, generate
+
+# Features that do not involve the spectrum: the streaming extractor must reproduce them exactly
+TIME_DOMAIN = [i for i, name in enumerate(FEATURE_NAMES) if not name.startswith('fft_') and name != 'bandwidth_ratio']
+
+
+def _tone(n, rng):
+    t = np.arange(n) / SAMPLE_RATE
+    return (0.5 * np.exp(2j * np.pi * 50e3 * t) + 0.05 * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+            ).astype(np.complex64)
+
+
+@pytest.mark.parametrize('label', ['FM_broadcast', 'pager', 'noise'])
+def test_single_segment_matches_batch(label):
+    samples = generate(label, 8192, np.random.default_rng(0))
+    streaming = StreamingFeatureExtractor(welch_segment=8192).extract_features(samples, chunk_size=1000)
+    batch = SignalFeatureExtractor().extract_features(samples)
+    np.testing.assert_allclose(streaming, batch, rtol=2e-3, atol=1e-6)
+
+
+@pytest.mark.parametrize('chunk_size', [1000, 8192, 50000])
+def test_chunking_does_not_change_features(chunk_size):
+    samples = generate('pager', 102400, np.random.default_rng(1))
+    whole = StreamingFeatureExtractor().extract_batch(samples[np.newaxis])[0]
+    chunked = StreamingFeatureExtractor().extract_features(samples, chunk_size=chunk_size)
+    np.testing.assert_allclose(chunked, whole, rtol=1e-4, atol=1e-6)
+    batch = SignalFeatureExtractor().extract_features(samples)
+    np.testing.assert_allclose(chunked[TIME_DOMAIN], batch[TIME_DOMAIN], rtol=2e-3, atol=1e-6)
+
+
+def test_welch_fft_features_are_a_different_feature_set():
+    samples = _tone(102400, np.random.default_rng(2))
+    welch = StreamingFeatureExtractor().extract_features(samples)
+    batch = SignalFeatureExtractor().extract_features(samples)
+    fft_max = FEATURE_NAMES.index('fft_max')
+    assert batch[fft_max] / welch[fft_max] > 10
+    assert feature_schema(spectrum='welch')['hash'] != feature_schema()['hash']
+
+
+def _model(spectrum):
+    rng = np.random.default_rng(3)
+    labels = np.array(['pager', 'noise'] * 6)
+    captures = np.stack([generate(label, 40960, rng) for label in labels])
+    extractor = StreamingFeatureExtractor() if spectrum == 'welch' else SignalFeatureExtractor()
+    X = extractor.extract_batch(captures)
+    scaler = StandardScaler().fit(X)
+    return {'model': LogisticRegression().fit(scaler.transform(X), labels), 'scaler': scaler, 'model_name': 'test',
+            'feature_schema': feature_schema(sample_rate=SAMPLE_RATE, spectrum=spectrum)}
+
+
+def test_welch_model_gets_welch_extractor():
+    model_data = _model('welch')
+    check_model_schema(model_data, SAMPLE_RATE)
+    assert isinstance(model_extractor(model_data, SAMPLE_RATE), StreamingFeatureExtractor)
+    assert isinstance(model_extractor(_model('fft'), SAMPLE_RATE), SignalFeatureExtractor)
+
+
+def test_chunked_classify_needs_welch_model():
+    source = SyntheticSource(SAMPLE_RATE, frequency_plan={152.84e6: 'pager'}, seed=4)
+    with pytest.raises(FeatureSchemaError, match='--spectrum welch'):
+        classify_signal(source, _model('fft'), 152.84e6, duration=0.04, chunk_duration=0.01)
+    label, probabilities = classify_signal(source, _model('welch'), 152.84e6, duration=0.04, chunk_duration=0.01)
+    assert label in ('pager', 'noise') and probabilities.shape == (2,)
+
+
+def _reference_features(samples):
+    """The per-capture feature definitions, one capture at a time in float64"""
+    samples = np.asarray(samples, dtype=np.complex128)
+    power = np.abs(samples) ** 2
+    fft_power = np.abs(np.fft.fft(samples)) ** 2
+    phase = np.angle(samples)
+    phase_diff = np.diff(phase)
+    return np.array([
+        power.mean(), power.std(), power.max(), power.min(),
+        fft_power.mean(), fft_power.std(), fft_power.max(), np.argmax(fft_power) / len(fft_power),
+        samples.real.mean(), samples.real.std(), samples.imag.mean(), samples.imag.std(),
+        phase.mean(), phase.std(), phase_diff.mean(), phase_diff.std(),
+        np.sum(fft_power > fft_power.max() * 0.1) / len(fft_power),
+    ])
+
+
+def _assert_matches_reference(features, samples):
+    reference = _reference_features(samples)
+    np.testing.assert_allclose(features, reference, rtol=1e-3, atol=1e-5)
+
+
+def test_batch_matches_per_capture_extraction():
+    rng = np.random.default_rng(2)
+    labels = ['ADS_B', 'NOAA_APT', 'ISM_sensors', 'FM_broadcast', 'NOAA_weather', 'pager', 'APRS', 'noise']
+    batch = np.stack([generate(label, 16384, rng) for label in labels])
+    extractor = SignalFeatureExtractor()
+    features = extractor.extract_batch(batch)
+    assert features.shape == (len(labels), len(FEATURE_NAMES)) and features.dtype == np.float32
+    for row, samples in zip(features, batch):
+        np.testing.assert_array_equal(row, extractor.extract_features(samples))
+        _assert_matches_reference(row, samples)
+
+
+def test_batched_list_matches_per_capture_extraction():
+    rng = np.random.default_rng(3)
+    captures = [generate(label, n, rng) for label, n in
+                [('pager', 4096), ('noise', 4096), ('pager', 4096), ('APRS', 2048), ('noise', 4096)]]
+    extractor = SignalFeatureExtractor()
+    features = extract_features_batched(extractor, captures, batch_size=2)
+    for row, samples in zip(features, captures):
+        np.testing.assert_array_equal(row, extractor.extract_features(samples))
+
+
+@pytest.mark.parametrize('n_samples', [2, 3, 17])
+def test_short_captures(n_samples):
+    samples = generate('pager', n_samples, np.random.default_rng(4))
+    features = SignalFeatureExtractor().extract_batch(np.stack([samples, samples[::-1]]))
+    _assert_matches_reference(features[0], samples)
+    _assert_matches_reference(features[1], samples[::-1])
+
+
+def test_all_zero_capture():
+    batch = np.zeros((2, 4096), dtype=np.complex64)
+    batch[1] = generate('noise', 4096, np.random.default_rng(5))
+    features = SignalFeatureExtractor().extract_batch(batch)
+    assert np.all(np.isfinite(features))
+    np.testing.assert_array_equal(features[0], np.zeros(len(FEATURE_NAMES)))
+    _assert_matches_reference(features[1], batch[1])
+
+
+def test_batch_shape_is_checked():
+    extractor = SignalFeatureExtractor()
+    with pytest.raises(ValueError):
+        extractor.extract_batch(np.zeros(4096, dtype=np.complex64))
+    with pytest.raises(ValueError):
+        extractor.extract_batch(np.zeros((2, 4096), dtype=np.complex64), out=np.empty((3, len(FEATURE_NAMES))))
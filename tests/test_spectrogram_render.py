@@ -0,0 +1,81 @@
+"""Headless renderer: valid PNGs, viridis colours, and a spectrogram that puts energy where it is"""
+import sys
+
+import numpy as np
+import pytest
+from matplotlib import colormaps
+from PIL import Image   # installed with matplotlib
+
+import spectrogram_render
+from capture_validated import SpectralContext
+from spectrogram_render import VIRIDIS, encode_png, render_images, render_spectrogram, render_thumbnails
+from synthetic_iq import generate, generate_dataset
+
+SAMPLE_RATE = 1.024e6
+
+
+def _tone(offset, n=65536):
+    t = np.arange(n) / SAMPLE_RATE
+    noise = 1e-3 * np.random.default_rng(0).standard_normal(n)
+    return (0.5 * np.exp(2j * np.pi * offset * t) + noise).astype(np.complex64)
+
+
+def test_png_round_trip(tmp_path):
+    rgb = np.random.default_rng(0).integers(0, 256, size=(7, 5, 3), dtype=np.uint8)
+    path = tmp_path / 'x.png'
+    path.write_bytes(encode_png(rgb, text={'Title': 'pager - 152.84 MHz'}))
+    with Image.open(path) as image:
+        assert image.mode == 'RGB'
+        np.testing.assert_array_equal(np.asarray(image), rgb)
+        assert image.text['Title'] == 'pager - 152.84 MHz'
+
+
+def test_viridis_matches_matplotlib():
+    reference = np.round(colormaps['viridis'](np.linspace(0, 1, 256))[:, :3] * 255)
+    assert np.max(np.abs(VIRIDIS.astype(int) - reference)) <= 4
+
+
+@pytest.mark.parametrize('offset', [-300e3, 100e3, 250e3])
+def test_tone_lands_on_its_row_and_column(offset):
+    context = SpectralContext(_tone(offset), SAMPLE_RATE)
+    images = render_images(context, width=512, spec_height=256, psd_height=128)
+    assert images.shape == (1, 256 + 1 + 128, 512, 3) and images.dtype == np.uint8
+    # Spectrogram: highest frequency in the top row, the brightest row is the tone's
+    brightness = images[0, :256].astype(int).sum(axis=(1, 2))
+    expected_row = (0.5 - offset / SAMPLE_RATE) * 256
+    assert abs(np.argmax(brightness) - expected_row) <= 2
+    # PSD trace: the column that reaches the top of the panel is the tone's
+    psd = images[0, 257:]
+    top_columns = np.flatnonzero((psd[0] != spectrogram_render.BACKGROUND).any(axis=-1))
+    expected_column = (0.5 + offset / SAMPLE_RATE) * 512
+    assert len(top_columns) and np.all(np.abs(top_columns - expected_column) <= 2)
+
+
+def test_render_spectrogram_and_thumbnails(tmp_path):
+    rng = np.random.default_rng(1)
+    batch = np.stack([generate(label, 16384, rng) for label in ('ADS_B', 'pager')])
+    path = render_spectrogram(batch[0], 'ADS_B', 1090e6, str(tmp_path / 'ADS_B_spectrum.png'))
+    with Image.open(path) as image:
+        assert image.size == (512, 385)
+        assert image.text['Title'] == 'ADS_B - 1090.00 MHz'
+
+    context = SpectralContext(batch, SAMPLE_RATE)
+    paths = [str(tmp_path / 'thumbs' / label / f'{label}_0.png') for label in ('ADS_B', 'pager')]
+    render_thumbnails(context, ['ADS_B', 'pager'], [1090e6, None], paths)
+    images = render_images(context, width=256, spec_height=96, psd_height=48)
+    for image, path in zip(images, paths):
+        with Image.open(path) as png:
+            np.testing.assert_array_equal(np.asarray(png), image)
+    with Image.open(paths[1]) as png:
+        assert png.text['Title'] == 'pager'
+
+
+def test_cli_renders_every_capture(tmp_path, monkeypatch):
+    generate_dataset(str(tmp_path / 'ds'), per_class=2, duration=0.01)
+    monkeypatch.setattr(sys, 'argv', ['spectrogram_render.py', str(tmp_path / 'ds'),
+                                      '--output', str(tmp_path / 'thumbs'), '--batch-size', '3'])
+    spectrogram_render.main()
+    rendered = sorted(p.relative_to(tmp_path / 'thumbs').as_posix() for p in (tmp_path / 'thumbs').rglob('*.png'))
+    expected = sorted(p.relative_to(tmp_path / 'ds').with_suffix('.png').as_posix()
+                      for p in (tmp_path / 'ds').rglob('*.npy'))
+    assert rendered == expected and len(rendered) == 16
@@ -0,0 +1,26 @@
+"""
+rtl-ml <command> --help must start fast: scikit-learn, matplotlib, scipy and
+tqdm are imported inside the code paths that use them, never at module top
+level or before argument parsing
+"""
+import pytest
+
+from benchmark import STARTUP_FORBIDDEN, bench_startup
+
+# Generous: --help takes ~0.2 s here; the budget only catches a heavy import slipping back in
+HELP_BUDGET_S = 2.0
+
+
+@pytest.fixture(scope='module')
+def startup():
+    return bench_startup(sorted(STARTUP_FORBIDDEN), repeat=2)
+
+
+@pytest.mark.parametrize('command', sorted(STARTUP_FORBIDDEN))
+def test_help_loads_no_forbidden_modules(startup, command):
+    assert startup[command]['forbidden_imports'] == []
+
+
+@pytest.mark.parametrize('command', sorted(STARTUP_FORBIDDEN))
+def test_help_is_within_budget(startup, command):
+    assert startup[command]['help_s'] < HELP_BUDGET_S
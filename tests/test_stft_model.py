@@ -0,0 +1,66 @@
+"""STFT models classify through the same model_data path as scalar-feature models"""
+import hashlib
+import json
+
+import numpy as np
+import pytest
+
+from classify_live import load_model
+from front_end import SCHEMA_FIELDS, FeatureSchemaError, channel_extractor, feature_schema, model_extractor
+from stft_features import StftExtractor, StftFeatureExtractor, train_stft_classifier
+from stream_classify import predict_batch
+from synthetic_iq import SAMPLE_RATE, generate
+
+LABELS = ['FM_broadcast', 'noise', 'pager']
+
+
+@pytest.fixture(scope='module')
+def stft_model(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    y = np.array(LABELS * 4)
+    extractor = StftExtractor(n_fft=64, n_frames=16)
+    tensors = extractor.extract_batch(np.stack([generate(label, 32768, rng) for label in y]))
+    model = train_stft_classifier(tensors, y, hidden=16, epochs=20, n_fft=64, n_frames=16)
+    model.feature_schema = feature_schema(sample_rate=SAMPLE_RATE, stft=model.config)
+    path = str(tmp_path_factory.mktemp('stft') / 'stft.npz')
+    model.save(path)
+    return model, path
+
+
+def test_loaded_model_matches_classifier(stft_model):
+    model, path = stft_model
+    model_data = load_model(path)
+    assert model_data['feature_kind'] == 'stft'
+    captures = np.stack([generate(label, 32768, np.random.default_rng(1)) for label in LABELS])
+    extractor = model_extractor(model_data, SAMPLE_RATE)
+    assert isinstance(extractor, StftFeatureExtractor)
+    labels, probabilities = predict_batch(model_data, extractor.extract_batch(captures))
+    np.testing.assert_allclose(probabilities, model.classify_samples(captures), rtol=1e-5, atol=1e-6)
+    assert labels == list(model.predict(model.extractor().extract_batch(captures)))
+
+
+def test_schema_checks(stft_model):
+    _, path = stft_model
+    model_data = load_model(path)
+    with pytest.raises(FeatureSchemaError, match='sample_rate'):
+        model_extractor(model_data, 2 * SAMPLE_RATE)
+    with pytest.raises(FeatureSchemaError):
+        model_extractor(dict(model_data, stft={'n_fft': 128, 'n_frames': 16}), SAMPLE_RATE)
+    with pytest.raises(FeatureSchemaError):
+        model_extractor(dict(model_data, feature_kind='scalar'), SAMPLE_RATE)
+
+
+def test_channel_extractor(stft_model):
+    _, path = stft_model
+    model_data = load_model(path)
+    assert isinstance(channel_extractor(model_data, SAMPLE_RATE), StftFeatureExtractor)
+    with pytest.raises(FeatureSchemaError, match='channels run at'):
+        channel_extractor(model_data, SAMPLE_RATE / 4)
+
+
+def test_scalar_schema_hash_unchanged():
+    # Scalar models saved before STFT schemas existed must keep validating
+    schema = feature_schema()
+    fields = {name: schema[name] for name in SCHEMA_FIELDS}
+    assert 'feature_kind' not in schema
+    assert schema['hash'] == hashlib.sha1(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:16]
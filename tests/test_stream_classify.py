@@ -0,0 +1,118 @@
+"""Streaming pipeline bookkeeping: sample clock across dropped blocks, delivered-result counts"""
+import threading
+
+import numpy as np
+
+from stream_classify import SlidingWindowBuffer, StreamingClassifier, _STOP
+
+SAMPLE_RATE = 1.024e6
+
+
+class _Identity:
+    def transform(self, X):
+        return X
+
+
+class _FirstSampleModel:
+    """Labels each window by the sample index its first sample encodes."""
+    classes_ = np.array(['even', 'odd'])
+
+    def predict_proba(self, X):
+        odd = (X[:, 0] % 2).astype(int)
+        return np.eye(2)[odd]
+
+
+class _IndexExtractor:
+    """Features = (first, last) sample index of each window, from samples that encode their own index."""
+
+    def extract_batch(self, batch):
+        return np.stack([batch[:, 0].real, batch[:, -1].real], axis=1)
+
+
+class _Source:
+    sample_rate = SAMPLE_RATE
+    blocking = False
+
+    def stop(self):
+        pass
+
+
+def _pipeline(window_size, hop_size, queue_size=8, max_batch=8):
+    model_data = {'model': _FirstSampleModel(), 'scaler': _Identity(), 'model_name': 'test'}
+    pipeline = StreamingClassifier(_Source(), model_data, window_duration=window_size / SAMPLE_RATE,
+                                   overlap=1 - hop_size / window_size, queue_size=queue_size, max_batch=max_batch)
+    pipeline.extractor = _IndexExtractor()
+    pipeline._start_time = 100.0
+    return pipeline
+
+
+def _block(start, length):
+    return (start, np.arange(start, start + length).astype(np.complex64))
+
+
+def test_skip_to_restarts_the_window_after_a_gap():
+    buffer = SlidingWindowBuffer(4, 2)
+    buffer.push(np.arange(3))
+    buffer.skip_to(10)
+    windows = buffer.push(np.arange(10, 16))
+    assert [start for start, _ in windows] == [10, 12]
+    np.testing.assert_array_equal(windows[0][1], [10, 11, 12, 13])
+
+
+def test_windows_restart_past_a_dropped_block():
+    pipeline = _pipeline(window_size=4096, hop_size=2048)
+    # Block 1 (samples 4096-8191) was dropped by the reader
+    for item in (_block(0, 4096), _block(8192, 4096), _block(12288, 4096), _STOP):
+        pipeline.block_queue.put(item)
+    pipeline._windowing()
+
+    rows = []
+    while True:
+        item = pipeline.feature_queue.get_nowait()
+        if item is _STOP:
+            break
+        rows.extend(zip(item[0], item[1]))
+    starts = [int(features[0]) for _, features in rows]
+    assert starts == [0, 8192, 10240, 12288]
+    for timestamp, (first, last) in rows:
+        # Contiguous samples only, and timestamps on the true sample clock
+        assert last - first == 4095
+        assert timestamp == 100.0 + first / SAMPLE_RATE
+
+
+def test_reader_counts_dropped_samples_on_the_clock():
+    pipeline = _pipeline(window_size=4096, hop_size=4096, queue_size=1)
+    pipeline.source.stream = lambda callback, block_size: [callback(np.zeros(1000)) for _ in range(3)]
+    # The block queue holds one item; the final _STOP waits for the reads below
+    thread = threading.Thread(target=pipeline._reader)
+    thread.start()
+    while pipeline.stats['blocks'] < 3 and thread.is_alive():
+        thread.join(0.01)
+    assert pipeline.block_queue.get(timeout=10)[0] == 0
+    assert pipeline.block_queue.get(timeout=10) is _STOP
+    thread.join()
+    assert pipeline.stats['dropped_blocks'] == 2
+    assert pipeline._samples_read == 3000
+
+
+def test_dropped_results_are_not_counted_as_delivered():
+    pipeline = _pipeline(window_size=4096, hop_size=4096, queue_size=1, max_batch=1)
+    features = np.array([[0.0, 1.0], [1.0, 2.0], [2.0, 3.0]])
+    # Queues hold one item: the classifier takes the batch before _STOP fits, and its final _STOP
+    # waits for the reads below
+    thread = threading.Thread(target=pipeline._classifier)
+    thread.start()
+    pipeline.feature_queue.put(([1.0, 2.0, 3.0], features))
+    pipeline.feature_queue.put(_STOP)
+    while pipeline.stats['dropped_results'] < 2 and thread.is_alive():
+        thread.join(0.01)
+    delivered = []
+    while True:
+        item = pipeline.result_queue.get(timeout=10)
+        if item is _STOP:
+            break
+        delivered.append(item)
+    thread.join()
+    assert len(delivered) == pipeline.stats['results'] == 1
+    assert pipeline.stats['dropped_results'] == 2
+    assert pipeline.stats['results'] + pipeline.stats['dropped_results'] == 3
@@ -0,0 +1,16 @@
+"""Synthetic captures pass the capture-time validator of their class"""
+import numpy as np
+import pytest
+
+from capture_validated import ValidatedSignalCapture
+from iq_source import SyntheticSource
+from synthetic_iq import SAMPLE_RATE, generate
+
+
+@pytest.mark.parametrize('n_samples', [16384, 102400, 512000])
+def test_fm_broadcast_passes_validate_fm(n_samples):
+    validator = ValidatedSignalCapture(source=SyntheticSource(SAMPLE_RATE))
+    rng = np.random.default_rng(0)
+    results = validator.validate_batch(np.stack([generate('FM_broadcast', n_samples, rng) for _ in range(6)]),
+                                       'FM_broadcast')
+    assert all(result['is_wideband'] for result in results), [result['bandwidth_hz'] for result in results]
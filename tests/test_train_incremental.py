@@ -0,0 +1,33 @@
+"""Incremental updates: the replay buffer is a uniform reservoir over every row seen"""
+import numpy as np
+
+from train_incremental import new_incremental_model, reservoir_update, update_model
+
+
+def test_reservoir_keeps_a_uniform_sample_of_the_stream():
+    size, batches, batch = 20, 10, 30
+    counts = np.zeros(batches * batch)
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        reservoir, n_seen = np.empty((0, 1)), 0
+        for b in range(batches):
+            rows = np.arange(b * batch, (b + 1) * batch, dtype=float)[:, np.newaxis]
+            reservoir, n_seen = reservoir_update(reservoir, rows, n_seen, size, rng)
+        assert len(reservoir) == size and n_seen == batches * batch
+        counts[reservoir[:, 0].astype(int)] += 1
+    # Every row is kept with probability size / n_seen, early batches as often as late ones
+    inclusion = counts / 2000
+    np.testing.assert_allclose(inclusion.reshape(batches, batch).mean(axis=1), size / (batches * batch), rtol=0.1)
+
+
+def test_update_model_counts_rows_per_class():
+    rng = np.random.default_rng(0)
+    model_data = new_incremental_model(['noise', 'pager'], replay_per_class=5)
+    for step in range(3):
+        X = rng.normal(size=(8, 17)).astype(np.float32)
+        y = np.array(['noise', 'pager'] * 4)
+        update_model(model_data, X, y, [f"{step}-{i}" for i in range(8)], epochs=1)
+    state = model_data['incremental']
+    assert state['class_seen'] == {'noise': 12, 'pager': 12}
+    assert all(len(state['replay'][label]) == 5 for label in state['classes'])
+    assert state['n_seen'] == 24
@@ -0,0 +1,51 @@
+"""Parallel dataset loading returns the serial rows, in the same order, for .npy trees and IQ shards"""
+import numpy as np
+import pytest
+
+from front_end import DDCFrontEnd
+from iq_dataset import convert_npy_tree, list_npy_captures, load_samples
+from signal_features import SignalFeatureExtractor
+from synthetic_iq import generate_dataset
+from train_validated import load_dataset
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    root = tmp_path_factory.mktemp('synthetic')
+    generate_dataset(str(root / 'npy'), per_class=3, duration=0.01)
+    convert_npy_tree(str(root / 'npy'), str(root / 'iq'), shard_size=2)
+    return root
+
+
+@pytest.fixture(scope='module')
+def serial(dataset):
+    return load_dataset(str(dataset / 'npy'), use_cache=False, workers=1)
+
+
+def test_serial_rows_are_the_per_capture_features(dataset, serial):
+    X, y = serial
+    filepaths, labels = list_npy_captures(str(dataset / 'npy'), verbose=False)
+    assert X.shape == (24, 17) and list(y) == labels
+    extractor = SignalFeatureExtractor()
+    for row, filepath in zip(X, filepaths):
+        np.testing.assert_array_equal(row, extractor.extract_features(load_samples(filepath)))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 16])
+def test_workers_do_not_change_rows_or_order(dataset, serial, chunk_size):
+    X, y = load_dataset(str(dataset / 'npy'), chunk_size=chunk_size, use_cache=False, workers=2)
+    np.testing.assert_array_equal(X, serial[0])
+    np.testing.assert_array_equal(y, serial[1])
+
+
+def test_iq_shards_load_like_the_npy_tree(dataset, serial):
+    X, y = load_dataset(str(dataset / 'iq'), chunk_size=5, use_cache=False, workers=2)
+    np.testing.assert_array_equal(y, serial[1])
+    np.testing.assert_allclose(X, serial[0], rtol=1e-5, atol=1e-6)
+
+
+def test_workers_apply_the_front_end(dataset):
+    front_end = DDCFrontEnd(4, 100e3)
+    serial_X, _ = load_dataset(str(dataset / 'npy'), use_cache=False, workers=1, front_end=front_end)
+    parallel_X, _ = load_dataset(str(dataset / 'npy'), chunk_size=4, use_cache=False, workers=2, front_end=front_end)
+    np.testing.assert_array_equal(parallel_X, serial_X)